@@ -0,0 +1,121 @@
+# Compares the memory held by resource rows built as plain dicts (with strftime date strings) against
+# the slotted record types, for the same synthetic API responses as the encoding benchmark's
+# 100k-resource report. Run from the repository root:
+#   python bench/bench_record_memory.py [resource_count]
+
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+
+import lambda_function
+
+
+def build_responses(resource_count):
+    # Strings are built per item, like a parsed API response, so equal values are separate objects
+    rng = random.Random(42)
+    volume_types = ['gp2', 'gp3', 'io1', 'st1', 'sc1']
+    start = datetime(2025, 1, 1)
+    return {
+        'snapshots': [{
+            'SnapshotId': f"snap-{i:017x}",
+            'VolumeId': f"vol-{i % 1000:017x}",
+            'VolumeSize': rng.randint(1, 2000),
+            'StartTime': start + timedelta(minutes=i)
+        } for i in range(int(resource_count * 0.4))],
+        'volumes': [{
+            'VolumeId': f"vol-{i:017x}",
+            'VolumeType': ''.join(rng.choice(volume_types)),
+            'Size': rng.randint(1, 2000),
+            'Attachments': [] if rng.random() > 0.8 else [{}],
+            'Iops': 3000,
+            'Throughput': 125,
+            'CreateTime': start + timedelta(minutes=i)
+        } for i in range(int(resource_count * 0.2))],
+        'log_groups': [{
+            'logGroupName': f"/aws/lambda/function-{i}",
+            'storedBytes': rng.randint(0, 10**10),
+            'retentionInDays': rng.choice([7, 30])
+        } for i in range(int(resource_count * 0.2))]
+    }
+
+
+def build_dict_rows(responses):
+    return [
+        [{
+            'SnapshotId': s['SnapshotId'],
+            'VolumeId': s['VolumeId'],
+            'SnapshotSizeGB': s['VolumeSize'],
+            'VolumeSizeGB': 'N/A',
+            'StartTime': s['StartTime'].strftime('%d/%m/%Y'),
+            'LifecyclePolicy': 'N/A'
+        } for s in responses['snapshots']],
+        [{
+            'VolumeId': v['VolumeId'],
+            'VolumeType': v['VolumeType'],
+            'SizeGB': v['Size'],
+            'InUse': bool(v['Attachments']),
+            'Iops': v['Iops'],
+            'Throughput': v['Throughput'],
+            'CreateTime': v['CreateTime'].strftime('%d/%m/%Y')
+        } for v in responses['volumes']],
+        [{
+            'LogGroupName': g['logGroupName'],
+            'StoredBytes': g['storedBytes'],
+            'RetentionInDays': g['retentionInDays']
+        } for g in responses['log_groups']]
+    ]
+
+
+def build_record_rows(responses):
+    return [
+        [lambda_function.EbsSnapshotRecord(
+            SnapshotId=s['SnapshotId'],
+            VolumeId=s['VolumeId'],
+            SnapshotSizeGB=s['VolumeSize'],
+            VolumeSizeGB='N/A',
+            StartTime=s['StartTime'],
+            LifecyclePolicy='N/A'
+        ) for s in responses['snapshots']],
+        [lambda_function.EbsVolumeRecord(
+            VolumeId=v['VolumeId'],
+            VolumeType=v['VolumeType'],
+            SizeGB=v['Size'],
+            InUse=bool(v['Attachments']),
+            Iops=v['Iops'],
+            Throughput=v['Throughput'],
+            CreateTime=v['CreateTime']
+        ) for v in responses['volumes']],
+        [lambda_function.LogGroupRecord(
+            LogGroupName=g['logGroupName'],
+            StoredBytes=g['storedBytes'],
+            RetentionInDays=g['retentionInDays']
+        ) for g in responses['log_groups']]
+    ]
+
+
+def measure(build, responses):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    rows = build(responses)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, sum(len(section) for section in rows)
+
+
+def main():
+    resource_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    responses = build_responses(resource_count)
+
+    print(f"{resource_count} resources")
+    print(f"{'variant':<16}{'rows':>10}{'retained KB':>14}{'bytes/row':>12}")
+    for name, build in (('dict rows', build_dict_rows), ('record rows', build_record_rows)):
+        retained, row_count = measure(build, responses)
+        print(f"{name:<16}{row_count:>10}{retained / 1024:>14.1f}{retained / row_count:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Compares encode time and payload size of the legacy report output against the typed encodings
+# on a synthetic 100k-resource report. Run from the repository root:
+#   python bench/bench_report_encoding.py [resource_count]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+
+import json
+import lambda_function
+
+
+def build_report(resource_count):
+    rng = random.Random(42)
+    volume_types = ['gp2', 'gp3', 'io1', 'st1', 'sc1']
+    shares = {
+        'ebs_snapshots': 0.4,
+        'ebs_volumes': 0.2,
+        'cloudwatch_logs': 0.2,
+        'ec2_instances': 0.1,
+        'lambda_functions': 0.1
+    }
+    counts = {section: int(resource_count * share) for section, share in shares.items()}
+
+    return {
+        'cost_and_usage': {
+            f"Service {i}": {
+                'monthly_expenses': {f"2025/{month:02d}": rng.uniform(10, 5000) for month in range(1, 7)},
+                'total_cost': rng.uniform(60, 30000),
+                'average_cost': rng.uniform(10, 5000)
+            } for i in range(100)
+        },
+        'computing': {
+            'ec2_instances': [{
+                'InstanceId': f"i-{i:017x}",
+                'Description': f"instance-{i}",
+                'AverageCPUUtilization': rng.uniform(0, 100)
+            } for i in range(counts['ec2_instances'])],
+            'lambda_functions': [{
+                'FunctionName': f"function-{i}",
+                'Runtime': 'python3.9',
+                'MemoryAllocated': 1024,
+                'AverageMemoryUsage': rng.uniform(50, 1024)
+            } for i in range(counts['lambda_functions'])]
+        },
+        'storage': {
+            'ebs_volumes': [{
+                'VolumeId': f"vol-{i:017x}",
+                'VolumeType': rng.choice(volume_types),
+                'SizeGB': rng.randint(1, 2000),
+                'InUse': rng.random() > 0.2,
+                'Iops': 3000,
+                'Throughput': 125,
+                'CreateTime': '01/01/2025'
+            } for i in range(counts['ebs_volumes'])],
+            'ebs_snapshots': [{
+                'SnapshotId': f"snap-{i:017x}",
+                'VolumeId': f"vol-{i % 1000:017x}",
+                'SnapshotSizeGB': rng.randint(1, 2000),
+                'VolumeSizeGB': rng.randint(1, 2000),
+                'StartTime': '01/01/2025',
+                'LifecyclePolicy': 'N/A'
+            } for i in range(counts['ebs_snapshots'])]
+        },
+        'others': {
+            'cloudwatch_logs': [{
+                'LogGroupName': f"/aws/lambda/function-{i}",
+                'StoredBytes': rng.randint(0, 10**10),
+                'RetentionInDays': rng.choice([7, 30, 'Never Expires'])
+            } for i in range(counts['cloudwatch_logs'])]
+        }
+    }
+
+
+def measure(encode, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = encode()
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(payload)
+
+
+def main():
+    resource_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    report = build_report(resource_count)
+
+    variants = [
+        ('legacy json indent=4', lambda: json.dumps(lambda_function.render_report(report), indent=4).encode('utf-8')),
+        ('legacy json compact', lambda: lambda_function.encode_report(lambda_function.render_report(report))[0]),
+        ('typed json compact', lambda: lambda_function.encode_report(lambda_function.render_report(report, typed=True))[0]),
+    ]
+    for encoding in ('msgpack', 'cbor'):
+        try:
+            lambda_function.encode_report({}, encoding)
+        except ValueError as e:
+            print(f"Skipping {encoding}: {e}")
+            continue
+        variants.append((f"typed {encoding}", lambda encoding=encoding: lambda_function.encode_report(lambda_function.render_report(report, typed=True), encoding)[0]))
+
+    print(f"{resource_count} resources")
+    print(f"{'variant':<24}{'encode ms':>12}{'size KB':>12}")
+    for name, encode in variants:
+        seconds, size = measure(encode)
+        print(f"{name:<24}{seconds * 1000:>12.1f}{size / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
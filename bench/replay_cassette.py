@@ -0,0 +1,42 @@
+# Replays a cassette recorded with {"cassette": {"mode": "record", "path": ...}} through the handler,
+# without network access or credentials, and prints the time spent in every collector.
+# Run from the repository root:
+#   python bench/replay_cassette.py <cassette.json.gz> [--latency] [collector ...]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+
+# Clients still need a region to resolve their endpoints, even though no request leaves the process
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import lambda_function
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print('usage: replay_cassette.py <cassette.json.gz> [--latency] [collector ...]')
+        sys.exit(1)
+    path = args[0]
+    latency = '--latency' in args
+    collectors = [arg for arg in args[1:] if arg != '--latency']
+
+    event = {'cassette': {'mode': 'replay', 'path': path, 'latency': latency}}
+    if collectors:
+        event['collectors'] = collectors
+
+    start = time.perf_counter()
+    report = lambda_function.lambda_handler(event, None)
+    total = time.perf_counter() - start
+
+    print(f"{'collector':<28}{'seconds':>10}")
+    for name, seconds in report['_run_stats']['CollectorSeconds'].items():
+        print(f"{name:<28}{seconds:>10.3f}")
+    print(f"{'total':<28}{total:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
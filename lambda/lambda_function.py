@@ -1,7 +1,404 @@
 
-import boto3
+import asyncio
+import base64
+import codecs
+import contextvars
+import copy
+import csv
+import gzip
+import hashlib
+import heapq
+import importlib.util
+import io
 import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
+
+# Start of the module load time reported in INIT_STATS. The standard library imports above are
+# left out of it, they take a small and steady share of the cold start.
+MODULE_LOAD_STARTED = time.perf_counter()
+
+# Maximum number of in-flight per-resource describe calls for each service
+FAN_OUT_CONCURRENCY = {
+    'dynamodb': 8,
+    'efs': 8,
+    'elbv2': 16,
+    'opensearch': 4,
+    'kinesis': 8,
+    'sqs': 16,
+    'logs': 8,
+    'sns': 16,
+}
+
+# Log group names only use these characters, so every name starts with exactly one of them
+LOG_GROUP_NAME_CHARACTERS = '#-./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+# Report key and period label format of each Cost Explorer granularity
+COST_GRANULARITIES = {
+    'MONTHLY': ('monthly_expenses', '%Y/%m'),
+    'DAILY': ('daily_expenses', '%Y-%m-%d'),
+}
+
+# Import and client construction timings, reported in the run stats of every invocation
+INIT_STATS = {
+    'ModuleLoadSeconds': 0,
+    'Boto3ImportSeconds': 0,
+    'WarmupSeconds': 0,
+    'ClientCreationSeconds': {}
+}
+
+session = None
+clients = {}
+clients_lock = threading.Lock()
+
+# Account and region of the shard a worker is running. Collectors of different shards can share the
+# process, so every client is built for the shard set in the current context.
+current_shard = contextvars.ContextVar('current_shard', default=None)
+shard_sessions = {}
+shard_sessions_lock = threading.Lock()
+
+# Collector running in the current context, state kept per collector is keyed by it
+current_collector = contextvars.ContextVar('current_collector', default=None)
+
+def get_session():
+    # boto3 is only imported once the first client is needed
+    global session
+    if session is None:
+        started = time.perf_counter()
+        import boto3
+        session = boto3.session.Session()
+        INIT_STATS['Boto3ImportSeconds'] = round(time.perf_counter() - started, 4)
+    return session
+
+def assume_shard_role(role_arn):
+    # The role is assumed with the function's own credentials, from a context without a shard
+    sts_client = contextvars.Context().run(get_client, 'sts')
+    credentials = sts_client.assume_role(
+        RoleArn=role_arn,
+        RoleSessionName='finops-data-collector'
+    )['Credentials']
+    return {
+        'access_key': credentials['AccessKeyId'],
+        'secret_key': credentials['SecretAccessKey'],
+        'token': credentials['SessionToken'],
+        'expiry_time': credentials['Expiration'].isoformat()
+    }
+
+class ShardCredentialProvider:
+    # The only credential provider of an account's session, it hands out the assumed-role credentials
+    METHOD = 'sts-assume-role'
+    CANONICAL_NAME = 'FinOpsShardRole'
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+def get_shard_session(shard):
+    # Other accounts are reached through an assumed role, one session per account. Warm containers
+    # outlive the role's credentials, so botocore assumes it again shortly before they expire and
+    # the cached clients of the account keep working. The role is first assumed when a client of
+    # the account signs its first request.
+    if not shard.get('RoleArn'):
+        return get_session()
+    account_id = shard['Account']
+    if account_id in shard_sessions:
+        return shard_sessions[account_id]
+    get_session()
+    import boto3
+    import botocore.session
+    from botocore.credentials import CredentialResolver, DeferredRefreshableCredentials
+    # Workers of the same account can get here together, only one of them builds its session
+    with shard_sessions_lock:
+        if account_id not in shard_sessions:
+            credentials = DeferredRefreshableCredentials(
+                refresh_using=partial(assume_shard_role, shard['RoleArn']),
+                method=ShardCredentialProvider.METHOD
+            )
+            botocore_session = botocore.session.get_session()
+            botocore_session.register_component('credential_provider', CredentialResolver([ShardCredentialProvider(credentials)]))
+            shard_sessions[account_id] = boto3.session.Session(botocore_session=botocore_session)
+    return shard_sessions[account_id]
+
+def get_client(service_name, region_name=None):
+    # Clients are built on first use and shared by every collector, the lock keeps the session single-threaded
+    shard = current_shard.get()
+    account_id = None
+    if shard is not None:
+        account_id = shard.get('Account')
+        region_name = region_name or shard.get('Region')
+    key = (account_id, service_name, region_name)
+    if key in clients:
+        return clients[key]
+    # The account's session has a lock of its own, so it is resolved before taking this one
+    client_session = get_shard_session(shard) if shard is not None else get_session()
+    with clients_lock:
+        if key not in clients:
+            started = time.perf_counter()
+            clients[key] = client_session.client(service_name, region_name=region_name)
+            if active_cassette is not None:
+                active_cassette.attach(clients[key])
+            if active_coalescer is not None:
+                active_coalescer.attach(clients[key], f"{account_id}:{region_name}")
+            name = service_name if region_name is None else f"{service_name}:{region_name}"
+            if account_id is not None:
+                name = f"{account_id}:{name}"
+            INIT_STATS['ClientCreationSeconds'][name] = round(time.perf_counter() - started, 4)
+        return clients[key]
+
+# Response fields holding secrets, replaced in recorded cassettes
+CASSETTE_REDACTED_FIELDS = {'AccessKeyId', 'SecretAccessKey', 'SessionToken', 'Password', 'MasterUserPassword', 'AuthToken'}
+
+active_cassette = None
+
+def encode_cassette_value(value):
+    # Datetimes, bytes and streamed bodies do not fit in JSON and are tagged so replay gets them back
+    if isinstance(value, dict):
+        return {key: '<redacted>' if key in CASSETTE_REDACTED_FIELDS else encode_cassette_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_cassette_value(item) for item in value]
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    return value
+
+def decode_cassette_value(value):
+    if isinstance(value, list):
+        return [decode_cassette_value(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    if '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    if '__stream__' in value:
+        from botocore.response import StreamingBody
+        data = base64.b64decode(value['__stream__'])
+        return StreamingBody(io.BytesIO(data), len(data))
+    return {key: decode_cassette_value(item) for key, item in value.items()}
+
+def get_cassette_key(service_name, operation_name, params):
+    # Collectors put the current time into their requests, so dates are left out of the match
+    def normalize(value):
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(item) for item in value]
+        if isinstance(value, datetime):
+            return '<datetime>'
+        if isinstance(value, str) and len(value) == 10 and value[4] == '-' and value[7] == '-' and value[:4].isdigit():
+            return '<date>'
+        return value
+    return f"{service_name}.{operation_name}:{json.dumps(normalize(params), sort_keys=True, default=str)}"
+
+class Cassette:
+    # Records the responses of every AWS call made through get_client clients, or serves them back.
+    # Replayed calls never reach the network, so they need no credentials. Calls with the same
+    # request are answered in the order they were recorded.
+
+    def __init__(self, path, mode, latency=False):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.replay_queues = {}
+        self.clients = []
+        if mode == 'replay':
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for interaction in json.load(f)['Interactions']:
+                    self.replay_queues.setdefault(interaction['Key'], []).append(interaction)
+            for queue in self.replay_queues.values():
+                queue.reverse()
+
+    def attach(self, client):
+        events = client.meta.events
+        events.register('before-parameter-build.*.*', self.keep_params, unique_id='finops-cassette-params')
+        if self.mode == 'record':
+            events.register('after-call.*.*', self.record, unique_id='finops-cassette-record')
+        else:
+            events.register('before-call.*.*', self.replay, unique_id='finops-cassette-replay')
+        self.clients.append(client)
+
+    def detach(self):
+        for client in self.clients:
+            events = client.meta.events
+            events.unregister('before-parameter-build.*.*', unique_id='finops-cassette-params')
+            events.unregister('after-call.*.*', unique_id='finops-cassette-record')
+            events.unregister('before-call.*.*', unique_id='finops-cassette-replay')
+        self.clients = []
+
+    def keep_params(self, params, model, context, **kwargs):
+        context['finops_cassette_params'] = encode_cassette_value(params)
+        context['finops_cassette_started'] = time.perf_counter()
+
+    def record(self, http_response, parsed, model, context, **kwargs):
+        seconds = time.perf_counter() - context['finops_cassette_started']
+        response = {key: value for key, value in parsed.items() if key != 'ResponseMetadata'}
+        for key, value in list(response.items()):
+            # Streamed bodies are read once for the cassette and handed back to the caller as a new stream
+            if hasattr(value, 'read') and hasattr(value, 'iter_chunks'):
+                from botocore.response import StreamingBody
+                data = value.read()
+                parsed[key] = StreamingBody(io.BytesIO(data), len(data))
+                response[key] = {'__stream__': base64.b64encode(data).decode('ascii')}
+        service_name = model.service_model.service_name
+        with self.lock:
+            self.interactions.append({
+                'Key': get_cassette_key(service_name, model.name, context.get('finops_cassette_params', {})),
+                'StatusCode': http_response.status_code,
+                'Seconds': round(seconds, 4),
+                'Response': encode_cassette_value(response)
+            })
+
+    def replay(self, model, context, **kwargs):
+        from botocore.awsrequest import AWSResponse
+        key = get_cassette_key(model.service_model.service_name, model.name, context.get('finops_cassette_params', {}))
+        with self.lock:
+            queue = self.replay_queues.get(key)
+            if not queue:
+                raise RuntimeError(f"No recorded response for {key}")
+            interaction = queue.pop()
+        if self.latency:
+            time.sleep(interaction['Seconds'])
+        parsed = decode_cassette_value(interaction['Response'])
+        parsed['ResponseMetadata'] = {'HTTPStatusCode': interaction['StatusCode'], 'HTTPHeaders': {}, 'RetryAttempts': 0}
+        return AWSResponse(None, interaction['StatusCode'], {}, None), parsed
+
+    def save(self):
+        if self.mode != 'record':
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            json.dump({'Version': 1, 'Interactions': self.interactions}, f, default=str)
+
+# Read calls that poll for progress or return a stream, never shared
+UNCOALESCED_OPERATIONS = {'GetQueryResults', 'DescribeRecommendationExportJobs', 'GetObject'}
+
+# Request and response fields carrying a page token. Pages of listings are only shared while in flight.
+PAGINATION_TOKEN_FIELDS = ('NextToken', 'nextToken', 'Marker', 'NextMarker', 'NextPageToken', 'ContinuationToken', 'NextContinuationToken')
+
+active_coalescer = None
+
+def get_coalescing_key(scope, service_name, operation_name, params):
+    # Collectors compute their time windows from the current time, so dates only count to the minute
+    def normalize(value):
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(item) for item in value]
+        if isinstance(value, datetime):
+            return value.replace(second=0, microsecond=0).isoformat()
+        return value
+    return f"{scope}:{service_name}.{operation_name}:{json.dumps(normalize(params), sort_keys=True, default=str)}"
+
+class RequestCoalescer:
+    # Shares the responses of read calls made through get_client clients for the length of a run.
+    # The first of several identical concurrent calls goes out, the others wait for its response.
+    # Responses of calls that are not pages of a listing are also kept for later identical calls,
+    # up to max_responses of them, least recently used first out. A write call drops what was kept
+    # for its client.
+
+    def __init__(self, max_responses=256):
+        self.max_responses = max_responses
+        self.lock = threading.Lock()
+        self.responses = OrderedDict()
+        self.in_flight = {}
+        self.clients = []
+        self.stats = {'Calls': 0, 'Saved': 0, 'Served': 0, 'Joined': 0}
+
+    def attach(self, client, scope):
+        events = client.meta.events
+        events.register('before-parameter-build.*.*', partial(self.keep_key, scope), unique_id='finops-coalesce-key')
+        events.register('before-call.*.*', self.serve, unique_id='finops-coalesce-serve')
+        events.register('after-call.*.*', self.keep_response, unique_id='finops-coalesce-keep')
+        events.register('after-call-error.*.*', self.release, unique_id='finops-coalesce-release')
+        self.clients.append(client)
+
+    def detach(self):
+        for client in self.clients:
+            events = client.meta.events
+            events.unregister('before-parameter-build.*.*', unique_id='finops-coalesce-key')
+            events.unregister('before-call.*.*', unique_id='finops-coalesce-serve')
+            events.unregister('after-call.*.*', unique_id='finops-coalesce-keep')
+            events.unregister('after-call-error.*.*', unique_id='finops-coalesce-release')
+        self.clients = []
+
+    def keep_key(self, scope, params, model, context, **kwargs):
+        if not model.name.startswith(('Describe', 'List', 'Get')):
+            prefix = f"{scope}:{model.service_model.service_name}."
+            with self.lock:
+                for key in [key for key in self.responses if key.startswith(prefix)]:
+                    del self.responses[key]
+            return
+        if model.name in UNCOALESCED_OPERATIONS:
+            return
+        context['finops_coalesce_key'] = get_coalescing_key(scope, model.service_model.service_name, model.name, params)
+        context['finops_coalesce_paged'] = any(field in params for field in PAGINATION_TOKEN_FIELDS)
+
+    def serve(self, model, context, **kwargs):
+        from botocore.awsrequest import AWSResponse
+        key = context.get('finops_coalesce_key')
+        if key is None:
+            return None
+        with self.lock:
+            self.stats['Calls'] += 1
+            response = self.responses.get(key)
+            waiting = self.in_flight.get(key) if response is None else None
+            if response is None and waiting is None:
+                # This call goes out and the identical ones made meanwhile wait for it
+                self.in_flight[key] = {'Event': threading.Event(), 'Response': None, 'Waiters': 0}
+                context['finops_coalesce_leader'] = True
+                return None
+            if response is not None:
+                self.responses.move_to_end(key)
+            else:
+                waiting['Waiters'] += 1
+        if waiting is not None:
+            waiting['Event'].wait(300)
+            response = waiting['Response']
+            if response is None:
+                # The call that went out failed, this one is made on its own
+                return None
+        with self.lock:
+            self.stats['Joined' if waiting is not None else 'Served'] += 1
+            self.stats['Saved'] += 1
+        return AWSResponse(None, response[0], {}, None), copy.deepcopy(response[1])
+
+    def keep_response(self, http_response, parsed, model, context, **kwargs):
+        if not context.pop('finops_coalesce_leader', False):
+            return
+        key = context['finops_coalesce_key']
+        streamed = any(hasattr(value, 'read') for value in parsed.values())
+        paged = context['finops_coalesce_paged'] or any(field in parsed for field in PAGINATION_TOKEN_FIELDS)
+        with self.lock:
+            entry = self.in_flight.pop(key)
+            if http_response.status_code < 300 and not streamed and (entry['Waiters'] or not paged):
+                # One copy is taken while the caller still holds the response, each waiter copies it again
+                entry['Response'] = (http_response.status_code, copy.deepcopy(parsed))
+                if not paged:
+                    self.responses[key] = entry['Response']
+                    while len(self.responses) > self.max_responses:
+                        self.responses.popitem(last=False)
+        entry['Event'].set()
+
+    def release(self, context, **kwargs):
+        if not context.pop('finops_coalesce_leader', False):
+            return
+        with self.lock:
+            entry = self.in_flight.pop(context['finops_coalesce_key'])
+        entry['Event'].set()
 
 def format_bytes(size_in_bytes):
     if size_in_bytes < 1024:
@@ -13,8 +410,255 @@ def format_bytes(size_in_bytes):
     else:
         return f"{size_in_bytes/1024**3:.2f} GB"
 
+def fan_out(func, items, max_concurrency=8):
+    # Run func for every item on a bounded pool driven by asyncio, results keep the input order.
+    # Each call runs in a copy of the caller's context, so the pool threads see the same shard.
+    items = list(items)
+    if not items:
+        return []
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(items))) as executor:
+            return await asyncio.gather(*[
+                loop.run_in_executor(executor, contextvars.copy_context().run, func, item) for item in items
+            ])
+
+    return asyncio.run(run_all())
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class Record:
+    # Fixed-field resource row. Slots keep the field names out of every row, enum-like values are
+    # interned so equal strings are stored once, and dates stay the datetime the API returned.
+    # Rows only become dicts when the report is rendered or serialized. Fields joined on later
+    # from other sources are kept in extra, which stays None for most rows.
+    __slots__ = ('extra',)
+    ENUM_FIELDS = ()
+    DATE_FIELDS = ()
+
+    def __init__(self, **values):
+        self.extra = None
+        for field in self.__slots__:
+            value = values[field]
+            if field in self.ENUM_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, field, value)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def to_dict(self):
+        row = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if field in self.DATE_FIELDS and isinstance(value, datetime):
+                value = value.strftime('%d/%m/%Y')
+            row[field] = value
+        if self.extra:
+            row.update(self.extra)
+        return row
+
+class Ec2InstanceRecord(Record):
+    __slots__ = ('InstanceId', 'Description', 'AverageCPUUtilization')
+
+class EbsVolumeRecord(Record):
+    __slots__ = ('VolumeId', 'VolumeType', 'SizeGB', 'InUse', 'Iops', 'Throughput', 'CreateTime')
+    ENUM_FIELDS = ('VolumeType', 'Iops', 'Throughput')
+    DATE_FIELDS = ('CreateTime',)
+
+class EbsSnapshotRecord(Record):
+    __slots__ = ('SnapshotId', 'VolumeId', 'SnapshotSizeGB', 'VolumeSizeGB', 'StartTime', 'LifecyclePolicy')
+    ENUM_FIELDS = ('VolumeId', 'VolumeSizeGB', 'LifecyclePolicy')
+    DATE_FIELDS = ('StartTime',)
+
+class LogGroupRecord(Record):
+    __slots__ = ('LogGroupName', 'StoredBytes', 'RetentionInDays')
+    ENUM_FIELDS = ('RetentionInDays',)
+
+class DynamoDBBackupRecord(Record):
+    __slots__ = ('BackupArn', 'BackupCreationDateTime', 'BackupStatus')
+    ENUM_FIELDS = ('BackupStatus',)
+    DATE_FIELDS = ('BackupCreationDateTime',)
+
+def enrich_rows(rows, entries, index_key, id_field, field, match_keys=('Account', 'Region')):
+    # Adds the first match for the row id to every row under field, without turning records into
+    # dicts. entries are (origin, index) pairs; an index only serves rows from its origin, compared
+    # on match_keys. Rows without origin fields, as in single-account runs, match any index.
+    for row in rows:
+        row_id = id_field(row) if callable(id_field) else row.get(id_field)
+        match = None
+        for origin, index in entries:
+            if any(origin.get(key) is not None and row.get(key, origin[key]) != origin[key] for key in match_keys):
+                continue
+            match = index.get(index_key, {}).get(row_id)
+            if match is not None:
+                break
+        if match is None:
+            continue
+        if isinstance(row, Record):
+            row.extra = {**(row.extra or {}), field: match}
+        else:
+            row[field] = match
+
+def to_plain(value):
+    # Records turned back into dicts, for anything that leaves the process as JSON
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
+
+def json_default(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
+
+def pascal_case_keys(value):
+    # Config items hold the describe output with camelCase keys
+    if isinstance(value, dict):
+        return {key[:1].upper() + key[1:]: pascal_case_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [pascal_case_keys(item) for item in value]
+    return value
+
+def parse_config_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if isinstance(value, str) else value
+
+def convert_config_volume(item):
+    volume = pascal_case_keys(item['configuration'])
+    volume['CreateTime'] = parse_config_time(volume['CreateTime'])
+    return volume
+
+def convert_config_queue(item):
+    return f"https://sqs.{item['awsRegion']}.amazonaws.com/{item['accountId']}/{item['resourceName']}"
+
+def convert_config_topic(item):
+    return {'TopicArn': item['arn']}
+
+# Config resource types that can stand in for a live listing, with the conversion of a Config item
+# into the item the collector gets from the describe call. EFS file systems are left out, their
+# Config items do not carry the metered size.
+INVENTORY_RESOURCE_TYPES = {
+    'AWS::EC2::Volume': convert_config_volume,
+    'AWS::EC2::EIP': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::EC2::VPC': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::EC2::Subnet': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::EC2::InternetGateway': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::EC2::NatGateway': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::EC2::RouteTable': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::EC2::TransitGateway': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::ElasticLoadBalancingV2::LoadBalancer': lambda item: pascal_case_keys(item['configuration']),
+    'AWS::SQS::Queue': convert_config_queue,
+    'AWS::SNS::Topic': convert_config_topic,
+}
+
+# Config item properties inventory filters can compare, besides any field under configuration.
+# Filter values go into the query as string literals, so they cannot hold quotes or backslashes.
+CONFIG_FILTER_FIELDS = {
+    'accountId', 'arn', 'availabilityZone', 'awsRegion', 'configurationItemStatus', 'resourceId',
+    'resourceName', 'resourceType', 'tags.key', 'tags.tag', 'tags.value', 'version'
+}
+CONFIG_FILTER_FIELD_PATTERN = r'configuration(\.[A-Za-z0-9_]+)+'
+
+def get_config_condition(field, value):
+    if field not in CONFIG_FILTER_FIELDS and not re.fullmatch(CONFIG_FILTER_FIELD_PATTERN, field):
+        raise ValueError(f"Unsupported inventory filter field: {field}")
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool) or any(character in str(value) for character in "'\\"):
+        raise ValueError(f"Unsupported inventory filter value for {field}: {value!r}")
+    return f"{field} = '{value}'"
+
+class ConfigInventory:
+    # Serves resource listings from AWS Config advanced queries, through an aggregator when one is
+    # named so a single query covers every account and region it aggregates. get_items returns None
+    # for the types Config does not record, and the collector makes its live describe call instead.
+    # Through an aggregator, the types are those it holds items of for the filters.
+
+    def __init__(self, config_client, aggregator_name=None, recorded_types=None, filters=None):
+        self.config_client = config_client
+        self.aggregator_name = aggregator_name
+        self.filters = filters or {}
+        # Unsupported filters are rejected before any query is made
+        self.get_where_clause()
+        self.lock = threading.Lock()
+        self.items = {}
+        if recorded_types is None:
+            recorded_types = self.get_aggregated_types() if aggregator_name else self.get_recorded_types()
+        self.recorded_types = None if recorded_types is None else set(recorded_types)
+
+    def get_recorded_types(self):
+        # None when the recorder records every supported type
+        recorders = self.config_client.describe_configuration_recorders()['ConfigurationRecorders']
+        if not recorders:
+            return []
+        recording_group = recorders[0].get('recordingGroup', {})
+        if recording_group.get('allSupported', True) and not recording_group.get('exclusionByResourceTypes', {}).get('resourceTypes'):
+            return None
+        if recording_group.get('allSupported', True):
+            excluded = set(recording_group['exclusionByResourceTypes']['resourceTypes'])
+            return [resource_type for resource_type in INVENTORY_RESOURCE_TYPES if resource_type not in excluded]
+        return recording_group.get('resourceTypes', [])
+
+    def get_aggregated_types(self):
+        # Types without any item are listed live, which costs one empty describe when there are none
+        pages = self.select(f"SELECT resourceType, COUNT(*){self.get_where_clause()} GROUP BY resourceType")
+        return [json.loads(result)['resourceType'] for page in pages for result in page['Results']]
+
+    def get_where_clause(self, conditions=()):
+        conditions = list(conditions) + [get_config_condition(field, value) for field, value in sorted(self.filters.items())]
+        return f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    def select(self, expression):
+        if self.aggregator_name:
+            paginator = self.config_client.get_paginator('select_aggregate_resource_config')
+            return paginator.paginate(Expression=expression, ConfigurationAggregatorName=self.aggregator_name)
+        paginator = self.config_client.get_paginator('select_resource_config')
+        return paginator.paginate(Expression=expression)
+
+    def get_items(self, resource_type):
+        if resource_type not in INVENTORY_RESOURCE_TYPES:
+            return None
+        if self.recorded_types is not None and resource_type not in self.recorded_types:
+            return None
+        with self.lock:
+            if resource_type not in self.items:
+                self.items[resource_type] = [INVENTORY_RESOURCE_TYPES[resource_type](item) for item in self.query(resource_type)]
+            return self.items[resource_type]
+
+    def query(self, resource_type):
+        where = self.get_where_clause([f"resourceType = '{resource_type}'"])
+        for page in self.select(f"SELECT resourceId, resourceName, resourceType, awsRegion, accountId, arn, configuration{where}"):
+            for result in page['Results']:
+                yield json.loads(result)
+
+def create_config_inventory(inventory_options):
+    config_client = get_client('config')
+    filters = dict(inventory_options.get('filters') or {})
+    if inventory_options.get('aggregator'):
+        # Rows are looked at further with this account's clients, so an aggregator is only asked
+        # for the caller's own account and region unless the filters name others
+        if 'accountId' not in filters:
+            shard = current_shard.get()
+            filters['accountId'] = shard['Account'] if shard and shard.get('Account') else get_client('sts').get_caller_identity()['Account']
+        filters.setdefault('awsRegion', config_client.meta.region_name)
+    return ConfigInventory(
+        config_client,
+        inventory_options.get('aggregator'),
+        inventory_options.get('recorded_types'),
+        filters
+    )
+
+def list_resources(inventory, resource_type, describe):
+    # From the Config inventory when there is one and it records the type, from the live call otherwise
+    items = inventory.get_items(resource_type) if inventory is not None else None
+    return describe() if items is None else items
+
 def get_reservation_utilization():
-    ce_client = boto3.client('ce')
+    ce_client = get_client('ce')
     today = datetime.now()
     six_months_ago = today - timedelta(days=180)
     
@@ -31,59 +675,78 @@ def get_reservation_utilization():
         print("Reservation utilization data is not available.")
         return []
 
-def get_cost_and_usage():
-    ce_client = boto3.client('ce')
-    today = datetime.now()
-    six_months_ago = today - timedelta(days=180)
+def query_cost_matrix(ce_client, start, end, granularity='MONTHLY', group_by=({'Type': 'DIMENSION', 'Key': 'SERVICE'},), metric='UnblendedCost', cost_filter=None):
+    # Follows every page of get_cost_and_usage and adds each group's amount into a row of one float
+    # per period, so only the running matrix is held, never the pages
+    if not 1 <= len(group_by) <= 2:
+        raise ValueError("Cost queries group by one or two dimensions or tags")
+    params = {
+        'TimePeriod': {'Start': start.strftime('%Y-%m-%d'), 'End': end.strftime('%Y-%m-%d')},
+        'Granularity': granularity,
+        'Metrics': [metric],
+        'GroupBy': list(group_by)
+    }
+    if cost_filter:
+        params['Filter'] = cost_filter
     
-    response = ce_client.get_cost_and_usage(
-        TimePeriod={
-            'Start': six_months_ago.strftime('%Y-%m-%d'),
-            'End': today.strftime('%Y-%m-%d')
-        },
-        Granularity='MONTHLY',
-        Metrics=['UnblendedCost'],
-        GroupBy=[
-            {
-                'Type': 'DIMENSION',
-                'Key': 'SERVICE'
-            }
-        ]
-    )
+    period_index = {}
+    rows = {}
+    while True:
+        response = ce_client.get_cost_and_usage(**params)
+        for result in response['ResultsByTime']:
+            period = period_index.setdefault(result['TimePeriod']['Start'], len(period_index))
+            for group in result['Groups']:
+                row = rows.get(tuple(group['Keys']))
+                if row is None:
+                    row = rows[tuple(group['Keys'])] = array('d')
+                if len(row) <= period:
+                    row.extend([0.0] * (period + 1 - len(row)))
+                row[period] += float(group['Metrics'][metric]['Amount'])
+        if not response.get('NextPageToken'):
+            break
+        params['NextPageToken'] = response['NextPageToken']
     
-    results = response['ResultsByTime']
+    return {
+        'Periods': list(period_index),
+        'Rows': rows
+    }
+
+def get_cost_and_usage(group_by=None, granularity='MONTHLY', lookback_days=180, metric='UnblendedCost', min_total_cost=10):
+    ce_client = get_client('ce')
+    today = datetime.now()
+    expenses_key, period_format = COST_GRANULARITIES[granularity]
+    matrix = query_cost_matrix(
+        ce_client,
+        today - timedelta(days=lookback_days),
+        today,
+        granularity,
+        group_by or ({'Type': 'DIMENSION', 'Key': 'SERVICE'},),
+        metric
+    )
+    periods = [datetime.strptime(period, '%Y-%m-%d').strftime(period_format) for period in matrix['Periods']]
     
-    services_data = {}
+    # The threshold only applies to each group's total, once every period has been added up
+    costs_data = {}
+    for keys, row in matrix['Rows'].items():
+        total_cost = sum(row)
+        if total_cost <= min_total_cost:
+            continue
+        expenses = {periods[period]: cost for period, cost in enumerate(row) if cost}
+        parent = costs_data
+        for key in keys[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[keys[-1]] = {
+            expenses_key: expenses,
+            'total_cost': total_cost,
+            'average_cost': total_cost / len(expenses) if expenses else 0
+        }
     
-    for result in results:
-        month_start_date = datetime.strptime(result['TimePeriod']['Start'], '%Y-%m-%d')
-        month = month_start_date.strftime('%Y/%m')
-        for group in result['Groups']:
-            service_name = group['Keys'][0]
-            cost = float(group['Metrics']['UnblendedCost']['Amount'])
-            
-            if cost > 10: # Apply the $10 filter here
-                if service_name not in services_data:
-                    services_data[service_name] = {
-                        'monthly_expenses': {},
-                        'total_cost': 0,
-                        'average_cost': 0
-                    }
-                
-                services_data[service_name]['monthly_expenses'][month] = f"{cost:.2f}"
-            
-    for service_name, data in services_data.items():
-        total_cost = sum(float(c) for c in data['monthly_expenses'].values())
-        average_cost = total_cost / len(data['monthly_expenses']) if data['monthly_expenses'] else 0
-        services_data[service_name]['total_cost'] = f"{total_cost:.2f}"
-        services_data[service_name]['average_cost'] = f"{average_cost:.2f}"
-        
-    return services_data
+    return costs_data
 
 def get_running_ec2_instances():
-    ec2_client = boto3.client('ec2')
-    optimizer_client = boto3.client('compute-optimizer')
-    sts_client = boto3.client('sts')
+    ec2_client = get_client('ec2')
+    optimizer_client = get_client('compute-optimizer')
+    sts_client = get_client('sts')
     
     # Get account ID and region
     account_id = sts_client.get_caller_identity()['Account']
@@ -135,73 +798,271 @@ def get_running_ec2_instances():
             
     return instances
 
-def get_cpu_utilization(instance_id):
-    cw_client = boto3.client('cloudwatch')
-    today = datetime.now()
-    seven_days_ago = today - timedelta(days=7)
+def get_cpu_utilizations(instance_ids):
+    # Average CPU of every instance over the last 7 days, in bulk
+    cw_client = get_client('cloudwatch')
+    queries = [{
+        'Id': f"i{index}",
+        'MetricStat': {
+            'Metric': {
+                'Namespace': 'AWS/EC2',
+                'MetricName': 'CPUUtilization',
+                'Dimensions': [
+                    {
+                        'Name': 'InstanceId',
+                        'Value': instance_id
+                    }
+                ]
+            },
+            'Period': 604800, # 7 days
+            'Stat': 'Average'
+        },
+        'ReturnData': True
+    } for index, instance_id in enumerate(instance_ids)]
     
-    response = cw_client.get_metric_data(
-        MetricDataQueries=[
-            {
-                'Id': 'cpu_utilization',
-                'MetricStat': {
-                    'Metric': {
-                        'Namespace': 'AWS/EC2',
-                        'MetricName': 'CPUUtilization',
-                        'Dimensions': [
-                            {
-                                'Name': 'InstanceId',
-                                'Value': instance_id
-                            }
-                        ]
-                    },
-                    'Period': 604800, # 7 days
-                    'Stat': 'Average'
-                },
-                'ReturnData': True
-            }
-        ],
-        StartTime=seven_days_ago,
-        EndTime=today
-    )
+    values = get_metric_values(cw_client, queries)
+    
+    utilizations = {}
+    for index, instance_id in enumerate(instance_ids):
+        instance_values = values.get(f"i{index}", [])
+        utilizations[instance_id] = sum(instance_values) / len(instance_values) if instance_values else 0
+    return utilizations
+
+def get_ec2_instances_data():
+    running_instances = get_running_ec2_instances()
+    cpu_utilizations = get_cpu_utilizations([instance['InstanceId'] for instance in running_instances])
+    
+    ec2_instances_data = []
+    for instance in running_instances:
+        ec2_instances_data.append(Ec2InstanceRecord(
+            InstanceId=instance['InstanceId'],
+            Description=instance['Description'],
+            AverageCPUUtilization=cpu_utilizations[instance['InstanceId']]
+        ))
+        
+    return ec2_instances_data
+
+# Compute Optimizer export jobs: the operation starting them and the resource type they are listed
+# under, the fields exported, the CSV column holding the resource id and how the id is read from it,
+# and the report fields built from the CSV columns of the top-ranked option
+COMPUTE_OPTIMIZER_EXPORTS = {
+    'EC2Instances': {
+        'operation': 'export_ec2_instance_recommendations',
+        'resource_type': 'Ec2Instance',
+        'file_name': 'ec2_instances',
+        'fields': ['AccountId', 'InstanceArn', 'Finding', 'CurrentInstanceType', 'RecommendationOptionsInstanceType', 'RecommendationOptionsEstimatedMonthlySavingsValue'],
+        'id_column': 'instanceArn',
+        'columns': {
+            'Finding': 'finding',
+            'CurrentInstanceType': 'currentInstanceType',
+            'RecommendedInstanceType': 'recommendationOptions_1_instanceType',
+            'EstimatedMonthlySavings': 'recommendationOptions_1_estimatedMonthlySavings_value'
+        }
+    },
+    'EBSVolumes': {
+        'operation': 'export_ebs_volume_recommendations',
+        'resource_type': 'EbsVolume',
+        'file_name': 'ebs_volumes',
+        'fields': ['AccountId', 'VolumeArn', 'Finding', 'CurrentConfigurationVolumeType', 'CurrentConfigurationVolumeSize', 'RecommendationOptionsConfigurationVolumeType', 'RecommendationOptionsConfigurationVolumeSize', 'RecommendationOptionsEstimatedMonthlySavingsValue'],
+        'id_column': 'volumeArn',
+        'columns': {
+            'Finding': 'finding',
+            'RecommendedVolumeType': 'recommendationOptions_1_configuration_volumeType',
+            'RecommendedVolumeSize': 'recommendationOptions_1_configuration_volumeSize',
+            'EstimatedMonthlySavings': 'recommendationOptions_1_estimatedMonthlySavings_value'
+        }
+    },
+    'LambdaFunctions': {
+        'operation': 'export_lambda_function_recommendations',
+        'resource_type': 'LambdaFunction',
+        'file_name': 'lambda_functions',
+        'fields': ['AccountId', 'FunctionArn', 'FunctionVersion', 'Finding', 'RecommendationOptionsConfigurationMemorySize', 'RecommendationOptionsEstimatedMonthlySavingsValue'],
+        'id_column': 'functionArn',
+        'columns': {
+            'Finding': 'finding',
+            'RecommendedMemorySize': 'recommendationOptions_1_configuration_memorySize',
+            'EstimatedMonthlySavings': 'recommendationOptions_1_estimatedMonthlySavings_value'
+        }
+    },
+    'AutoScalingGroups': {
+        'operation': 'export_auto_scaling_group_recommendations',
+        'resource_type': 'AutoScalingGroup',
+        'file_name': 'auto_scaling_groups',
+        'fields': ['AccountId', 'AutoScalingGroupArn', 'AutoScalingGroupName', 'Finding', 'CurrentConfigurationInstanceType', 'RecommendationOptionsConfigurationInstanceType', 'RecommendationOptionsEstimatedMonthlySavingsValue'],
+        'id_column': 'autoScalingGroupName',
+        'columns': {
+            'Finding': 'finding',
+            'CurrentInstanceType': 'currentConfiguration_instanceType',
+            'RecommendedInstanceType': 'recommendationOptions_1_configuration_instanceType',
+            'EstimatedMonthlySavings': 'recommendationOptions_1_estimatedMonthlySavings_value'
+        }
+    },
+}
+
+def get_compute_optimizer_resource_id(resource_type, value):
+    if resource_type == 'LambdaFunctions':
+        # arn:aws:lambda:<region>:<account>:function:<name>[:<version>]
+        return value.split(':')[6]
+    return value.split('/')[-1]
+
+def find_running_compute_optimizer_export(optimizer_client, resource_type):
+    response = optimizer_client.describe_recommendation_export_jobs(filters=[
+        {'name': 'ResourceType', 'values': [COMPUTE_OPTIMIZER_EXPORTS[resource_type]['resource_type']]},
+        {'name': 'JobStatus', 'values': ['Queued', 'InProgress']}
+    ])
+    jobs = response['recommendationExportJobs']
+    return jobs[0]['jobId'] if jobs else None
+
+def start_compute_optimizer_exports(optimizer_client, bucket, key_prefix, resource_types):
+    # Returns {resource type: job id}. Compute Optimizer runs one export job per resource type at a
+    # time, a job already running for a type is waited for instead of a new one.
+    job_ids = {}
+    for resource_type in resource_types:
+        export = COMPUTE_OPTIMIZER_EXPORTS[resource_type]
+        try:
+            response = getattr(optimizer_client, export['operation'])(
+                fieldsToExport=export['fields'],
+                s3DestinationConfig={'bucket': bucket, 'keyPrefix': f"{key_prefix}{export['file_name']}"},
+                fileFormat='Csv'
+            )
+            job_ids[resource_type] = response['jobId']
+        except optimizer_client.exceptions.LimitExceededException:
+            job_id = find_running_compute_optimizer_export(optimizer_client, resource_type)
+            if job_id:
+                job_ids[resource_type] = job_id
+            else:
+                print(f"Compute Optimizer would not start an export of {resource_type}, skipping it.")
+    return job_ids
+
+def wait_for_compute_optimizer_exports(optimizer_client, job_ids, poll_seconds, max_wait_seconds):
+    # Returns {resource type: S3 key of the exported CSV} for the jobs that completed in time and
+    # {resource type: job id} for the jobs still running. With no time to wait the jobs are looked up once.
+    resource_types = {job_id: resource_type for resource_type, job_id in job_ids.items()}
+    export_keys = {}
+    deadline = time.monotonic() + max_wait_seconds
+    while resource_types:
+        response = optimizer_client.describe_recommendation_export_jobs(jobIds=list(resource_types))
+        for job in response['recommendationExportJobs']:
+            if job['status'] == 'Complete':
+                export_keys[resource_types.pop(job['jobId'])] = job['destination']['s3']['key']
+            elif job['status'] == 'Failed':
+                print(f"Compute Optimizer export of {resource_types.pop(job['jobId'])} failed: {job.get('failureReason')}")
+        if resource_types and time.monotonic() + poll_seconds > deadline:
+            print(f"Compute Optimizer exports still running after {max_wait_seconds}s: {', '.join(resource_types.values())}")
+            break
+        if resource_types:
+            time.sleep(poll_seconds)
+    return export_keys, {resource_type: job_id for job_id, resource_type in resource_types.items()}
+
+def read_compute_optimizer_export(s3_client, bucket, key, resource_type):
+    # The CSV is parsed row by row straight off the S3 stream, only the id-keyed findings are kept
+    export = COMPUTE_OPTIMIZER_EXPORTS[resource_type]
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    findings = {}
+    for row in csv.DictReader(codecs.getreader('utf-8')(body)):
+        resource_id = get_compute_optimizer_resource_id(resource_type, row[export['id_column']])
+        finding = {}
+        for field, column in export['columns'].items():
+            value = row.get(column) or None
+            if value is not None and field == 'EstimatedMonthlySavings':
+                value = float(value)
+            finding[field] = value
+        findings[resource_id] = finding
+    return findings
+
+def get_compute_optimizer_export_keys(optimizer_client, bucket, key_prefix, resource_types, poll_seconds, max_wait_seconds, exports, max_export_age):
+    # exports holds {resource type: {'JobId', 'Key', 'CompletedAt'}} from earlier runs and is updated
+    # in place. Jobs left running are looked up again instead of started anew, and a new job is only
+    # started once the last completed export is older than max_export_age.
+    now = time.time()
+    job_ids = {resource_type: export['JobId'] for resource_type, export in exports.items() if export.get('JobId')}
+    expired_types = [
+        resource_type for resource_type in resource_types
+        if resource_type not in job_ids and now - exports.get(resource_type, {}).get('CompletedAt', 0) > max_export_age
+    ]
+    job_ids.update(start_compute_optimizer_exports(optimizer_client, bucket, key_prefix, expired_types))
+    
+    completed_keys, running_job_ids = wait_for_compute_optimizer_exports(optimizer_client, job_ids, poll_seconds, max_wait_seconds)
+    for resource_type in job_ids:
+        export = exports.setdefault(resource_type, {})
+        export.pop('JobId', None)
+        if resource_type in completed_keys:
+            export.update({'Key': completed_keys[resource_type], 'CompletedAt': now})
+        elif resource_type in running_job_ids:
+            export['JobId'] = running_job_ids[resource_type]
+    # Until a new export completes, the last one is read
+    return {
+        resource_type: exports[resource_type]['Key']
+        for resource_type in resource_types if exports.get(resource_type, {}).get('Key')
+    }
+
+def get_compute_optimizer_data(bucket, key_prefix='compute-optimizer/', resource_types=tuple(COMPUTE_OPTIMIZER_EXPORTS), poll_seconds=10, max_wait_seconds=60, export_keys=None, stand_in_path=None, store=None, max_export_age=86400, checkpoint=None):
+    # With export_keys, CSVs already in the bucket are read instead of starting new export jobs.
+    # stand_in_path reads them from a local directory laid out as <path>/<bucket>/<key>.
+    # The export jobs of each account and region are kept in the store between runs, /tmp by default,
+    # so jobs still running when the wait ends are read by a later run. The wait never runs past the
+    # checkpoint deadline.
+    s3_client = LocalS3Client(stand_in_path) if stand_in_path else get_client('s3')
+    if export_keys is None:
+        optimizer_client = get_client('compute-optimizer')
+        export_store = create_store(store or {})
+        shard = current_shard.get()
+        account_id = shard.get('Account') if shard is not None else 'default'
+        exports_key = f"compute-optimizer/{account_id}/{optimizer_client.meta.region_name}.json"
+        data = export_store.get(exports_key)
+        exports = json.loads(data) if data is not None else {}
+        if checkpoint is not None and checkpoint.deadline is not None:
+            max_wait_seconds = max(0, min(max_wait_seconds, checkpoint.deadline - time.monotonic()))
+        export_keys = get_compute_optimizer_export_keys(
+            optimizer_client, bucket, key_prefix, resource_types, poll_seconds, max_wait_seconds, exports, max_export_age
+        )
+        export_store.put(exports_key, json.dumps(exports).encode('utf-8'))
     
-    if response['MetricDataResults'][0]['Values']:
-        return sum(response['MetricDataResults'][0]['Values']) / len(response['MetricDataResults'][0]['Values'])
-    return 0
+    findings = {
+        resource_type: read_compute_optimizer_export(s3_client, bucket, key, resource_type)
+        for resource_type, key in export_keys.items()
+    }
+    auto_scaling_groups = [
+        {'AutoScalingGroupName': name, **finding}
+        for name, finding in sorted(findings.pop('AutoScalingGroups', {}).items())
+    ]
+    return {
+        'Findings': findings,
+        'AutoScalingGroups': auto_scaling_groups
+    }
 
-def get_ebs_volumes():
-    ec2_client = boto3.client('ec2')
-    response = ec2_client.describe_volumes()
+def get_ebs_volumes(inventory=None):
+    ec2_client = get_client('ec2')
     
     volumes = []
-    for volume in response['Volumes']:
+    for volume in list_resources(inventory, 'AWS::EC2::Volume', lambda: ec2_client.describe_volumes()['Volumes']):
         in_use = False
         if volume['Attachments']:
             in_use = True
             
-        volumes.append({
-            'VolumeId': volume['VolumeId'],
-            'VolumeType': volume['VolumeType'],
-            'SizeGB': volume['Size'],
-            'InUse': in_use,
-            'Iops': volume.get('Iops', 'N/A'),
-            'Throughput': volume.get('Throughput', 'N/A'),
-            'CreateTime': volume['CreateTime'].strftime('%d/%m/%Y')
-        })
+        volumes.append(EbsVolumeRecord(
+            VolumeId=volume['VolumeId'],
+            VolumeType=volume['VolumeType'],
+            SizeGB=volume['Size'],
+            InUse=in_use,
+            Iops=volume.get('Iops', 'N/A'),
+            Throughput=volume.get('Throughput', 'N/A'),
+            CreateTime=volume['CreateTime']
+        ))
         
     return volumes
 
-def get_ebs_snapshots():
-    ec2_client = boto3.client('ec2')
-    dlm_client = boto3.client('dlm')
+def get_ebs_snapshots(checkpoint=None):
+    ec2_client = get_client('ec2')
+    dlm_client = get_client('dlm')
 
     # Get all lifecycle policies
     lifecycle_policies = dlm_client.get_lifecycle_policies()['Policies']
 
-    response = ec2_client.describe_snapshots(OwnerIds=['self'])
-    
     snapshots = []
-    for snapshot in response['Snapshots']:
+    paginator = ec2_client.get_paginator('describe_snapshots')
+    snapshot_pages = paginate_with_checkpoint(paginator, checkpoint, 'ebs_snapshots', snapshots, OwnerIds=['self'])
+    for snapshot in (snapshot for page in snapshot_pages for snapshot in page['Snapshots']):
         volume_id = snapshot.get('VolumeId', 'N/A')
         volume_size = 'N/A'
         if volume_id != 'N/A':
@@ -227,49 +1088,45 @@ def get_ebs_snapshots():
                     if lifecycle_policy != 'N/A':
                         break
 
-        snapshots.append({
-            'SnapshotId': snapshot['SnapshotId'],
-            'VolumeId': volume_id,
-            'SnapshotSizeGB': snapshot['VolumeSize'],
-            'VolumeSizeGB': volume_size,
-            'StartTime': snapshot['StartTime'].strftime('%d/%m/%Y'),
-            'LifecyclePolicy': lifecycle_policy
-        })
+        snapshots.append(EbsSnapshotRecord(
+            SnapshotId=snapshot['SnapshotId'],
+            VolumeId=volume_id,
+            SnapshotSizeGB=snapshot['VolumeSize'],
+            VolumeSizeGB=volume_size,
+            StartTime=snapshot['StartTime'],
+            LifecyclePolicy=lifecycle_policy
+        ))
         
     return snapshots
 
 def get_s3_data():
-    s3_client = boto3.client('s3')
-    cw_client = boto3.client('cloudwatch')
+    s3_client = get_client('s3')
+    cw_client = get_client('cloudwatch')
     
     buckets_data = []
     
     response = s3_client.list_buckets()
     
+    # Bucket sizes are published once a day, every bucket goes in one bulk query and the latest day wins
+    try:
+        bucket_sizes = get_metric_series(cw_client, 'AWS/S3', [
+            (bucket['Name'], 'BucketSizeBytes', [
+                {'Name': 'BucketName', 'Value': bucket['Name']},
+                {'Name': 'StorageType', 'Value': 'StandardStorage'}
+            ]) for bucket in response['Buckets']
+        ], period=86400, days=2, cache_period=86400)
+    except Exception as e:
+        print(f"Could not get bucket sizes: {e}")
+        bucket_sizes = None
+    
     for bucket in response['Buckets']:
         bucket_name = bucket['Name']
         
         # Get bucket size
-        try:
-            bucket_size_bytes = 0
-            paginator = cw_client.get_paginator('list_metrics')
-            for page in paginator.paginate(Namespace='AWS/S3', MetricName='BucketSizeBytes', Dimensions=[{'Name':'BucketName', 'Value':bucket_name},{'Name':'StorageType', 'Value':'StandardStorage'}]):
-                if page['Metrics']:
-                    response = cw_client.get_metric_statistics(
-                        Namespace='AWS/S3',
-                        MetricName='BucketSizeBytes',
-                        Dimensions=page['Metrics'][0]['Dimensions'],
-                        StartTime=datetime.now() - timedelta(days=2),
-                        EndTime=datetime.now(),
-                        Period=86400,
-                        Statistics=['Average']
-                    )
-                    if response['Datapoints']:
-                        bucket_size_bytes = response['Datapoints'][0]['Average']
-                        break
-            bucket_size_mb = round(bucket_size_bytes / (1024 * 1024), 2) if bucket_size_bytes != 'N/A' else 'N/A'
-        except Exception as e:
-            print(f"Could not get size for bucket {bucket_name}: {e}")
+        if bucket_sizes is not None:
+            bucket_size_bytes = bucket_sizes[bucket_name][-1] if bucket_sizes[bucket_name] else 0
+            bucket_size_mb = round(bucket_size_bytes / (1024 * 1024), 2)
+        else:
             bucket_size_mb = 'N/A'
 
         # Get lifecycle policy
@@ -313,45 +1170,29 @@ def get_s3_data():
         
     return buckets_data
 
-def get_network_topology():
-    ec2_client = boto3.client('ec2')
-    cw_client = boto3.client('cloudwatch')
+def get_network_topology(inventory=None):
+    ec2_client = get_client('ec2')
+    cw_client = get_client('cloudwatch')
 
-    vpcs = ec2_client.describe_vpcs()['Vpcs']
-    subnets = ec2_client.describe_subnets()['Subnets']
-    internet_gateways = ec2_client.describe_internet_gateways()['InternetGateways']
-    nat_gateways = ec2_client.describe_nat_gateways()['NatGateways']
-    transit_gateways = ec2_client.describe_transit_gateways()['TransitGateways']
-    route_tables = ec2_client.describe_route_tables()['RouteTables']
+    vpcs = list_resources(inventory, 'AWS::EC2::VPC', lambda: ec2_client.describe_vpcs()['Vpcs'])
+    subnets = list_resources(inventory, 'AWS::EC2::Subnet', lambda: ec2_client.describe_subnets()['Subnets'])
+    internet_gateways = list_resources(inventory, 'AWS::EC2::InternetGateway', lambda: ec2_client.describe_internet_gateways()['InternetGateways'])
+    nat_gateways = list_resources(inventory, 'AWS::EC2::NatGateway', lambda: ec2_client.describe_nat_gateways()['NatGateways'])
+    transit_gateways = list_resources(inventory, 'AWS::EC2::TransitGateway', lambda: ec2_client.describe_transit_gateways()['TransitGateways'])
+    route_tables = list_resources(inventory, 'AWS::EC2::RouteTable', lambda: ec2_client.describe_route_tables()['RouteTables'])
 
     vpc_data = []
     lost_nat_gateways = []
 
-    today = datetime.now()
-    seven_days_ago = today - timedelta(days=7)
+    # BytesOutAndIn of every NAT gateway over the last 7 days, the finer sums add up to the weekly one
+    nat_gateway_bytes = get_metric_series(cw_client, 'AWS/NATGateway', [
+        (nat_gateway['NatGatewayId'], 'BytesOutAndIn', [{'Name': 'NatGatewayId', 'Value': nat_gateway['NatGatewayId']}])
+        for nat_gateway in nat_gateways
+    ], stat='Sum')
 
     for nat_gateway in nat_gateways:
         nat_gateway_id = nat_gateway['NatGatewayId']
-        
-        # Get BytesOutAndIn metric for the last 7 days
-        response = cw_client.get_metric_statistics(
-            Namespace='AWS/NATGateway',
-            MetricName='BytesOutAndIn',
-            Dimensions=[
-                {
-                    'Name': 'NatGatewayId',
-                    'Value': nat_gateway_id
-                }
-            ],
-            StartTime=seven_days_ago,
-            EndTime=today,
-            Period=604800, # 7 days
-            Statistics=['Sum']
-        )
-        
-        total_bytes = 0
-        if response['Datapoints']:
-            total_bytes = response['Datapoints'][0]['Sum']
+        total_bytes = sum(nat_gateway_bytes[nat_gateway_id])
         
         # Consider NAT Gateway lost if total bytes is very low (e.g., < 1KB)
         if total_bytes < 1024: # 1KB threshold
@@ -359,7 +1200,7 @@ def get_network_topology():
                 'NatGatewayId': nat_gateway_id,
                 'State': nat_gateway['State'],
                 'VpcId': nat_gateway['VpcId'],
-                'TotalBytesOutAndInLast7Days': f"{total_bytes:.2f} bytes"
+                'TotalBytesOutAndInLast7Days': total_bytes
             })
 
     for vpc in vpcs:
@@ -424,9 +1265,9 @@ def get_network_topology():
     }
 
 def get_eks_data():
-    eks_client = boto3.client('eks')
-    ec2_client = boto3.client('ec2')
-    cw_client = boto3.client('cloudwatch')
+    eks_client = get_client('eks')
+    ec2_client = get_client('ec2')
+    cw_client = get_client('cloudwatch')
 
     clusters_data = []
 
@@ -467,36 +1308,22 @@ def get_eks_data():
                             is_karpenter_node = True
                             uses_karpenter = True
                             break
-                    
-                    # Get memory utilization
-                    today = datetime.now()
-                    start_time = today - timedelta(minutes=5)
-                    
-                    memory_utilization_response = cw_client.get_metric_statistics(
-                        Namespace='CWAgent',
-                        MetricName='MemoryUtilization',
-                        Dimensions=[
-                            {
-                                'Name': 'InstanceId',
-                                'Value': instance['InstanceId']
-                            }
-                        ],
-                        StartTime=start_time,
-                        EndTime=today,
-                        Period=300,
-                        Statistics=['Average']
-                    )
-                    
-                    avg_memory_utilization = 0
-                    if memory_utilization_response['Datapoints']:
-                        avg_memory_utilization = memory_utilization_response['Datapoints'][0]['Average']
 
                     nodes.append({
                         'InstanceId': instance['InstanceId'],
                         'InstanceType': instance['InstanceType'],
                         'IsKarpenterNode': is_karpenter_node,
-                        'AverageMemoryUtilization': f"{avg_memory_utilization:.2f}%"
+                        'AverageMemoryUtilization': 0
                     })
+            
+            # Memory utilization of the last complete 5 minutes, every node of the cluster in one bulk query
+            memory_utilizations = get_metric_series(cw_client, 'CWAgent', [
+                (node['InstanceId'], 'MemoryUtilization', [{'Name': 'InstanceId', 'Value': node['InstanceId']}])
+                for node in nodes
+            ], period=300, days=300 / 86400, cache_period=300)
+            for node in nodes:
+                node_values = memory_utilizations[node['InstanceId']]
+                node['AverageMemoryUtilization'] = node_values[-1] if node_values else 0
         except Exception as e:
             print(f"Could not get nodes for cluster {cluster_name}: {e}")
 
@@ -511,269 +1338,420 @@ def get_eks_data():
 
     return clusters_data
 
+def get_rds_snapshot_index(rds_client):
+    # Index instance and Aurora cluster snapshots by their source identifier in one pass per API
+    snapshot_index = {
+        'Instance': {},
+        'Cluster': {}
+    }
+    
+    sources = [
+        ('Instance', 'describe_db_snapshots', 'DBSnapshots', 'DBInstanceIdentifier', 'DBSnapshotIdentifier'),
+        ('Cluster', 'describe_db_cluster_snapshots', 'DBClusterSnapshots', 'DBClusterIdentifier', 'DBClusterSnapshotIdentifier')
+    ]
+    for owner_type, operation, result_key, owner_key, snapshot_key in sources:
+        paginator = rds_client.get_paginator(operation)
+        for page in paginator.paginate():
+            for s in page[result_key]:
+                owner = snapshot_index[owner_type].setdefault(s[owner_key], {
+                    'Snapshots': [],
+                    'AllocatedStorageGB': 0
+                })
+                owner['Snapshots'].append({
+                    'SnapshotId': s[snapshot_key],
+                    'SnapshotType': s.get('SnapshotType', 'N/A'),
+                    'SnapshotCreateTime': s['SnapshotCreateTime'].strftime('%d/%m/%Y') if 'SnapshotCreateTime' in s else 'N/A',
+                    'AllocatedStorageGB': s.get('AllocatedStorage', 0),
+                    'Encrypted': s.get('StorageEncrypted', s.get('Encrypted', False))
+                })
+                owner['AllocatedStorageGB'] += s.get('AllocatedStorage', 0)
+    
+    return snapshot_index
+
 def get_rds_data():
-    rds_client = boto3.client('rds')
-    cw_client = boto3.client('cloudwatch')
+    rds_client = get_client('rds')
+    cw_client = get_client('cloudwatch')
     
     db_instances_data = []
     
+    snapshot_index = get_rds_snapshot_index(rds_client)
+    live_sources = {
+        'Instance': set(),
+        'Cluster': set()
+    }
+    
+    paginator = rds_client.get_paginator('describe_db_clusters')
+    for page in paginator.paginate():
+        for db_cluster in page['DBClusters']:
+            live_sources['Cluster'].add(db_cluster['DBClusterIdentifier'])
+    
+    db_instances = []
     paginator = rds_client.get_paginator('describe_db_instances')
     for page in paginator.paginate():
-        for db_instance in page['DBInstances']:
-            db_instance_id = db_instance['DBInstanceIdentifier']
-            
-            # Get CPU Utilization
-            today = datetime.now()
-            seven_days_ago = today - timedelta(days=7)
-            
-            response = cw_client.get_metric_data(
-                MetricDataQueries=[
-                    {
-                        'Id': 'cpu_utilization',
-                        'MetricStat': {
-                            'Metric': {
-                                'Namespace': 'AWS/RDS',
-                                'MetricName': 'CPUUtilization',
-                                'Dimensions': [
-                                    {
-                                        'Name': 'DBInstanceIdentifier',
-                                        'Value': db_instance_id
-                                    }
-                                ]
-                            },
-                            'Period': 604800, # 7 days
-                            'Stat': 'Average'
-                        },
-                        'ReturnData': True
-                    }
-                ],
-                StartTime=seven_days_ago,
-                EndTime=today
-            )
-            
-            avg_cpu = 0
-            if response['MetricDataResults'][0]['Values']:
-                avg_cpu = sum(response['MetricDataResults'][0]['Values']) / len(response['MetricDataResults'][0]['Values'])
-
-            # Get Snapshots
-            snapshots_response = rds_client.describe_db_snapshots(DBInstanceIdentifier=db_instance_id)
-            snapshots = [{
-                'SnapshotId': s['DBSnapshotIdentifier'],
-                'SnapshotCreateTime': s['SnapshotCreateTime'].strftime('%d/%m/%Y'),
-                'Encrypted': s['Encrypted']
-            } for s in snapshots_response['DBSnapshots']]
-
-            db_instances_data.append({
-                'DBInstanceIdentifier': db_instance_id,
-                'DBInstanceClass': db_instance['DBInstanceClass'],
-                'Engine': db_instance['Engine'],
-                'DBInstanceStatus': db_instance['DBInstanceStatus'],
-                'MultiAZ': db_instance['MultiAZ'],
-                'BackupRetentionPeriod': db_instance['BackupRetentionPeriod'],
-                'AverageCPUUtilization': f"{avg_cpu:.2f}%",
-                'Snapshots': snapshots
+        db_instances.extend(page['DBInstances'])
+    
+    # CPU Utilization of every instance over the last 7 days, in bulk
+    cpu_utilizations = get_metric_series(cw_client, 'AWS/RDS', [
+        (db_instance['DBInstanceIdentifier'], 'CPUUtilization', [{'Name': 'DBInstanceIdentifier', 'Value': db_instance['DBInstanceIdentifier']}])
+        for db_instance in db_instances
+    ])
+    
+    for db_instance in db_instances:
+        db_instance_id = db_instance['DBInstanceIdentifier']
+        live_sources['Instance'].add(db_instance_id)
+        avg_cpu = get_average(cpu_utilizations[db_instance_id])
+
+        # Snapshots come from the account-wide index, Aurora members report their cluster's snapshots
+        snapshots = snapshot_index['Instance'].get(db_instance_id, {}).get('Snapshots', [])
+        if 'DBClusterIdentifier' in db_instance:
+            snapshots = snapshots + snapshot_index['Cluster'].get(db_instance['DBClusterIdentifier'], {}).get('Snapshots', [])
+
+        db_instances_data.append({
+            'DBInstanceIdentifier': db_instance_id,
+            'DBInstanceClass': db_instance['DBInstanceClass'],
+            'Engine': db_instance['Engine'],
+            'DBInstanceStatus': db_instance['DBInstanceStatus'],
+            'MultiAZ': db_instance['MultiAZ'],
+            'BackupRetentionPeriod': db_instance['BackupRetentionPeriod'],
+            'DBClusterIdentifier': db_instance.get('DBClusterIdentifier', 'N/A'),
+            'AverageCPUUtilization': avg_cpu,
+            'Snapshots': snapshots
+        })
+    
+    snapshot_storage = []
+    orphaned_snapshots = []
+    for owner_type in ('Instance', 'Cluster'):
+        for source_id, owner in sorted(snapshot_index[owner_type].items()):
+            source_exists = source_id in live_sources[owner_type]
+            snapshot_storage.append({
+                'SourceType': owner_type,
+                'SourceIdentifier': source_id,
+                'SourceExists': source_exists,
+                'SnapshotCount': len(owner['Snapshots']),
+                'AllocatedStorageGB': owner['AllocatedStorageGB']
             })
+            if not source_exists:
+                for snapshot in owner['Snapshots']:
+                    orphaned_snapshots.append({
+                        'SourceType': owner_type,
+                        'SourceIdentifier': source_id,
+                        **snapshot
+                    })
             
-    return db_instances_data
+    return {
+        'DBInstances': db_instances_data,
+        'SnapshotStorage': snapshot_storage,
+        'OrphanedSnapshots': orphaned_snapshots
+    }
 
-def get_dynamodb_data():
-    dynamodb_client = boto3.client('dynamodb')
-    cw_client = boto3.client('cloudwatch')
+def get_dynamodb_backups_by_table(dynamodb_client, time_range_lower_bound=None):
+    # One account-wide listing instead of a list_backups call per table
+    backups_by_table = {}
     
-    tables_data = []
+    params = {}
+    if time_range_lower_bound:
+        params['TimeRangeLowerBound'] = time_range_lower_bound
+    
+    paginator = dynamodb_client.get_paginator('list_backups')
+    for page in paginator.paginate(**params):
+        for b in page['BackupSummaries']:
+            table_backups = backups_by_table.setdefault(b['TableName'], {
+                'Backups': [],
+                'BackupCount': 0,
+                'TotalBackupSizeBytes': 0
+            })
+            table_backups['Backups'].append(DynamoDBBackupRecord(
+                BackupArn=b['BackupArn'],
+                BackupCreationDateTime=b['BackupCreationDateTime'],
+                BackupStatus=b['BackupStatus']
+            ))
+            table_backups['BackupCount'] += 1
+            table_backups['TotalBackupSizeBytes'] += b.get('BackupSizeBytes', 0)
+    
+    return backups_by_table
+
+def get_dynamodb_table_data(dynamodb_client, backups_by_table, consumed_capacity, table_name):
+    table_info = dynamodb_client.describe_table(TableName=table_name)['Table']
+    
+    # Consumed Capacity comes from the bulk query over every table
+    avg_read_capacity = get_average(consumed_capacity[(table_name, 'ConsumedReadCapacityUnits')])
+    avg_write_capacity = get_average(consumed_capacity[(table_name, 'ConsumedWriteCapacityUnits')])
+
+    # Continuous Backups / PITR
+    continuous_backups_info = dynamodb_client.describe_continuous_backups(TableName=table_name)
+    pitr_status = continuous_backups_info['ContinuousBackupsDescription']['PointInTimeRecoveryDescription']['PointInTimeRecoveryStatus']
+
+    # On-demand backups
+    table_backups = backups_by_table.get(table_name, {})
+
+    provisioned_throughput = table_info.get('ProvisionedThroughput')
+    if provisioned_throughput and 'LastIncreaseDateTime' in provisioned_throughput:
+        provisioned_throughput['LastIncreaseDateTime'] = provisioned_throughput['LastIncreaseDateTime'].strftime('%d/%m/%Y')
+    if provisioned_throughput and 'LastDecreaseDateTime' in provisioned_throughput:
+        provisioned_throughput['LastDecreaseDateTime'] = provisioned_throughput['LastDecreaseDateTime'].strftime('%d/%m/%Y')
+
+    return {
+        'TableName': table_name,
+        'TableSize': table_info['TableSizeBytes'],
+        'ItemCount': table_info['ItemCount'],
+        'ProvisionedThroughput': provisioned_throughput or 'On-demand',
+        'AverageConsumedReadCapacity': avg_read_capacity,
+        'AverageConsumedWriteCapacity': avg_write_capacity,
+        'PointInTimeRecoveryStatus': pitr_status,
+        'Backups': table_backups.get('Backups', []),
+        'BackupCount': table_backups.get('BackupCount', 0),
+        'TotalBackupSizeBytes': table_backups.get('TotalBackupSizeBytes', 0)
+    }
+
+def get_dynamodb_data(backup_time_range_lower_bound=None):
+    dynamodb_client = get_client('dynamodb')
+    cw_client = get_client('cloudwatch')
+    
+    backups_by_table = get_dynamodb_backups_by_table(dynamodb_client, backup_time_range_lower_bound)
+    
+    table_names = []
     
     paginator = dynamodb_client.get_paginator('list_tables')
     for page in paginator.paginate():
-        for table_name in page['TableNames']:
-            table_info = dynamodb_client.describe_table(TableName=table_name)['Table']
-            
-            # Get Consumed Capacity
-            today = datetime.now()
-            seven_days_ago = today - timedelta(days=7)
-            
-            read_capacity_response = cw_client.get_metric_statistics(
-                Namespace='AWS/DynamoDB',
-                MetricName='ConsumedReadCapacityUnits',
-                Dimensions=[{'Name': 'TableName', 'Value': table_name}],
-                StartTime=seven_days_ago,
-                EndTime=today,
-                Period=604800,
-                Statistics=['Average']
-            )
+        table_names.extend(page['TableNames'])
+    
+    # Consumed read and write capacity of every table over the last 7 days, in bulk
+    consumed_capacity = get_metric_series(cw_client, 'AWS/DynamoDB', [
+        ((table_name, metric_name), metric_name, [{'Name': 'TableName', 'Value': table_name}])
+        for table_name in table_names
+        for metric_name in ('ConsumedReadCapacityUnits', 'ConsumedWriteCapacityUnits')
+    ])
             
-            write_capacity_response = cw_client.get_metric_statistics(
-                Namespace='AWS/DynamoDB',
-                MetricName='ConsumedWriteCapacityUnits',
-                Dimensions=[{'Name': 'TableName', 'Value': table_name}],
-                StartTime=seven_days_ago,
-                EndTime=today,
-                Period=604800,
-                Statistics=['Average']
-            )
+    return fan_out(
+        partial(get_dynamodb_table_data, dynamodb_client, backups_by_table, consumed_capacity),
+        table_names,
+        FAN_OUT_CONCURRENCY['dynamodb']
+    )
 
-            avg_read_capacity = 0
-            if read_capacity_response['Datapoints']:
-                avg_read_capacity = read_capacity_response['Datapoints'][0]['Average']
-
-            avg_write_capacity = 0
-            if write_capacity_response['Datapoints']:
-                avg_write_capacity = write_capacity_response['Datapoints'][0]['Average']
-
-            # Continuous Backups / PITR
-            continuous_backups_info = dynamodb_client.describe_continuous_backups(TableName=table_name)
-            pitr_status = continuous_backups_info['ContinuousBackupsDescription']['PointInTimeRecoveryDescription']['PointInTimeRecoveryStatus']
-
-            # On-demand backups
-            backups_response = dynamodb_client.list_backups(TableName=table_name)
-            backups = [{
-                'BackupArn': b['BackupArn'],
-                'BackupCreationDateTime': b['BackupCreationDateTime'].strftime('%d/%m/%Y'),
-                'BackupStatus': b['BackupStatus']
-            } for b in backups_response['BackupSummaries']]
-
-            provisioned_throughput = table_info.get('ProvisionedThroughput')
-            if provisioned_throughput and 'LastIncreaseDateTime' in provisioned_throughput:
-                provisioned_throughput['LastIncreaseDateTime'] = provisioned_throughput['LastIncreaseDateTime'].strftime('%d/%m/%Y')
-            if provisioned_throughput and 'LastDecreaseDateTime' in provisioned_throughput:
-                provisioned_throughput['LastDecreaseDateTime'] = provisioned_throughput['LastDecreaseDateTime'].strftime('%d/%m/%Y')
-
-            tables_data.append({
-                'TableName': table_name,
-                'TableSize': format_bytes(table_info['TableSizeBytes']),
-                'ItemCount': table_info['ItemCount'],
-                'ProvisionedThroughput': provisioned_throughput or 'On-demand',
-                'AverageConsumedReadCapacity': avg_read_capacity,
-                'AverageConsumedWriteCapacity': avg_write_capacity,
-                'PointInTimeRecoveryStatus': pitr_status,
-                'Backups': backups
+def parse_cache_size_mb(cache_size):
+    # NodeSnapshots report CacheSize as a display string such as "6 MB"
+    units = {'KB': 1 / 1024, 'MB': 1, 'GB': 1024, 'TB': 1024**2}
+    try:
+        value, unit = cache_size.split()
+        return float(value) * units[unit.upper()]
+    except (AttributeError, KeyError, ValueError):
+        return 0
+
+def get_elasticache_snapshot_index(elasticache_client):
+    # Index every snapshot in the account by its replication group, or by its cluster when standalone
+    snapshot_index = {}
+    
+    paginator = elasticache_client.get_paginator('describe_snapshots')
+    for page in paginator.paginate():
+        for s in page['Snapshots']:
+            node_snapshots = s.get('NodeSnapshots', [])
+            create_times = [ns['SnapshotCreateTime'] for ns in node_snapshots if 'SnapshotCreateTime' in ns]
+            owner_id = s.get('ReplicationGroupId') or s.get('CacheClusterId')
+            snapshot_index.setdefault(owner_id, []).append({
+                'SnapshotName': s['SnapshotName'],
+                'SnapshotSource': s.get('SnapshotSource', 'N/A'),
+                'SnapshotStatus': s.get('SnapshotStatus', 'N/A'),
+                'CacheNodeType': s.get('CacheNodeType', 'N/A'),
+                'NodeSnapshotCount': len(node_snapshots),
+                'CacheSizeMB': round(sum(parse_cache_size_mb(ns.get('CacheSize')) for ns in node_snapshots), 2),
+                'SnapshotCreateTime': min(create_times).strftime('%d/%m/%Y') if create_times else 'N/A'
             })
-            
-    return tables_data
+    
+    return snapshot_index
 
 def get_elasticache_data():
-    elasticache_client = boto3.client('elasticache')
-    cw_client = boto3.client('cloudwatch')
+    elasticache_client = get_client('elasticache')
+    cw_client = get_client('cloudwatch')
     
     clusters_data = []
+    member_clusters = {}
+    
+    snapshot_index = get_elasticache_snapshot_index(elasticache_client)
     
+    cache_clusters = []
     paginator = elasticache_client.get_paginator('describe_cache_clusters')
     for page in paginator.paginate(ShowCacheNodeInfo=True):
-        for cluster in page['CacheClusters']:
-            cluster_id = cluster['CacheClusterId']
-            
-            # Get CPU and Memory Utilization
-            today = datetime.now()
-            seven_days_ago = today - timedelta(days=7)
-            
-            cpu_response = cw_client.get_metric_statistics(
-                Namespace='AWS/ElastiCache',
-                MetricName='CPUUtilization',
-                Dimensions=[{'Name': 'CacheClusterId', 'Value': cluster_id}],
-                StartTime=seven_days_ago,
-                EndTime=today,
-                Period=604800,
-                Statistics=['Average']
-            )
-            
-            memory_response = cw_client.get_metric_statistics(
-                Namespace='AWS/ElastiCache',
-                MetricName='FreeableMemory',
-                Dimensions=[{'Name': 'CacheClusterId', 'Value': cluster_id}],
-                StartTime=seven_days_ago,
-                EndTime=today,
-                Period=604800,
-                Statistics=['Average']
-            )
+        cache_clusters.extend(page['CacheClusters'])
+    
+    # CPU and Memory Utilization of every cluster over the last 7 days, in bulk
+    utilizations = get_metric_series(cw_client, 'AWS/ElastiCache', [
+        ((cluster['CacheClusterId'], metric_name), metric_name, [{'Name': 'CacheClusterId', 'Value': cluster['CacheClusterId']}])
+        for cluster in cache_clusters
+        for metric_name in ('CPUUtilization', 'FreeableMemory')
+    ])
+    
+    for cluster in cache_clusters:
+        cluster_id = cluster['CacheClusterId']
+        avg_cpu = get_average(utilizations[(cluster_id, 'CPUUtilization')])
+        avg_freeable_memory = get_average(utilizations[(cluster_id, 'FreeableMemory')])
+
+        # Members of a replication group are rolled up into the group instead of reported one by one
+        if cluster.get('ReplicationGroupId'):
+            member_clusters[cluster_id] = {
+                'NumCacheNodes': cluster['NumCacheNodes'],
+                'AverageCPUUtilization': avg_cpu,
+                'AverageFreeableMemory': avg_freeable_memory
+            }
+            continue
 
+        clusters_data.append({
+            'CacheClusterId': cluster_id,
+            'CacheNodeType': cluster['CacheNodeType'],
+            'Engine': cluster['Engine'],
+            'EngineVersion': cluster['EngineVersion'],
+            'NumCacheNodes': cluster['NumCacheNodes'],
+            'SnapshotRetentionLimit': cluster['SnapshotRetentionLimit'],
+            'AverageCPUUtilization': avg_cpu,
+            'AverageFreeableMemory': avg_freeable_memory,
+            'Snapshots': snapshot_index.get(cluster_id, [])
+        })
+    
+    replication_groups_data = []
+    
+    paginator = elasticache_client.get_paginator('describe_replication_groups')
+    for page in paginator.paginate():
+        for group in page['ReplicationGroups']:
+            group_id = group['ReplicationGroupId']
+            members = [member_clusters[m] for m in group.get('MemberClusters', []) if m in member_clusters]
+            
             avg_cpu = 0
-            if cpu_response['Datapoints']:
-                avg_cpu = cpu_response['Datapoints'][0]['Average']
-
             avg_freeable_memory = 0
-            if memory_response['Datapoints']:
-                avg_freeable_memory = memory_response['Datapoints'][0]['Average']
-
-            # Get Snapshots
-            snapshots_response = elasticache_client.describe_snapshots(CacheClusterId=cluster_id)
-            snapshots = [{
-                **s,
-                'CacheClusterCreateTime': s['CacheClusterCreateTime'].strftime('%d/%m/%Y'),
-                'NodeSnapshots': [{
-                    **ns,
-                    'CacheNodeCreateTime': ns['CacheNodeCreateTime'].strftime('%d/%m/%Y'),
-                    'SnapshotCreateTime': ns['SnapshotCreateTime'].strftime('%d/%m/%Y')
-                } for ns in s.get('NodeSnapshots', [])]
-            } for s in snapshots_response['Snapshots']]
-
-            clusters_data.append({
-                'CacheClusterId': cluster_id,
-                'CacheNodeType': cluster['CacheNodeType'],
-                'Engine': cluster['Engine'],
-                'EngineVersion': cluster['EngineVersion'],
-                'NumCacheNodes': cluster['NumCacheNodes'],
-                'SnapshotRetentionLimit': cluster['SnapshotRetentionLimit'],
-                'AverageCPUUtilization': f"{avg_cpu:.2f}%",
-                'AverageFreeableMemory': f"{avg_freeable_memory / (1024*1024):.2f} MB",
+            if members:
+                avg_cpu = sum(m['AverageCPUUtilization'] for m in members) / len(members)
+                avg_freeable_memory = sum(m['AverageFreeableMemory'] for m in members) / len(members)
+
+            # Cluster-mode snapshots are indexed by group, legacy ones may still carry a member cluster id
+            snapshots = list(snapshot_index.get(group_id, []))
+            for member_id in group.get('MemberClusters', []):
+                snapshots.extend(snapshot_index.get(member_id, []))
+
+            replication_groups_data.append({
+                'ReplicationGroupId': group_id,
+                'Status': group.get('Status', 'N/A'),
+                'CacheNodeType': group.get('CacheNodeType', 'N/A'),
+                'ClusterEnabled': group.get('ClusterEnabled', False),
+                'MultiAZ': group.get('MultiAZ', 'N/A'),
+                'NumNodeGroups': len(group.get('NodeGroups', [])),
+                'NumMemberClusters': len(group.get('MemberClusters', [])),
+                'NumCacheNodes': sum(m['NumCacheNodes'] for m in members),
+                'SnapshotRetentionLimit': group.get('SnapshotRetentionLimit', 0),
+                'AverageCPUUtilization': avg_cpu,
+                'AverageFreeableMemory': avg_freeable_memory,
                 'Snapshots': snapshots
             })
             
-    return clusters_data
+    return {
+        'CacheClusters': clusters_data,
+        'ReplicationGroups': replication_groups_data
+    }
 
-def get_efs_data():
-    efs_client = boto3.client('efs')
+def get_efs_file_system_data(efs_client, fs):
+    fs_id = fs['FileSystemId']
+    
+    mount_targets = efs_client.describe_mount_targets(FileSystemId=fs_id)['MountTargets']
     
-    efs_data = []
+    backup_policy = efs_client.describe_backup_policy(FileSystemId=fs_id).get('BackupPolicy', {})
+    
+    lifecycle_policies = fs.get('LifecyclePolicies', [])
+    for policy in lifecycle_policies:
+        if 'TransitionToIA' in policy:
+            policy['TransitionToIA'] = str(policy['TransitionToIA'])
+        if 'TransitionToPrimaryStorageClass' in policy:
+            policy['TransitionToPrimaryStorageClass'] = str(policy['TransitionToPrimaryStorageClass'])
+
+    return {
+        'FileSystemId': fs_id,
+        'Name': fs.get('Name', 'N/A'),
+        'Size': fs['SizeInBytes']['Value'],
+        'ThroughputMode': fs['ThroughputMode'],
+        'ProvisionedThroughputInMibps': fs.get('ProvisionedThroughputInMibps'),
+        'LifecyclePolicies': lifecycle_policies,
+        'IsUsed': len(mount_targets) > 0,
+        'BackupPolicy': backup_policy.get('Status', 'DISABLED'),
+    }
+
+def get_efs_data():
+    efs_client = get_client('efs')
     
     file_systems = efs_client.describe_file_systems()['FileSystems']
     
-    for fs in file_systems:
-        fs_id = fs['FileSystemId']
-        
-        mount_targets = efs_client.describe_mount_targets(FileSystemId=fs_id)['MountTargets']
-        
-        backup_policy = efs_client.describe_backup_policy(FileSystemId=fs_id).get('BackupPolicy', {})
-        
-        lifecycle_policies = fs.get('LifecyclePolicies', [])
-        for policy in lifecycle_policies:
-            if 'TransitionToIA' in policy:
-                policy['TransitionToIA'] = str(policy['TransitionToIA'])
-            if 'TransitionToPrimaryStorageClass' in policy:
-                policy['TransitionToPrimaryStorageClass'] = str(policy['TransitionToPrimaryStorageClass'])
-
-        efs_data.append({
-            'FileSystemId': fs_id,
-            'Name': fs.get('Name', 'N/A'),
-            'Size': format_bytes(fs['SizeInBytes']['Value']),
-            'ThroughputMode': fs['ThroughputMode'],
-            'ProvisionedThroughputInMibps': fs.get('ProvisionedThroughputInMibps'),
-            'LifecyclePolicies': lifecycle_policies,
-            'IsUsed': len(mount_targets) > 0,
-            'BackupPolicy': backup_policy.get('Status', 'DISABLED'),
-        })
-        
-    return efs_data
+    return fan_out(
+        partial(get_efs_file_system_data, efs_client),
+        file_systems,
+        FAN_OUT_CONCURRENCY['efs']
+    )
+
+def summarize_target_health(target_health):
+    summary = {
+        'Healthy': 0,
+        'Unhealthy': 0,
+        'Unused': 0,
+        'Other': 0
+    }
+    for description in target_health:
+        state = description.get('TargetHealth', {}).get('State', '')
+        if state == 'healthy':
+            summary['Healthy'] += 1
+        elif state.startswith('unhealthy'):
+            summary['Unhealthy'] += 1
+        elif state == 'unused':
+            summary['Unused'] += 1
+        else:
+            summary['Other'] += 1
+    return summary
+
+def get_target_health(elbv2_client, tg_arn):
+    return elbv2_client.describe_target_health(TargetGroupArn=tg_arn)['TargetHealthDescriptions']
+
+def describe_all_load_balancers(elbv2_client):
+    load_balancers = []
+    paginator = elbv2_client.get_paginator('describe_load_balancers')
+    for page in paginator.paginate():
+        load_balancers.extend(page['LoadBalancers'])
+    return load_balancers
 
-def get_load_balancers_data():
-    elbv2_client = boto3.client('elbv2')
+def get_load_balancers_data(include_target_details=False, inventory=None):
+    elbv2_client = get_client('elbv2')
     
     load_balancers_data = []
     
-    load_balancers = elbv2_client.describe_load_balancers()['LoadBalancers']
+    load_balancers = list_resources(inventory, 'AWS::ElasticLoadBalancingV2::LoadBalancer', partial(describe_all_load_balancers, elbv2_client))
+    
+    # One account-wide listing indexed by load balancer instead of a call per load balancer
+    target_groups_by_lb = {}
+    attached_target_groups = []
+    paginator = elbv2_client.get_paginator('describe_target_groups')
+    for page in paginator.paginate():
+        for tg in page['TargetGroups']:
+            if tg.get('LoadBalancerArns'):
+                attached_target_groups.append(tg['TargetGroupArn'])
+            for lb_arn in tg.get('LoadBalancerArns', []):
+                target_groups_by_lb.setdefault(lb_arn, []).append(tg)
+    
+    target_health_results = fan_out(
+        partial(get_target_health, elbv2_client),
+        attached_target_groups,
+        FAN_OUT_CONCURRENCY['elbv2']
+    )
+    target_health_by_tg = dict(zip(attached_target_groups, target_health_results))
     
     for lb in load_balancers:
         lb_arn = lb['LoadBalancerArn']
         
-        target_groups = elbv2_client.describe_target_groups(LoadBalancerArn=lb_arn)['TargetGroups']
+        target_groups = target_groups_by_lb.get(lb_arn, [])
         
         targets_data = []
         for tg in target_groups:
             tg_arn = tg['TargetGroupArn']
-            target_health = elbv2_client.describe_target_health(TargetGroupArn=tg_arn)['TargetHealthDescriptions']
-            targets_data.append({
+            target_health = target_health_by_tg.get(tg_arn, [])
+            tg_data = {
                 'TargetGroupArn': tg_arn,
                 'TargetGroupName': tg['TargetGroupName'],
-                'Targets': target_health
-            })
+                'TargetHealth': summarize_target_health(target_health)
+            }
+            if include_target_details:
+                tg_data['Targets'] = target_health
+            targets_data.append(tg_data)
             
         load_balancers_data.append({
             'LoadBalancerArn': lb_arn,
@@ -786,30 +1764,112 @@ def get_load_balancers_data():
         
     return load_balancers_data
 
-def get_cloudwatch_logs_data():
-    logs_client = boto3.client('logs')
+def get_log_group_shards(next_token, last_name):
+    # (prefix, next token) shards for the names after last_name. The listing goes on from next_token
+    # through the rest of last_name's leading character, every later character gets a prefix listing
+    # of its own. Log groups are listed in name order, so the shards never page through each other.
+    return [(last_name[0], next_token)] + [
+        (character, None) for character in LOG_GROUP_NAME_CHARACTERS if character > last_name[0]
+    ]
+
+def summarize_log_group_pages(pages, top_n, include=None):
+    # Rows, totals and the top-N heaps are all built while the pages stream in
+    summary = {
+        'LogGroups': [],
+        'Largest': [],
+        'LargestNeverExpiring': [],
+        'StoredBytes': 0,
+        'NeverExpiringCount': 0,
+        'NeverExpiringStoredBytes': 0
+    }
+    for page in pages:
+        for log_group in page['logGroups']:
+            if include is not None and not include(log_group['logGroupName']):
+                continue
+            row = LogGroupRecord(
+                LogGroupName=log_group['logGroupName'],
+                StoredBytes=log_group.get('storedBytes', 0),
+                RetentionInDays=log_group.get('retentionInDays', 'Never Expires')
+            )
+            summary['LogGroups'].append(row)
+            summary['StoredBytes'] += row.StoredBytes
+            heap_item = (row.StoredBytes, row.LogGroupName, row)
+            if len(summary['Largest']) < top_n:
+                heapq.heappush(summary['Largest'], heap_item)
+            else:
+                heapq.heappushpop(summary['Largest'], heap_item)
+            if 'retentionInDays' not in log_group:
+                summary['NeverExpiringCount'] += 1
+                summary['NeverExpiringStoredBytes'] += row.StoredBytes
+                if len(summary['LargestNeverExpiring']) < top_n:
+                    heapq.heappush(summary['LargestNeverExpiring'], heap_item)
+                else:
+                    heapq.heappushpop(summary['LargestNeverExpiring'], heap_item)
+    return summary
+
+def continue_log_group_listing(logs_client, next_token, prefix):
+    # Pages of an unprefixed listing from next_token, up to the first page that leaves prefix
+    while next_token:
+        page = logs_client.describe_log_groups(nextToken=next_token)
+        yield page
+        if page['logGroups'] and not page['logGroups'][-1]['logGroupName'].startswith(prefix):
+            return
+        next_token = page.get('nextToken')
+
+def scan_log_group_shard(logs_client, top_n, shard):
+    prefix, next_token = shard
+    if next_token:
+        # The last page can run into the next characters, their shards report those names
+        return summarize_log_group_pages(
+            continue_log_group_listing(logs_client, next_token, prefix),
+            top_n,
+            lambda name: name.startswith(prefix)
+        )
+    paginator = logs_client.get_paginator('describe_log_groups')
+    return summarize_log_group_pages(paginator.paginate(logGroupNamePrefix=prefix), top_n)
+
+def get_cloudwatch_logs_data(top_n=20, serial_pages=4):
+    logs_client = get_client('logs')
     
-    log_groups_data = []
+    # The first pages are read in one listing, only accounts with more log groups are sharded
+    pages = [logs_client.describe_log_groups()]
+    while 'nextToken' in pages[-1] and len(pages) < serial_pages:
+        pages.append(logs_client.describe_log_groups(nextToken=pages[-1]['nextToken']))
+    summaries = [summarize_log_group_pages(pages, top_n)]
+    if 'nextToken' in pages[-1]:
+        summaries.extend(fan_out(
+            partial(scan_log_group_shard, logs_client, top_n),
+            get_log_group_shards(pages[-1]['nextToken'], pages[-1]['logGroups'][-1]['logGroupName']),
+            FAN_OUT_CONCURRENCY['logs']
+        ))
     
-    paginator = logs_client.get_paginator('describe_log_groups')
-    for page in paginator.paginate():
-        for log_group in page['logGroups']:
-            log_groups_data.append({
-                'LogGroupName': log_group['logGroupName'],
-                'Stored': format_bytes(log_group['storedBytes']),
-                'RetentionInDays': log_group.get('retentionInDays', 'Never Expires')
-            })
+    log_groups_data = sorted(
+        [row for summary in summaries for row in summary['LogGroups']],
+        key=lambda row: row.LogGroupName
+    )
+    largest = heapq.nlargest(top_n, [item for summary in summaries for item in summary['Largest']])
+    largest_never_expiring = heapq.nlargest(top_n, [item for summary in summaries for item in summary['LargestNeverExpiring']])
             
-    return log_groups_data
+    return {
+        'LogGroups': log_groups_data,
+        'Summary': {
+            'LogGroupCount': len(log_groups_data),
+            'TotalStoredBytes': sum(summary['StoredBytes'] for summary in summaries),
+            'NeverExpiringCount': sum(summary['NeverExpiringCount'] for summary in summaries),
+            'NeverExpiringStoredBytes': sum(summary['NeverExpiringStoredBytes'] for summary in summaries),
+            'LargestLogGroups': [row for _, _, row in largest],
+            'LargestNeverExpiringLogGroups': [row for _, _, row in largest_never_expiring]
+        }
+    }
 
-def get_lambda_functions_data():
-    lambda_client = boto3.client('lambda')
-    logs_client = boto3.client('logs')
+def get_lambda_functions_data(checkpoint=None):
+    lambda_client = get_client('lambda')
+    logs_client = get_client('logs')
     
     functions_data = []
     
     paginator = lambda_client.get_paginator('list_functions')
-    for page in paginator.paginate():
+    for page in paginate_with_checkpoint(paginator, checkpoint, 'lambda_functions', functions_data):
         for function in page['Functions']:
             function_name = function['FunctionName']
             log_group_name = f"/aws/lambda/{function_name}"
@@ -864,108 +1924,207 @@ def get_lambda_functions_data():
                 'FunctionName': function_name,
                 'Runtime': function['Runtime'],
                 'MemoryAllocated': function['MemorySize'],
-                'AverageMemoryUsage': f"{avg_memory_usage:.2f} MB"
+                'AverageMemoryUsage': avg_memory_usage
             })
             
     return functions_data
 
+def describe_opensearch_domains(es_client, domain_names):
+    return es_client.describe_domains(DomainNames=domain_names)['DomainStatusList']
+
 def get_elasticsearch_data():
-    es_client = boto3.client('opensearch')
+    es_client = get_client('opensearch')
     
     domains_data = []
     
     response = es_client.list_domain_names()
+    domain_names = [domain['DomainName'] for domain in response['DomainNames']]
     
-    for domain in response['DomainNames']:
-        domain_name = domain['DomainName']
-        domain_info = es_client.describe_domain(DomainName=domain_name)['DomainStatus']
-        
-        instance_type = 'N/A'
-        instance_count = 0
-        storage_size_gb = 'N/A'
-
-        if 'ElasticsearchClusterConfig' in domain_info:
-            cluster_config = domain_info['ElasticsearchClusterConfig']
-            instance_type = cluster_config.get('InstanceType', 'N/A')
-            instance_count = cluster_config.get('InstanceCount', 0)
-        
-        if 'EBSOptions' in domain_info and domain_info['EBSOptions']['EBSEnabled']:
-            storage_size_gb = domain_info['EBSOptions'].get('VolumeSize', 'N/A')
+    # describe_domains accepts up to 5 domains per call, the batches themselves run concurrently
+    batches = fan_out(
+        partial(describe_opensearch_domains, es_client),
+        list(chunks(domain_names, 5)),
+        FAN_OUT_CONCURRENCY['opensearch']
+    )
+    
+    for domain_info in [domain for batch in batches for domain in batch]:
+        cluster_config = domain_info.get('ClusterConfig', {})
+        ebs_options = domain_info.get('EBSOptions', {})
+        ebs_enabled = ebs_options.get('EBSEnabled', False)
 
         domains_data.append({
-            'DomainName': domain_name,
-            'EngineVersion': domain_info.get('ElasticsearchVersion', domain_info.get('EngineVersion', 'N/A')),
-            'InstanceType': instance_type,
-            'InstanceCount': instance_count,
-            'StorageSizeGB': storage_size_gb,
+            'DomainName': domain_info['DomainName'],
+            'EngineVersion': domain_info.get('EngineVersion', 'N/A'),
+            'InstanceType': cluster_config.get('InstanceType', 'N/A'),
+            'InstanceCount': cluster_config.get('InstanceCount', 0),
+            'DedicatedMasterEnabled': cluster_config.get('DedicatedMasterEnabled', False),
+            'DedicatedMasterType': cluster_config.get('DedicatedMasterType', 'N/A'),
+            'DedicatedMasterCount': cluster_config.get('DedicatedMasterCount', 0),
+            'UltraWarmEnabled': cluster_config.get('WarmEnabled', False),
+            'UltraWarmType': cluster_config.get('WarmType', 'N/A'),
+            'UltraWarmCount': cluster_config.get('WarmCount', 0),
+            'EBSEnabled': ebs_enabled,
+            'EBSVolumeType': ebs_options.get('VolumeType', 'N/A') if ebs_enabled else 'N/A',
+            'StorageSizeGB': ebs_options.get('VolumeSize', 'N/A') if ebs_enabled else 'N/A',
+            'EBSIops': ebs_options.get('Iops', 'N/A') if ebs_enabled else 'N/A',
+            'EBSThroughput': ebs_options.get('Throughput', 'N/A') if ebs_enabled else 'N/A',
             'Processing': domain_info.get('Processing', False)
         })
         
     return domains_data
 
-def get_kinesis_data():
-    kinesis_client = boto3.client('kinesis')
+def get_kinesis_stream_summary(kinesis_client, stream_name):
+    return kinesis_client.describe_stream_summary(StreamName=stream_name)['StreamDescriptionSummary']
+
+def get_kinesis_data(include_metrics=False):
+    kinesis_client = get_client('kinesis')
     
     streams_data = []
     
+    stream_names = []
     paginator = kinesis_client.get_paginator('list_streams')
     for page in paginator.paginate():
-        for stream_name in page['StreamNames']:
-            stream_info = kinesis_client.describe_stream(StreamName=stream_name)['StreamDescription']
-            streams_data.append({
-                'StreamName': stream_name,
-                'StreamStatus': stream_info['StreamStatus'],
-                'ShardCount': len(stream_info['Shards'])
-            })
+        stream_names.extend(page['StreamNames'])
+    
+    # describe_stream_summary returns the open shard count without the shard map
+    summaries = fan_out(
+        partial(get_kinesis_stream_summary, kinesis_client),
+        stream_names,
+        FAN_OUT_CONCURRENCY['kinesis']
+    )
+    
+    for summary in summaries:
+        streams_data.append({
+            'StreamName': summary['StreamName'],
+            'StreamStatus': summary['StreamStatus'],
+            'StreamMode': summary.get('StreamModeDetails', {}).get('StreamMode', 'PROVISIONED'),
+            'ShardCount': summary['OpenShardCount'],
+            'RetentionPeriodHours': summary['RetentionPeriodHours'],
+            'EnhancedMonitoring': [
+                metric for monitoring in summary.get('EnhancedMonitoring', [])
+                for metric in monitoring.get('ShardLevelMetrics', [])
+            ],
+            'ConsumerCount': summary.get('ConsumerCount', 0)
+        })
+    
+    if include_metrics:
+        add_kinesis_utilization(streams_data)
             
     return streams_data
 
-def get_sqs_data():
-    sqs_client = boto3.client('sqs')
+def add_kinesis_utilization(streams_data):
+    # Hourly IncomingBytes for every provisioned stream in bulk, each shard ingests up to 1 MB/s
+    cw_client = get_client('cloudwatch')
     
-    queues_data = []
+    provisioned_streams = [stream for stream in streams_data if stream['StreamMode'] == 'PROVISIONED']
+    queries = [{
+        'Id': f"s{index}",
+        'MetricStat': {
+            'Metric': {
+                'Namespace': 'AWS/Kinesis',
+                'MetricName': 'IncomingBytes',
+                'Dimensions': [{'Name': 'StreamName', 'Value': stream['StreamName']}]
+            },
+            'Period': 3600,
+            'Stat': 'Sum'
+        },
+        'ReturnData': True
+    } for index, stream in enumerate(provisioned_streams)]
     
-    response = sqs_client.list_queues()
+    values = get_metric_values(cw_client, queries)
     
-    if 'QueueUrls' in response:
-        for queue_url in response['QueueUrls']:
-            attributes = sqs_client.get_queue_attributes(
-                QueueUrl=queue_url,
-                AttributeNames=['ApproximateNumberOfMessages', 'VisibilityTimeout']
-            )['Attributes']
-            queues_data.append({
-                'QueueUrl': queue_url,
-                'ApproximateNumberOfMessages': attributes.get('ApproximateNumberOfMessages', 'N/A'),
-                'VisibilityTimeout': attributes.get('VisibilityTimeout', 'N/A')
-            })
-            
-    return queues_data
+    for index, stream in enumerate(provisioned_streams):
+        hourly_bytes = values.get(f"s{index}", [])
+        peak_bytes_per_second = max(hourly_bytes) / 3600 if hourly_bytes else 0
+        capacity_bytes_per_second = stream['ShardCount'] * 1024 * 1024
+        utilization = peak_bytes_per_second / capacity_bytes_per_second * 100 if capacity_bytes_per_second else 0
+        stream['PeakIncomingBytesPerSecond'] = round(peak_bytes_per_second, 2)
+        stream['PeakShardUtilization'] = utilization
+        # Over-provisioned when the peak hour would still fit in half of the open shards
+        stream['OverProvisioned'] = stream['ShardCount'] > 1 and utilization < 50
+
+def get_sqs_queue_data(sqs_client, queue_url):
+    attributes = sqs_client.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=['ApproximateNumberOfMessages', 'VisibilityTimeout']
+    )['Attributes']
+    return {
+        'QueueUrl': queue_url,
+        'ApproximateNumberOfMessages': attributes.get('ApproximateNumberOfMessages', 'N/A'),
+        'VisibilityTimeout': attributes.get('VisibilityTimeout', 'N/A')
+    }
 
-def get_sns_data():
-    sns_client = boto3.client('sns')
+def get_sqs_data(inventory=None):
+    sqs_client = get_client('sqs')
     
-    topics_data = []
+    queue_urls = list_resources(inventory, 'AWS::SQS::Queue', lambda: sqs_client.list_queues().get('QueueUrls', []))
     
+    return fan_out(
+        partial(get_sqs_queue_data, sqs_client),
+        queue_urls,
+        FAN_OUT_CONCURRENCY['sqs']
+    )
+
+def get_sns_topic_data(sns_client, topic_arn):
+    attributes = sns_client.get_topic_attributes(TopicArn=topic_arn)['Attributes']
+    return {
+        'TopicArn': topic_arn,
+        'DisplayName': attributes.get('DisplayName', 'N/A')
+    }
+
+def list_all_topics(sns_client):
+    topics = []
     paginator = sns_client.get_paginator('list_topics')
     for page in paginator.paginate():
-        for topic in page['Topics']:
-            topic_arn = topic['TopicArn']
-            attributes = sns_client.get_topic_attributes(TopicArn=topic_arn)['Attributes']
-            topics_data.append({
-                'TopicArn': topic_arn,
-                'DisplayName': attributes.get('DisplayName', 'N/A')
-            })
+        topics.extend(page['Topics'])
+    return topics
+
+def get_sns_data(inventory=None):
+    sns_client = get_client('sns')
+    
+    topic_arns = [topic['TopicArn'] for topic in list_resources(inventory, 'AWS::SNS::Topic', partial(list_all_topics, sns_client))]
             
-    return topics_data
+    return fan_out(
+        partial(get_sns_topic_data, sns_client),
+        topic_arns,
+        FAN_OUT_CONCURRENCY['sns']
+    )
 
-def get_unused_eips_data():
-    ec2_client = boto3.client('ec2')
+def get_arn_resource_id(arn):
+    # arn:<partition>:<service>:<region>:<account>:<type>/<id> or <type>:<id>, or just <id>
+    resource = arn.split(':', 5)[5]
+    separators = [position for position in (resource.find('/'), resource.find(':')) if position != -1]
+    return resource[min(separators) + 1:] if separators else resource
+
+def get_region_tag_index(tag_keys, region):
+    tagging_client = get_client('resourcegroupstaggingapi', region)
+    region = tagging_client.meta.region_name
+    index = {}
+    paginator = tagging_client.get_paginator('get_resources')
+    for page in paginator.paginate(ResourcesPerPage=100):
+        for resource in page['ResourceTagMappingList']:
+            tags = {tag['Key']: tag['Value'] for tag in resource['Tags'] if tag['Key'] in tag_keys}
+            if tags:
+                service = resource['ResourceARN'].split(':')[2]
+                index.setdefault(service, {})[get_arn_resource_id(resource['ResourceARN'])] = tags
+    return region, index
+
+def get_resource_tags(tag_keys=None, regions=None):
+    # One get_resources sweep per region into {region: {service: {resource id: {tag key: value}}}},
+    # keeping only the configured tag keys. Without regions the sweep covers the region the
+    # collector runs in. Without tag keys nothing is swept and no row is enriched.
+    if not tag_keys:
+        return {}
+    tag_keys = set(tag_keys)
+    regions = regions or [None]
+    return dict(fan_out(partial(get_region_tag_index, tag_keys), regions, max_concurrency=len(regions)))
+
+def get_unused_eips_data(inventory=None):
+    ec2_client = get_client('ec2')
     
     unused_eips = []
     
-    response = ec2_client.describe_addresses()
-    
-    for eip in response['Addresses']:
+    for eip in list_resources(inventory, 'AWS::EC2::EIP', lambda: ec2_client.describe_addresses()['Addresses']):
         if 'AssociationId' not in eip:
             unused_eips.append({
                 'PublicIp': eip.get('PublicIp', 'N/A'),
@@ -975,7 +2134,7 @@ def get_unused_eips_data():
     return unused_eips
 
 def get_data_transfer_costs():
-    ce_client = boto3.client('ce')
+    ce_client = get_client('ce')
     today = datetime.now()
     one_month_ago = today - timedelta(days=30)
     
@@ -1023,8 +2182,8 @@ def get_data_transfer_costs():
             
             if total_cost > 0 or total_usage_quantity_gb > 0:
                 data_transfer_costs[usage_type] = {
-                    'Cost': f"{total_cost:.2f}",
-                    'UsageQuantityGB': f"{total_usage_quantity_gb:.2f}"
+                    'Cost': total_cost,
+                    'UsageQuantityGB': total_usage_quantity_gb
                 }
         except Exception as e:
             print(f"Could not get data transfer costs for usage type {usage_type}: {e}")
@@ -1036,103 +2195,279 @@ def get_data_transfer_costs():
             
     return formatted_data_transfer_costs
 
+def describe_cache_behavior(cb):
+    # Cached methods are nested under AllowedMethods, and behaviors attached to a cache policy carry no ForwardedValues block
+    forwarded_values = cb.get('ForwardedValues', {})
+    return {
+        'MinTTL': cb.get('MinTTL'),
+        'MaxTTL': cb.get('MaxTTL'),
+        'DefaultTTL': cb.get('DefaultTTL'),
+        'AllowedMethods': cb['AllowedMethods']['Items'],
+        'CachedMethods': cb['AllowedMethods'].get('CachedMethods', {}).get('Items', []),
+        'ForwardedQueryStrings': forwarded_values.get('QueryString', 'N/A'),
+        'ForwardedCookies': forwarded_values.get('Cookies', {}).get('Forward', 'N/A')
+    }
+
+def get_metric_data_bulk(cw_client, queries, start_time, end_time):
+    # Returns the values of every query by Id, across 500-query batches and result pages
+    values = {}
+    paginator = cw_client.get_paginator('get_metric_data')
+    for batch in chunks(queries, 500): # get_metric_data accepts at most 500 queries
+        for page in paginator.paginate(MetricDataQueries=batch, StartTime=start_time, EndTime=end_time):
+            for result in page['MetricDataResults']:
+                values.setdefault(result['Id'], []).extend(result['Values'])
+    return values
+
+class MetricCache:
+    # Keeps the datapoints of every metric series queried through get_metric_values, keyed by
+    # namespace, metric, dimensions, stat and period. Windows are aligned to period boundaries and
+    # only hold complete periods; each run fetches the periods after the series' high-water mark,
+    # plus the last settle_periods again for late datapoints, and trims what falls out of the
+    # retention window. Series of each collector, account and region are stored under their own
+    # key, so workers running different collectors of the same account never overwrite each other.
+
+    def __init__(self, store, key_prefix='metrics/', period=3600, retention_days=7, settle_periods=1):
+        self.store = store
+        self.key_prefix = key_prefix
+        self.period = period
+        self.retention_seconds = retention_days * 86400
+        self.settle_periods = settle_periods
+        self.lock = threading.Lock()
+        self.partitions = {}
+        self.dirty = set()
+        self.stats = {'Series': 0, 'FetchedSeries': 0, 'FreshSeries': 0, 'Calls': 0, 'Datapoints': 0}
+
+    def get_scope(self, cw_client):
+        shard = current_shard.get()
+        account_id = shard.get('Account') if shard is not None else 'default'
+        collector = current_collector.get() or 'default'
+        return f"{account_id}/{cw_client.meta.region_name}/{collector}"
+
+    def load_partition(self, scope):
+        with self.lock:
+            if scope not in self.partitions:
+                data = self.store.get(f"{self.key_prefix}{scope}.json.gz")
+                self.partitions[scope] = json.loads(gzip.decompress(data)) if data is not None else {}
+            return self.partitions[scope]
+
+    def save(self):
+        with self.lock:
+            for scope in sorted(self.dirty):
+                data = json.dumps(self.partitions[scope], separators=(',', ':')).encode('utf-8')
+                self.store.put(f"{self.key_prefix}{scope}.json.gz", gzip.compress(data))
+            self.dirty.clear()
+
+    def get_series_key(self, metric_stat):
+        metric = metric_stat['Metric']
+        dimensions = sorted((dimension['Name'], dimension['Value']) for dimension in metric.get('Dimensions', []))
+        return json.dumps([metric['Namespace'], metric['MetricName'], dimensions, metric_stat['Stat'], metric_stat['Period']])
+
+    def get_values(self, cw_client, queries, days=7, period=None):
+        # Values of every query by Id in time order. Periods longer than the cache period are served
+        # at the cache period, callers aggregate the finer values themselves. period overrides the
+        # cache period for metrics published at another granularity.
+        period = period or self.period
+        scope = self.get_scope(cw_client)
+        partition = self.load_partition(scope)
+        window_end = int(time.time()) // period * period
+        window_start = window_end - int(min(days * 86400, self.retention_seconds))
+        
+        series_keys = {}
+        fetches = {}
+        for query in queries:
+            metric_stat = {**query['MetricStat'], 'Period': min(query['MetricStat']['Period'], period)}
+            series_key = self.get_series_key(metric_stat)
+            series_keys[query['Id']] = series_key
+            with self.lock:
+                series = partition.get(series_key)
+            high_water_mark = series['HighWaterMark'] if series else 0
+            if high_water_mark >= window_end:
+                with self.lock:
+                    self.stats['FreshSeries'] += 1
+                continue
+            # Series fetched from the same start go out together
+            fetch_start = max(window_start, high_water_mark - self.settle_periods * metric_stat['Period'])
+            fetch_queries = fetches.setdefault(fetch_start, {})
+            if series_key not in fetch_queries:
+                fetch_queries[series_key] = {'Id': f"q{len(fetch_queries)}", 'MetricStat': metric_stat, 'ReturnData': True}
+        with self.lock:
+            self.stats['Series'] += len(series_keys)
+        
+        paginator = cw_client.get_paginator('get_metric_data')
+        for fetch_start, fetch_queries in fetches.items():
+            series_by_id = {query['Id']: series_key for series_key, query in fetch_queries.items()}
+            points = {series_key: {} for series_key in fetch_queries}
+            for batch in chunks(list(fetch_queries.values()), 500):
+                for page in paginator.paginate(
+                    MetricDataQueries=batch,
+                    StartTime=datetime.utcfromtimestamp(fetch_start),
+                    EndTime=datetime.utcfromtimestamp(window_end),
+                    ScanBy='TimestampAscending'
+                ):
+                    with self.lock:
+                        self.stats['Calls'] += 1
+                    for result in page['MetricDataResults']:
+                        series_points = points[series_by_id[result['Id']]]
+                        for timestamp, value in zip(result['Timestamps'], result['Values']):
+                            series_points[str(int(timestamp.timestamp()))] = value
+            with self.lock:
+                for series_key, series_points in points.items():
+                    series = partition.setdefault(series_key, {'HighWaterMark': 0, 'Points': {}})
+                    series['Points'].update(series_points)
+                    series['Points'] = {
+                        timestamp: value for timestamp, value in series['Points'].items()
+                        if int(timestamp) >= window_end - self.retention_seconds
+                    }
+                    series['HighWaterMark'] = window_end
+                    self.stats['Datapoints'] += len(series_points)
+                self.stats['FetchedSeries'] += len(points)
+                self.dirty.add(scope)
+        
+        values = {}
+        with self.lock:
+            for query_id, series_key in series_keys.items():
+                series_points = partition.get(series_key, {'Points': {}})['Points']
+                values[query_id] = [
+                    series_points[timestamp] for timestamp in sorted(series_points, key=int)
+                    if int(timestamp) >= window_start
+                ]
+        return values
+
+active_metric_cache = None
+
+def get_metric_values(cw_client, queries, days=7, period=None):
+    # The values of metric queries over the last days, from the metric cache when the run has one
+    if active_metric_cache is not None:
+        return active_metric_cache.get_values(cw_client, queries, days, period)
+    today = datetime.now()
+    return get_metric_data_bulk(cw_client, queries, today - timedelta(days=days), today)
+
+def get_metric_series(cw_client, namespace, metrics, stat='Average', period=604800, days=7, cache_period=None):
+    # Values of every (key, metric name, dimensions) of a namespace in one bulk query, by key
+    queries = [{
+        'Id': f"m{index}",
+        'MetricStat': {
+            'Metric': {
+                'Namespace': namespace,
+                'MetricName': metric_name,
+                'Dimensions': dimensions
+            },
+            'Period': period,
+            'Stat': stat
+        },
+        'ReturnData': True
+    } for index, (key, metric_name, dimensions) in enumerate(metrics)]
+    values = get_metric_values(cw_client, queries, days, cache_period) if queries else {}
+    return {key: values.get(f"m{index}", []) for index, (key, metric_name, dimensions) in enumerate(metrics)}
+
+def get_average(values):
+    return sum(values) / len(values) if values else 0
+
+def get_cloudfront_metrics(cw_client, dist_ids, metric_names, days=7):
+    # CloudFront publishes to us-east-1 only, every metric of every distribution goes in one bulk query
+    queries = []
+    query_keys_by_metric = {}
+    for dist_index, dist_id in enumerate(dist_ids):
+        for metric_index, metric_name in enumerate(metric_names):
+            query_id = f"m{dist_index}_{metric_index}"
+            query_keys_by_metric[(dist_id, metric_name)] = query_id
+            queries.append({
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/CloudFront',
+                        'MetricName': metric_name,
+                        'Dimensions': [
+                            {
+                                'Name': 'DistributionId',
+                                'Value': dist_id
+                            },
+                            {
+                                'Name': 'Region',
+                                'Value': 'Global' # CloudFront metrics are global
+                            }
+                        ]
+                    },
+                    'Period': 604800, # 7 days
+                    'Stat': 'Average'
+                },
+                'ReturnData': True
+            })
+
+    values = get_metric_values(cw_client, queries, days)
+
+    metrics = {}
+    for dist_id in dist_ids:
+        metrics[dist_id] = {}
+        for metric_name in metric_names:
+            metric_values = values.get(query_keys_by_metric[(dist_id, metric_name)], [])
+            avg_value = sum(metric_values) / len(metric_values) if metric_values else 0
+            metrics[dist_id][metric_name] = avg_value
+    return metrics
+
 def get_cloudfront_data():
-    cf_client = boto3.client('cloudfront')
-    cw_client = boto3.client('cloudwatch')
+    cf_client = get_client('cloudfront')
+    cw_client = get_client('cloudwatch', region_name='us-east-1')
     
     distributions_data = []
-    
-    today = datetime.now()
-    seven_days_ago = today - timedelta(days=7)
 
-    response = cf_client.list_distributions()
+    dist_summaries = []
+    paginator = cf_client.get_paginator('list_distributions')
+    for page in paginator.paginate():
+        dist_summaries.extend(page['DistributionList'].get('Items', []))
     
-    if 'Items' in response['DistributionList']:
-        for dist_summary in response['DistributionList']['Items']:
-            dist_id = dist_summary['Id']
-            
-            # Get detailed distribution config
-            dist_config_response = cf_client.get_distribution_config(Id=dist_id)
-            dist_config = dist_config_response['DistributionConfig']
-            
-            # Extract cache behaviors
-            cache_behaviors = []
-            if 'CacheBehaviors' in dist_config and 'Items' in dist_config['CacheBehaviors']:
-                for cb in dist_config['CacheBehaviors']['Items']:
-                    cache_behaviors.append({
-                        'PathPattern': cb['PathPattern'],
-                        'MinTTL': cb.get('MinTTL'),
-                        'MaxTTL': cb.get('MaxTTL'),
-                        'DefaultTTL': cb.get('DefaultTTL'),
-                        'AllowedMethods': [m['Method'] for m in cb['AllowedMethods']['Items']],
-                        'CachedMethods': [m['Method'] for m in cb['CachedMethods']['Items']],
-                        'ForwardedQueryStrings': cb['ForwardedValues']['QueryString'],
-                        'ForwardedCookies': cb['ForwardedValues']['Cookies']['Forward']
-                    })
-            
-            # Extract origins
-            origins = []
-            if 'Origins' in dist_config and 'Items' in dist_config['Origins']:
-                for origin in dist_config['Origins']['Items']:
-                    origins.append({
-                        'Id': origin['Id'],
-                        'DomainName': origin['DomainName'],
-                        'CustomHeaders': origin.get('CustomHeaders', {}).get('Items', [])
-                    })
+    metric_names = ['Requests', 'BytesDownloaded', 'CacheHitRate', 'ErrorRate']
+    metrics = get_cloudfront_metrics(
+        cw_client,
+        [dist_summary['Id'] for dist_summary in dist_summaries],
+        metric_names
+    )
 
-            # Get CloudWatch metrics
-            metrics = {}
-            metric_names = ['Requests', 'BytesDownloaded', 'CacheHitRate', 'ErrorRate']
-            for metric_name in metric_names:
-                metric_response = cw_client.get_metric_statistics(
-                    Namespace='AWS/CloudFront',
-                    MetricName=metric_name,
-                    Dimensions=[
-                        {
-                            'Name': 'DistributionId',
-                            'Value': dist_id
-                        },
-                        {
-                            'Name': 'Region',
-                            'Value': 'Global' # CloudFront metrics are global
-                        }
-                    ],
-                    StartTime=seven_days_ago,
-                    EndTime=today,
-                    Period=604800, # 7 days
-                    Statistics=['Average']
-                )
-                avg_value = 0
-                if metric_response['Datapoints']:
-                    avg_value = metric_response['Datapoints'][0]['Average']
-                metrics[metric_name] = f"{avg_value:.2f}"
-            
-            distributions_data.append({
-                'DistributionId': dist_id,
-                'DomainName': dist_summary['DomainName'],
-                'Status': dist_summary['Status'],
-                'Enabled': dist_summary['Enabled'],
-                'PriceClass': dist_config['PriceClass'],
-                'Origins': origins,
-                'DefaultCacheBehavior': {
-                    'MinTTL': dist_config['DefaultCacheBehavior'].get('MinTTL'),
-                    'MaxTTL': dist_config['DefaultCacheBehavior'].get('MaxTTL'),
-                    'DefaultTTL': dist_config['DefaultCacheBehavior'].get('DefaultTTL'),
-                    'AllowedMethods': [m['Method'] for m in dist_config['DefaultCacheBehavior']['AllowedMethods']['Items']],
-                    'CachedMethods': [m['Method'] for m in dist_config['DefaultCacheBehavior']['CachedMethods']['Items']],
-                    'ForwardedQueryStrings': dist_config['DefaultCacheBehavior']['ForwardedValues']['QueryString'],
-                    'ForwardedCookies': dist_config['DefaultCacheBehavior']['ForwardedValues']['Cookies']['Forward']
-                },
-                'CacheBehaviors': cache_behaviors,
-                'MetricsLast7Days': metrics
-            })
+    for dist_summary in dist_summaries:
+        dist_id = dist_summary['Id']
+        
+        # The summary already carries origins and cache behaviors, the config is only fetched when it doesn't
+        dist_config = dist_summary
+        if any(field not in dist_summary for field in ('PriceClass', 'Origins', 'DefaultCacheBehavior', 'CacheBehaviors')):
+            dist_config = cf_client.get_distribution_config(Id=dist_id)['DistributionConfig']
+        
+        # Extract cache behaviors
+        cache_behaviors = []
+        if 'CacheBehaviors' in dist_config and 'Items' in dist_config['CacheBehaviors']:
+            for cb in dist_config['CacheBehaviors']['Items']:
+                cache_behaviors.append({
+                    'PathPattern': cb['PathPattern'],
+                    **describe_cache_behavior(cb)
+                })
+        
+        # Extract origins
+        origins = []
+        if 'Origins' in dist_config and 'Items' in dist_config['Origins']:
+            for origin in dist_config['Origins']['Items']:
+                origins.append({
+                    'Id': origin['Id'],
+                    'DomainName': origin['DomainName'],
+                    'CustomHeaders': origin.get('CustomHeaders', {}).get('Items', [])
+                })
+        
+        distributions_data.append({
+            'DistributionId': dist_id,
+            'DomainName': dist_summary['DomainName'],
+            'Status': dist_summary['Status'],
+            'Enabled': dist_summary['Enabled'],
+            'PriceClass': dist_config['PriceClass'],
+            'Origins': origins,
+            'DefaultCacheBehavior': describe_cache_behavior(dist_config['DefaultCacheBehavior']),
+            'CacheBehaviors': cache_behaviors,
+            'MetricsLast7Days': metrics[dist_id]
+        })
             
     return distributions_data
 
 
 
 def get_savings_plans_coverage():
-    ce_client = boto3.client('ce')
+    ce_client = get_client('ce')
     today = datetime.now()
     six_months_ago = today - timedelta(days=180)
     
@@ -1163,13 +2498,9 @@ def get_savings_plans_coverage():
         for service, data in consolidated_coverage.items():
             total_cost = data['TotalCost']
             if total_cost > 0:
-                data['CoveragePercentage'] = f"{(data['SpendCoveredBySavingsPlans'] / total_cost) * 100:.2f}%"
+                data['CoveragePercentage'] = (data['SpendCoveredBySavingsPlans'] / total_cost) * 100
             else:
-                data['CoveragePercentage'] = "0.00%"
-            
-            data['SpendCoveredBySavingsPlans'] = f"{data['SpendCoveredBySavingsPlans']:.2f}"
-            data['OnDemandCost'] = f"{data['OnDemandCost']:.2f}"
-            data['TotalCost'] = f"{data['TotalCost']:.2f}"
+                data['CoveragePercentage'] = 0
 
         return [{'Service': key, **value} for key, value in consolidated_coverage.items()]
 
@@ -1178,7 +2509,7 @@ def get_savings_plans_coverage():
         return []
 
 def get_savings_plans_utilization():
-    ce_client = boto3.client('ce')
+    ce_client = get_client('ce')
     today = datetime.now()
     six_months_ago = today - timedelta(days=180)
     
@@ -1208,13 +2539,9 @@ def get_savings_plans_utilization():
         for service, data in consolidated_utilization.items():
             total_commitment = data['TotalCommitment']
             if total_commitment > 0:
-                data['UtilizationPercentage'] = f"{(data['UsedCommitment'] / total_commitment) * 100:.2f}%"
+                data['UtilizationPercentage'] = (data['UsedCommitment'] / total_commitment) * 100
             else:
-                data['UtilizationPercentage'] = "0.00%"
-            
-            data['TotalCommitment'] = f"{data['TotalCommitment']:.2f}"
-            data['UsedCommitment'] = f"{data['UsedCommitment']:.2f}"
-            data['UnusedCommitment'] = f"{data['UnusedCommitment']:.2f}"
+                data['UtilizationPercentage'] = 0
 
         return [{'Service': key, **value} for key, value in consolidated_utilization.items()]
 
@@ -1223,80 +2550,1306 @@ def get_savings_plans_utilization():
         return []
 
 
-def lambda_handler(event, context):
-    reservation_utilization = get_reservation_utilization()
-    savings_plans_coverage = get_savings_plans_coverage()
-    savings_plans_utilization = get_savings_plans_utilization()
-    cost_and_usage = get_cost_and_usage()
-    running_instances = get_running_ec2_instances()
-    
-    ec2_instances_data = []
-    for instance in running_instances:
-        avg_cpu = get_cpu_utilization(instance['InstanceId'])
-        ec2_instances_data.append({
-            'InstanceId': instance['InstanceId'],
-            'Description': instance['Description'],
-            'AverageCPUUtilization': f"{avg_cpu:.2f}%"
+def format_percent(value):
+    return f"{value:.2f}%"
+
+def format_amount(value):
+    return f"{value:.2f}"
+
+# Unit of every numeric report field, and how the legacy output renders it as a display string.
+# Fields without a legacy formatter are numeric in both output formats.
+REPORT_FIELD_UNITS = {
+    'monthly_expenses': ('USD', format_amount),
+    'daily_expenses': ('USD', format_amount),
+    'EstimatedMonthlySavings': ('USD', format_amount),
+    'total_cost': ('USD', format_amount),
+    'average_cost': ('USD', format_amount),
+    'SpendCoveredBySavingsPlans': ('USD', format_amount),
+    'OnDemandCost': ('USD', format_amount),
+    'TotalCost': ('USD', format_amount),
+    'CoveragePercentage': ('percent', format_percent),
+    'TotalCommitment': ('USD', format_amount),
+    'UsedCommitment': ('USD', format_amount),
+    'UnusedCommitment': ('USD', format_amount),
+    'UtilizationPercentage': ('percent', format_percent),
+    'AverageCPUUtilization': ('percent', format_percent),
+    'AverageMemoryUtilization': ('percent', format_percent),
+    'AverageMemoryUsage': ('MB', lambda value: f"{value:.2f} MB"),
+    'AverageFreeableMemory': ('bytes', lambda value: f"{value / (1024*1024):.2f} MB"),
+    'TableSize': ('bytes', format_bytes),
+    'Size': ('bytes', format_bytes),
+    'TotalBytesOutAndInLast7Days': ('bytes', lambda value: f"{value:.2f} bytes"),
+    'Cost': ('USD', format_amount),
+    'UsageQuantityGB': ('GB', format_amount),
+    'MetricsLast7Days': ('average', format_amount),
+    'PeakShardUtilization': ('percent', format_percent),
+    'PeakIncomingBytesPerSecond': ('bytes/second', None),
+    'TotalBackupSizeBytes': ('bytes', None),
+    'StoredBytes': ('bytes', None),
+    'TotalStoredBytes': ('bytes', None),
+    'NeverExpiringStoredBytes': ('bytes', None),
+    'StorageUsageMB': ('MB', None),
+    'AllocatedStorageGB': ('GB', None),
+    'CacheSizeMB': ('MB', None),
+    'SizeGB': ('GB', None),
+    'SnapshotSizeGB': ('GB', None),
+    'VolumeSizeGB': ('GB', None),
+}
+
+# Unit fields of the rows of each report section. 'Parent.Field' is a field of the sub-rows (a list
+# of rows or a single row) a row holds under Parent. Only these fields are rendered, so a tag, a
+# cost group or a joined field that happens to share a unit field's name is left as it is.
+REPORT_SECTION_UNITS = {
+    ('cost_and_usage',): ['monthly_expenses', 'daily_expenses', 'total_cost', 'average_cost'],
+    ('savings', 'savings_plans_coverage'): ['SpendCoveredBySavingsPlans', 'OnDemandCost', 'TotalCost', 'CoveragePercentage'],
+    ('savings', 'savings_plans_utilization'): ['TotalCommitment', 'UsedCommitment', 'UnusedCommitment', 'UtilizationPercentage'],
+    ('computing', 'ec2_instances'): ['AverageCPUUtilization', 'ComputeOptimizer.EstimatedMonthlySavings'],
+    ('computing', 'eks_data'): ['Nodes.AverageMemoryUtilization'],
+    ('computing', 'lambda_functions'): ['AverageMemoryUsage', 'ComputeOptimizer.EstimatedMonthlySavings'],
+    ('computing', 'auto_scaling_groups'): ['EstimatedMonthlySavings'],
+    ('storage', 'ebs_volumes'): ['SizeGB', 'ComputeOptimizer.EstimatedMonthlySavings'],
+    ('storage', 'ebs_snapshots'): ['SnapshotSizeGB', 'VolumeSizeGB'],
+    ('storage', 's3_data'): ['StorageUsageMB'],
+    ('storage', 'efs_data'): ['Size'],
+    ('databases', 'rds_data'): ['AverageCPUUtilization', 'Snapshots.AllocatedStorageGB'],
+    ('databases', 'rds_snapshot_storage'): ['AllocatedStorageGB'],
+    ('databases', 'rds_orphaned_snapshots'): ['AllocatedStorageGB'],
+    ('databases', 'dynamodb_data'): ['TableSize', 'TotalBackupSizeBytes'],
+    ('databases', 'elasticache_data'): ['AverageCPUUtilization', 'AverageFreeableMemory', 'Snapshots.CacheSizeMB'],
+    ('databases', 'elasticache_replication_groups'): ['AverageCPUUtilization', 'AverageFreeableMemory', 'Snapshots.CacheSizeMB'],
+    ('networking', 'lost_nat_gateways'): ['TotalBytesOutAndInLast7Days'],
+    ('networking', 'data_transfer_costs'): ['Cost', 'UsageQuantityGB'],
+    ('networking', 'cloudfront_data'): ['MetricsLast7Days'],
+    ('others', 'cloudwatch_logs'): ['StoredBytes'],
+    ('others', 'cloudwatch_logs_summary'): ['TotalStoredBytes', 'NeverExpiringStoredBytes', 'LargestLogGroups.StoredBytes', 'LargestNeverExpiringLogGroups.StoredBytes'],
+    ('others', 'kinesis_data'): ['PeakShardUtilization', 'PeakIncomingBytesPerSecond'],
+}
+
+# Sections whose rows sit in maps keyed by group value, as deep as the query groups by
+GROUPED_REPORT_SECTIONS = {('cost_and_usage',)}
+
+def get_unit_fields(field_paths):
+    # Nests the dotted field paths: field -> unit field name, parent -> unit fields of its sub-rows
+    fields = {}
+    for field_path in field_paths:
+        parent, _, field = field_path.rpartition('.')
+        target = fields
+        for key in parent.split('.') if parent else []:
+            target = target.setdefault(key, {})
+        target[field] = field
+    return fields
+
+REPORT_SECTION_UNIT_FIELDS = {path: get_unit_fields(field_paths) for path, field_paths in REPORT_SECTION_UNITS.items()}
+
+def get_report_units():
+    # The unit of every unit field of the typed output, by section key and field path
+    return {
+        '/'.join(path): {field_path: REPORT_FIELD_UNITS[field_path.rpartition('.')[2]][0] for field_path in field_paths}
+        for path, field_paths in REPORT_SECTION_UNITS.items()
+    }
+
+# Decimal places kept for float unit fields in the typed output
+TYPED_FLOAT_PRECISION = 4
+
+def round_typed_number(value):
+    return round(value, TYPED_FLOAT_PRECISION) if isinstance(value, float) else value
+
+def render_unit_value(value, formatter):
+    if isinstance(value, dict):
+        return {key: render_unit_value(item, formatter) for key, item in value.items()}
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return formatter(value)
+    return value
+
+def is_unit_row(value, fields):
+    # Group maps only hold more maps, a row holds at least one of its unit fields as a value
+    return any(not isinstance(value[key], dict) for key in fields if key in value)
+
+def render_unit_rows(value, fields, typed, grouped=False):
+    if isinstance(value, Record):
+        value = value.to_dict()
+    if isinstance(value, list):
+        return [render_unit_rows(item, fields, typed) for item in value]
+    if not isinstance(value, dict):
+        return render_report(value, typed, None)
+    if grouped and not is_unit_row(value, fields):
+        return {key: render_unit_rows(item, fields, typed, grouped) for key, item in value.items()}
+    rendered = {}
+    for key, item in value.items():
+        field = fields.get(key)
+        if isinstance(field, dict):
+            rendered[key] = render_unit_rows(item, field, typed)
+            continue
+        unit, formatter = REPORT_FIELD_UNITS[field] if field else (None, None)
+        if unit and typed:
+            rendered[key] = render_unit_value(item, round_typed_number)
+        elif formatter and not typed:
+            rendered[key] = render_unit_value(item, formatter)
+        else:
+            rendered[key] = render_report(item, typed, None)
+    return rendered
+
+def render_report(value, typed=False, path=()):
+    # Collectors keep numbers raw; the legacy format turns unit fields back into display strings.
+    # path is where value sits in the report: the whole report, a section or a single section row.
+    if isinstance(value, Record):
+        value = value.to_dict()
+    if path in REPORT_SECTION_UNIT_FIELDS:
+        return render_unit_rows(value, REPORT_SECTION_UNIT_FIELDS[path], typed, path in GROUPED_REPORT_SECTIONS)
+    if isinstance(value, dict):
+        return {key: render_report(item, typed, path + (key,) if path is not None else None) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render_report(item, typed, None) for item in value]
+    return value
+
+def encode_report(report, encoding='json'):
+    # Returns the encoded payload and its content type
+    if encoding == 'json':
+        return json.dumps(report, separators=(',', ':'), default=str).encode('utf-8'), 'application/json'
+    if encoding == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            raise ValueError("The msgpack encoding requires the msgpack package")
+        return msgpack.packb(report, default=str), 'application/msgpack'
+    if encoding == 'cbor':
+        try:
+            import cbor2
+        except ImportError:
+            raise ValueError("The cbor encoding requires the cbor2 package")
+        return cbor2.dumps(report, default=lambda encoder, value: encoder.encode(str(value))), 'application/cbor'
+    raise ValueError(f"Unsupported report encoding: {encoding}")
+
+def flatten_row(row, prefix=''):
+    # Nested dicts become prefixed columns, lists are kept as JSON text
+    flat = {}
+    for key, value in row.items():
+        column = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_row(value, f"{column}_"))
+        elif isinstance(value, list):
+            flat[column] = json.dumps(value, separators=(',', ':'), default=str)
+        else:
+            flat[column] = value
+    return flat
+
+# Parquet type of each column kind
+COLUMN_KIND_TYPES = {'bool': 'bool_', 'number': 'float64', 'text': 'string'}
+
+def get_column_kind(values):
+    value_types = {type(value) for value in values if value is not None}
+    if not value_types:
+        return None
+    if value_types == {bool}:
+        return 'bool'
+    if value_types <= {int, float}:
+        return 'number'
+    return 'text'
+
+def to_columns(records, schema=None, dropped=None):
+    # Ints and floats are widened to numbers, other mixes (numbers and 'N/A' for instance) are
+    # written as text. schema holds the kind the section's columns got in earlier batches and is
+    # extended with new ones; values that do not fit their column's kind are left empty and
+    # counted per column in dropped. Columns without any value yet are left out until a batch
+    # gives them one.
+    schema = {} if schema is None else schema
+    dropped = {} if dropped is None else dropped
+    columns = {}
+    for index, record in enumerate(records):
+        for column, value in record.items():
+            columns.setdefault(column, [None] * index).append(value)
+        for column, values in columns.items():
+            if len(values) <= index:
+                values.append(None)
+    for column, values in columns.items():
+        kind = schema.get(column) or get_column_kind(values)
+        if kind is None:
+            continue
+        schema[column] = kind
+        if kind == 'text':
+            columns[column] = [None if value is None else str(value) for value in values]
+            continue
+        value_types = (int, float) if kind == 'number' else (bool,)
+        columns[column] = [value if type(value) in value_types else None for value in values]
+        misfits = sum(1 for value in values if value is not None and type(value) not in value_types)
+        if misfits:
+            dropped[column] = dropped.get(column, 0) + misfits
+    return {column: columns.get(column, [None] * len(records)) for column in schema}
+
+class ColumnarExporter:
+    # Writes resource lists as Hive-partitioned Parquet files, or CSV when pyarrow is not available.
+    # Each batch of rows becomes its own part file, so a section never has to be held as a whole.
+
+    def __init__(self, root, partition, file_format=None, batch_size=10000):
+        self.root = root
+        self.partition = partition
+        self.batch_size = batch_size
+        self.file_format = file_format or ('parquet' if importlib.util.find_spec('pyarrow') else 'csv')
+        self.manifest = []
+        # Column kinds of every section, so all part files of a table share one schema
+        self.schemas = {}
+
+    def write_section(self, section, rows):
+        directory = os.path.join(self.root, section, *[f"{key}={value}" for key, value in self.partition.items()])
+        os.makedirs(directory, exist_ok=True)
+        
+        batch = []
+        part = 0
+        for row in rows:
+            batch.append(flatten_row(row) if isinstance(row, dict) else {'value': row})
+            if len(batch) >= self.batch_size:
+                self.write_batch(section, directory, part, batch)
+                batch = []
+                part += 1
+        if batch:
+            self.write_batch(section, directory, part, batch)
+
+    def write_batch(self, section, directory, part, records):
+        path = os.path.join(directory, f"part-{part:05d}.{self.file_format}")
+        schema = self.schemas.setdefault(section, {})
+        dropped = {}
+        columns = to_columns(records, schema, dropped)
+        if dropped:
+            print(f"Left {sum(dropped.values())} values of {section} part {part} empty, they do not fit their column's kind: {dropped}")
+        if self.file_format == 'parquet':
+            import pyarrow
+            import pyarrow.parquet
+            table_schema = pyarrow.schema([(column, getattr(pyarrow, COLUMN_KIND_TYPES[schema[column]])()) for column in columns])
+            pyarrow.parquet.write_table(pyarrow.table(columns, schema=table_schema), path)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns.keys())
+                writer.writerows(zip(*columns.values()))
+        self.manifest.append({
+            'Section': section,
+            'Path': path,
+            'Rows': len(records),
+            'DroppedCells': dropped
         })
+
+def create_columnar_exporter(export_options):
+    partition = {
+        'account': export_options.get('account') or get_client('sts').get_caller_identity()['Account'],
+        'region': export_options.get('region') or get_session().region_name,
+        'run_date': export_options.get('run_date') or datetime.now().strftime('%Y-%m-%d')
+    }
+    return ColumnarExporter(
+        export_options.get('path', '/tmp/finops_export'),
+        partition,
+        export_options.get('format'),
+        export_options.get('batch_size', 10000)
+    )
+
+class LocalDirStore:
+    # Keeps run state as plain files under a directory, /tmp by default so a warm container can resume
+
+    def __init__(self, root='/tmp/finops'):
+        self.root = root
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.root, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a run cut off mid-write never leaves a truncated object behind
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    def delete(self, key):
+        try:
+            os.remove(os.path.join(self.root, key))
+        except FileNotFoundError:
+            pass
+
+    def list_keys(self, prefix=''):
+        keys = []
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                key = os.path.relpath(os.path.join(directory, file_name), self.root).replace(os.sep, '/')
+                if key.startswith(prefix) and not key.endswith('.tmp'):
+                    keys.append(key)
+        return sorted(keys)
+
+class LocalS3Client:
+    # Directory-backed stand-in for the few S3 calls the stores use, for running without a bucket
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    class Paginator:
+        def __init__(self, client):
+            self.client = client
+
+        def paginate(self, Bucket, Prefix=''):
+            yield self.client.list_objects_v2(Bucket=Bucket, Prefix=Prefix)
+
+    def __init__(self, root='/tmp/finops_s3'):
+        self.root = root
+
+    def bucket_store(self, bucket):
+        return LocalDirStore(os.path.join(self.root, bucket))
+
+    def put_object(self, Bucket, Key, Body):
+        self.bucket_store(Bucket).put(Key, Body if isinstance(Body, bytes) else Body.encode('utf-8'))
+        return {}
+
+    def get_object(self, Bucket, Key):
+        data = self.bucket_store(Bucket).get(Key)
+        if data is None:
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data)}
+
+    def delete_object(self, Bucket, Key):
+        self.bucket_store(Bucket).delete(Key)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix=''):
+        store = self.bucket_store(Bucket)
+        contents = [{'Key': key, 'Size': len(store.get(key))} for key in store.list_keys(Prefix)]
+        return {'Contents': contents, 'KeyCount': len(contents), 'IsTruncated': False}
+
+    def get_paginator(self, operation_name):
+        return self.Paginator(self)
+
+class S3Store:
+    # Keeps run state in an S3 bucket, so any later invocation can resume it
+
+    def __init__(self, bucket, prefix='', client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client or get_client('s3')
+
+    def get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def list_keys(self, prefix=''):
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            keys.extend(item['Key'][len(self.prefix):] for item in page.get('Contents', []))
+        return sorted(keys)
+
+def create_store(store_options):
+    store_type = store_options.get('type', 'tmp')
+    if store_type == 'tmp':
+        return LocalDirStore()
+    if store_type == 'local':
+        return LocalDirStore(store_options['path'])
+    if store_type == 's3':
+        client = LocalS3Client(store_options['stand_in_path']) if store_options.get('stand_in_path') else None
+        return S3Store(store_options['bucket'], store_options.get('prefix', ''), client)
+    raise ValueError(f"Unsupported store type: {store_type}")
+
+class RunDeadlineReached(Exception):
+    pass
+
+class RunCheckpoint:
+    # Saves each collector's sections under a run ID as it completes. Collectors that page through
+    # long listings also save every chunk of rows with its continuation token, so an invocation
+    # picking the run up again carries on from the last saved chunk.
+
+    def __init__(self, store, run_id, deadline=None):
+        self.store = store
+        self.run_id = run_id
+        self.deadline = deadline
+
+    def collector_key(self, name):
+        return f"runs/{self.run_id}/collectors/{name}.json"
+
+    def load_collector(self, name):
+        data = self.store.get(self.collector_key(name))
+        if data is None:
+            return None
+        return {tuple(path.split('/')): value for path, value in json.loads(data).items()}
+
+    def save_collector(self, name, collector_sections):
+        data = {'/'.join(path): value for path, value in collector_sections.items()}
+        self.store.put(self.collector_key(name), json.dumps(data, default=json_default).encode('utf-8'))
+
+    def deadline_reached(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check_deadline(self):
+        if self.deadline_reached():
+            raise RunDeadlineReached()
+
+    def paginate(self, name, paginator, rows, chunk_items=1000, **params):
+        # Pages through in chunks of at most chunk_items items. The rows the caller appended for each
+        # chunk are saved with botocore's resume token once the chunk is done; saved chunks are put
+        # back into rows instead of being fetched again.
+        prefix = f"runs/{self.run_id}/pages/{name}/"
+        token = None
+        chunk_keys = self.store.list_keys(prefix)
+        for key in chunk_keys:
+            chunk = json.loads(self.store.get(key))
+            rows.extend(chunk['Rows'])
+            token = chunk['NextToken']
+        if chunk_keys and token is None:
+            return
         
-    ebs_volumes = get_ebs_volumes()
-    ebs_snapshots = get_ebs_snapshots()
-    s3_data = get_s3_data()
-    network_topology_data = get_network_topology()
-    eks_data = get_eks_data()
-    rds_data = get_rds_data()
-    dynamodb_data = get_dynamodb_data()
-    elasticache_data = get_elasticache_data()
-    efs_data = get_efs_data()
-    load_balancers_data = get_load_balancers_data()
-    cloudwatch_logs_data = get_cloudwatch_logs_data()
-    lambda_functions_data = get_lambda_functions_data()
-    elasticsearch_data = get_elasticsearch_data()
-    kinesis_data = get_kinesis_data()
-    sqs_data = get_sqs_data()
-    sns_data = get_sns_data()
-    unused_eips_data = get_unused_eips_data()
-    data_transfer_costs = get_data_transfer_costs()
-    cloudfront_data = get_cloudfront_data()
-    
-    finops_data = {
-        'cost_and_usage': cost_and_usage,
-        'savings':{
-            'reservation_utilization': reservation_utilization,
-            'savings_plans_coverage': savings_plans_coverage,
-            'savings_plans_utilization': savings_plans_utilization,
-        },
-        'computing':{
-            'ec2_instances': ec2_instances_data,
-            'eks_data': eks_data,
-            'lambda_functions': lambda_functions_data,
-            'elasticsearch_data': elasticsearch_data,
-        },
-        'storage':{
-            'ebs_volumes': ebs_volumes,
-            'ebs_snapshots': ebs_snapshots,
-            's3_data': s3_data,
-            'efs_data': efs_data,
-        },
-        'databases':{
-            'rds_data': rds_data,
-            'dynamodb_data': dynamodb_data,
-            'elasticache_data': elasticache_data,
-        },
-        'networking':{
-            'network_topology': network_topology_data['VpcData'],
-            'lost_nat_gateways': network_topology_data['LostNatGateways'],
-            'unused_eips': unused_eips_data,
-            'data_transfer_costs': data_transfer_costs,
-            'cloudfront_data': cloudfront_data,
-            'load_balancers': load_balancers_data,
+        chunk_number = len(chunk_keys)
+        while True:
+            pagination_config = {'MaxItems': chunk_items}
+            if token:
+                pagination_config['StartingToken'] = token
+            page_iterator = paginator.paginate(PaginationConfig=pagination_config, **params)
+            rows_before = len(rows)
+            for page in page_iterator:
+                yield page
+            token = page_iterator.resume_token
+            chunk = {'NextToken': token, 'Rows': rows[rows_before:]}
+            self.store.put(f"{prefix}{chunk_number:06d}.json", json.dumps(chunk, default=json_default).encode('utf-8'))
+            chunk_number += 1
+            if token is None:
+                return
+            self.check_deadline()
+
+def paginate_with_checkpoint(paginator, checkpoint, name, rows, **params):
+    if checkpoint is None:
+        return paginator.paginate(**params)
+    return checkpoint.paginate(name, paginator, rows, **params)
+
+def create_run_checkpoint(checkpoint_options, context):
+    deadline = None
+    if context is not None:
+        # Stop early enough to save what has been collected before Lambda kills the invocation
+        remaining_seconds = context.get_remaining_time_in_millis() / 1000
+        deadline = time.monotonic() + remaining_seconds - checkpoint_options.get('safety_seconds', 30)
+    return RunCheckpoint(
+        create_store(checkpoint_options.get('store', {})),
+        checkpoint_options.get('run_id') or uuid.uuid4().hex,
+        deadline
+    )
+
+class SectionFreshness:
+    # Keeps the sections of every collector with the time they were refreshed. Collectors whose
+    # sections are older than their max_age are stale and refreshed, oldest first, while the time
+    # budget lasts; the others are served from the store. Sections saved under other collector
+    # options, as get_options returns them, are never served and count as never refreshed.
+
+    def __init__(self, store, max_ages=None, deadline=None, get_options=None):
+        self.store = store
+        self.max_ages = max_ages or {}
+        self.deadline = deadline
+        self.get_options = get_options or (lambda name: {})
+        self.entries = {}
+        self.stats = {'Refreshed': [], 'Served': {}, 'ServedStale': {}, 'Deferred': []}
+
+    def entry_key(self, name):
+        return f"sections/{name}.json"
+
+    def load(self, name):
+        if name not in self.entries:
+            data = self.store.get(self.entry_key(name))
+            entry = json.loads(data) if data is not None else None
+            if entry is not None and entry.get('Options') != get_fingerprint(self.get_options(name)):
+                entry = None
+            self.entries[name] = entry
+        return self.entries[name]
+
+    def get_age(self, name):
+        entry = self.load(name)
+        return time.time() - entry['RefreshedAt'] if entry else None
+
+    def is_stale(self, name):
+        age = self.get_age(name)
+        return age is None or age > self.max_ages.get(name, COLLECTORS[name].get('max_age', 3600))
+
+    def order(self, names):
+        # Fresh collectors first, they only cost a store read, then the stale ones oldest first
+        fresh = [name for name in names if not self.is_stale(name)]
+        stale = [name for name in names if self.is_stale(name)]
+        stale.sort(key=lambda name: self.load(name)['RefreshedAt'] if self.load(name) else float('-inf'))
+        return fresh + stale
+
+    def should_refresh(self, name):
+        if not self.is_stale(name):
+            return False
+        if self.deadline is None:
+            return True
+        # A collector is only started when its last refresh would still fit in the budget
+        entry = self.load(name)
+        return self.deadline - time.monotonic() > (entry['Seconds'] if entry else 0)
+
+    def serve(self, name):
+        entry = self.load(name)
+        if entry is None:
+            self.stats['Deferred'].append(name)
+            return None
+        age = round(self.get_age(name), 1)
+        if self.is_stale(name):
+            self.stats['ServedStale'][name] = age
+        else:
+            self.stats['Served'][name] = age
+        return {tuple(path.split('/')): value for path, value in entry['Sections'].items()}
+
+    def save(self, name, collector_sections, seconds):
+        entry = {
+            'RefreshedAt': time.time(),
+            'Seconds': seconds,
+            'Options': get_fingerprint(self.get_options(name)),
+            'Sections': {'/'.join(path): value for path, value in collector_sections.items()}
+        }
+        self.store.put(self.entry_key(name), json.dumps(entry, default=json_default).encode('utf-8'))
+        # The stored entry is what later reads see, Records and dates included
+        self.entries[name] = json.loads(json.dumps(entry, default=json_default))
+        self.stats['Refreshed'].append(name)
+
+def get_freshness_options(event, name):
+    # Everything besides time the sections of a collector depend on: its options and the inventory
+    options = get_collector_options(event, name)
+    if event.get('inventory') and COLLECTORS[name].get('inventory'):
+        options['inventory'] = event['inventory']
+    return options
+
+def create_section_freshness(freshness_options, context, event=None):
+    deadline = None
+    if freshness_options.get('budget_seconds') is not None:
+        deadline = time.monotonic() + freshness_options['budget_seconds']
+    elif context is not None:
+        remaining_seconds = context.get_remaining_time_in_millis() / 1000
+        deadline = time.monotonic() + remaining_seconds - freshness_options.get('safety_seconds', 30)
+    return SectionFreshness(
+        create_store(freshness_options.get('store', {})),
+        freshness_options.get('max_age'),
+        deadline,
+        partial(get_freshness_options, event or {})
+    )
+
+# Every collector with the AWS clients it uses and the report sections it fills. Collectors returning
+# several sections map each result key to its section path, the others map None. Services are client
+# names, or (name, region) when the client is pinned to a region. Resumable collectors take a
+# checkpoint option and save their progress through long listings or stop waiting at its deadline.
+# Account-scoped collectors read global or account-wide data and run once per account in coordinated
+# runs, the others once per region.
+# Collectors that are not default only run when named in the event's collectors. Inventory collectors
+# take their resource listings from the AWS Config inventory when the event sets one. max_age is the
+# freshness SLA in seconds: how long the sections of a collector can be served from the section store.
+COLLECTORS = {
+    'resource_tags': {'function': get_resource_tags, 'services': ('resourcegroupstaggingapi',), 'max_age': 21600, 'sections': {None: ('others', 'resource_tags')}},
+    'reservation_utilization': {'function': get_reservation_utilization, 'services': ('ce',), 'scope': 'account', 'max_age': 21600, 'sections': {None: ('savings', 'reservation_utilization')}},
+    'savings_plans_coverage': {'function': get_savings_plans_coverage, 'services': ('ce',), 'scope': 'account', 'max_age': 21600, 'sections': {None: ('savings', 'savings_plans_coverage')}},
+    'savings_plans_utilization': {'function': get_savings_plans_utilization, 'services': ('ce',), 'scope': 'account', 'max_age': 21600, 'sections': {None: ('savings', 'savings_plans_utilization')}},
+    'cost_and_usage': {'function': get_cost_and_usage, 'services': ('ce',), 'scope': 'account', 'max_age': 21600, 'sections': {None: ('cost_and_usage',)}},
+    'compute_optimizer': {'function': get_compute_optimizer_data, 'services': ('compute-optimizer', 's3'), 'default': False, 'resumable': True, 'max_age': 86400, 'sections': {
+        'Findings': ('computing', 'compute_optimizer_findings'),
+        'AutoScalingGroups': ('computing', 'auto_scaling_groups')
+    }},
+    'ec2_instances': {'function': get_ec2_instances_data, 'services': ('ec2', 'compute-optimizer', 'sts', 'cloudwatch'), 'max_age': 3600, 'sections': {None: ('computing', 'ec2_instances')}},
+    'ebs_volumes': {'function': get_ebs_volumes, 'services': ('ec2',), 'inventory': True, 'max_age': 21600, 'sections': {None: ('storage', 'ebs_volumes')}},
+    'ebs_snapshots': {'function': get_ebs_snapshots, 'services': ('ec2', 'dlm'), 'resumable': True, 'max_age': 86400, 'sections': {None: ('storage', 'ebs_snapshots')}},
+    's3_data': {'function': get_s3_data, 'services': ('s3', 'cloudwatch'), 'scope': 'account', 'max_age': 86400, 'sections': {None: ('storage', 's3_data')}},
+    'network_topology': {'function': get_network_topology, 'services': ('ec2', 'cloudwatch'), 'inventory': True, 'max_age': 86400, 'sections': {
+        'VpcData': ('networking', 'network_topology'),
+        'LostNatGateways': ('networking', 'lost_nat_gateways')
+    }},
+    'eks_data': {'function': get_eks_data, 'services': ('eks', 'ec2', 'cloudwatch'), 'max_age': 3600, 'sections': {None: ('computing', 'eks_data')}},
+    'rds_data': {'function': get_rds_data, 'services': ('rds', 'cloudwatch'), 'max_age': 3600, 'sections': {
+        'DBInstances': ('databases', 'rds_data'),
+        'SnapshotStorage': ('databases', 'rds_snapshot_storage'),
+        'OrphanedSnapshots': ('databases', 'rds_orphaned_snapshots')
+    }},
+    'dynamodb_data': {'function': get_dynamodb_data, 'services': ('dynamodb', 'cloudwatch'), 'max_age': 3600, 'sections': {None: ('databases', 'dynamodb_data')}},
+    'elasticache_data': {'function': get_elasticache_data, 'services': ('elasticache', 'cloudwatch'), 'max_age': 3600, 'sections': {
+        'CacheClusters': ('databases', 'elasticache_data'),
+        'ReplicationGroups': ('databases', 'elasticache_replication_groups')
+    }},
+    'efs_data': {'function': get_efs_data, 'services': ('efs',), 'max_age': 21600, 'sections': {None: ('storage', 'efs_data')}},
+    'load_balancers': {'function': get_load_balancers_data, 'services': ('elbv2',), 'inventory': True, 'max_age': 21600, 'sections': {None: ('networking', 'load_balancers')}},
+    'cloudwatch_logs': {'function': get_cloudwatch_logs_data, 'services': ('logs',), 'max_age': 21600, 'sections': {
+        'LogGroups': ('others', 'cloudwatch_logs'),
+        'Summary': ('others', 'cloudwatch_logs_summary')
+    }},
+    'lambda_functions': {'function': get_lambda_functions_data, 'services': ('lambda', 'logs'), 'resumable': True, 'max_age': 3600, 'sections': {None: ('computing', 'lambda_functions')}},
+    'elasticsearch_data': {'function': get_elasticsearch_data, 'services': ('opensearch',), 'max_age': 21600, 'sections': {None: ('computing', 'elasticsearch_data')}},
+    'kinesis_data': {'function': get_kinesis_data, 'services': ('kinesis', 'cloudwatch'), 'max_age': 3600, 'sections': {None: ('others', 'kinesis_data')}},
+    'sqs_data': {'function': get_sqs_data, 'services': ('sqs',), 'inventory': True, 'max_age': 21600, 'sections': {None: ('others', 'sqs_data')}},
+    'sns_data': {'function': get_sns_data, 'services': ('sns',), 'inventory': True, 'max_age': 21600, 'sections': {None: ('others', 'sns_data')}},
+    'unused_eips': {'function': get_unused_eips_data, 'services': ('ec2',), 'inventory': True, 'max_age': 21600, 'sections': {None: ('networking', 'unused_eips')}},
+    'data_transfer_costs': {'function': get_data_transfer_costs, 'services': ('ce',), 'scope': 'account', 'max_age': 21600, 'sections': {None: ('networking', 'data_transfer_costs')}},
+    'cloudfront_data': {'function': get_cloudfront_data, 'services': ('cloudfront', ('cloudwatch', 'us-east-1')), 'scope': 'account', 'max_age': 3600, 'sections': {None: ('networking', 'cloudfront_data')}},
+}
+
+# Order of the sections in the report
+REPORT_LAYOUT = [
+    ('cost_and_usage',),
+    ('savings', 'reservation_utilization'),
+    ('savings', 'savings_plans_coverage'),
+    ('savings', 'savings_plans_utilization'),
+    ('computing', 'ec2_instances'),
+    ('computing', 'eks_data'),
+    ('computing', 'lambda_functions'),
+    ('computing', 'elasticsearch_data'),
+    ('computing', 'auto_scaling_groups'),
+    ('storage', 'ebs_volumes'),
+    ('storage', 'ebs_snapshots'),
+    ('storage', 's3_data'),
+    ('storage', 'efs_data'),
+    ('databases', 'rds_data'),
+    ('databases', 'rds_snapshot_storage'),
+    ('databases', 'rds_orphaned_snapshots'),
+    ('databases', 'dynamodb_data'),
+    ('databases', 'elasticache_data'),
+    ('databases', 'elasticache_replication_groups'),
+    ('networking', 'network_topology'),
+    ('networking', 'lost_nat_gateways'),
+    ('networking', 'unused_eips'),
+    ('networking', 'data_transfer_costs'),
+    ('networking', 'cloudfront_data'),
+    ('networking', 'load_balancers'),
+    ('others', 'cloudwatch_logs'),
+    ('others', 'cloudwatch_logs_summary'),
+    ('others', 'kinesis_data'),
+    ('others', 'sqs_data'),
+    ('others', 'sns_data'),
+]
+
+# Sections holding an id-keyed index instead of report rows, with the report rows each part of the
+# index is joined onto: (index key, target section, row id field or function, field added to the row)
+SECTION_JOINS = {
+    ('computing', 'compute_optimizer_findings'): [
+        ('EC2Instances', ('computing', 'ec2_instances'), 'InstanceId', 'ComputeOptimizer'),
+        ('EBSVolumes', ('storage', 'ebs_volumes'), 'VolumeId', 'ComputeOptimizer'),
+        ('LambdaFunctions', ('computing', 'lambda_functions'), 'FunctionName', 'ComputeOptimizer'),
+    ],
+    ('others', 'resource_tags'): [
+        ('ec2', ('computing', 'ec2_instances'), 'InstanceId', 'Tags'),
+        ('ec2', ('storage', 'ebs_volumes'), 'VolumeId', 'Tags'),
+        ('ec2', ('storage', 'ebs_snapshots'), 'SnapshotId', 'Tags'),
+        ('ec2', ('networking', 'network_topology'), 'VpcId', 'Tags'),
+        ('ec2', ('networking', 'lost_nat_gateways'), 'NatGatewayId', 'Tags'),
+        ('ec2', ('networking', 'unused_eips'), 'AllocationId', 'Tags'),
+        ('eks', ('computing', 'eks_data'), 'ClusterName', 'Tags'),
+        ('lambda', ('computing', 'lambda_functions'), 'FunctionName', 'Tags'),
+        ('es', ('computing', 'elasticsearch_data'), 'DomainName', 'Tags'),
+        ('s3', ('storage', 's3_data'), 'BucketName', 'Tags'),
+        ('elasticfilesystem', ('storage', 'efs_data'), 'FileSystemId', 'Tags'),
+        ('rds', ('databases', 'rds_data'), 'DBInstanceIdentifier', 'Tags'),
+        ('dynamodb', ('databases', 'dynamodb_data'), 'TableName', 'Tags'),
+        ('elasticache', ('databases', 'elasticache_data'), 'CacheClusterId', 'Tags'),
+        ('elasticache', ('databases', 'elasticache_replication_groups'), 'ReplicationGroupId', 'Tags'),
+        ('cloudfront', ('networking', 'cloudfront_data'), 'DistributionId', 'Tags'),
+        ('elasticloadbalancing', ('networking', 'load_balancers'), lambda row: get_arn_resource_id(row['LoadBalancerArn']), 'Tags'),
+        ('logs', ('others', 'cloudwatch_logs'), 'LogGroupName', 'Tags'),
+        ('kinesis', ('others', 'kinesis_data'), 'StreamName', 'Tags'),
+        ('sqs', ('others', 'sqs_data'), lambda row: row['QueueUrl'].rsplit('/', 1)[-1], 'Tags'),
+        ('sns', ('others', 'sns_data'), lambda row: get_arn_resource_id(row['TopicArn']), 'Tags'),
+    ],
+}
+
+# Index sections holding one index per region they were read in
+REGION_KEYED_INDEXES = {('others', 'resource_tags')}
+
+# Top-level event flags that map onto a collector option
+EVENT_FLAG_OPTIONS = {
+    'include_target_details': ('load_balancers', 'include_target_details'),
+    'tag_keys': ('resource_tags', 'tag_keys'),
+    'kinesis_metrics': ('kinesis_data', 'include_metrics'),
+}
+
+def get_collector_options(event, name):
+    options = dict(event.get('collector_options', {}).get(name, {}))
+    for flag, (collector_name, option) in EVENT_FLAG_OPTIONS.items():
+        if collector_name == name and flag in event:
+            options[option] = event[flag]
+    return options
+
+def run_collector(name, options):
+    collector = COLLECTORS[name]
+    token = current_collector.set(name)
+    try:
+        result = collector['function'](**options)
+    finally:
+        current_collector.reset(token)
+    return {path: result if key is None else result[key] for key, path in collector['sections'].items()}
+
+def profile_call(top_n, func, *args, **kwargs):
+    # Runs func under cProfile and tracemalloc, both only imported when profiling is asked for.
+    # cProfile only sees the calling thread, so work done on fan_out pools shows up as waiting time.
+    import cProfile
+    import pstats
+    import tracemalloc
+    
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    memory_before, _ = tracemalloc.get_traced_memory()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        result = profiler.runcall(func, *args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - started
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+    
+    function_stats = pstats.Stats(profiler).stats
+    top_functions = heapq.nlargest(top_n, function_stats.items(), key=lambda item: item[1][3])
+    return result, {
+        'Seconds': round(seconds, 4),
+        'PeakMemoryBytes': memory_peak - memory_before,
+        'RetainedMemoryBytes': memory_after - memory_before,
+        'TopFunctions': [
+            {
+                'Function': f"{function_name} ({os.path.basename(file_name)}:{line})",
+                'Calls': calls,
+                'TotalSeconds': round(total_seconds, 4),
+                'CumulativeSeconds': round(cumulative_seconds, 4)
+            }
+            for (file_name, line, function_name), (_, calls, total_seconds, cumulative_seconds, _) in top_functions
+        ]
+    }
+
+def build_report(sections):
+    report = {}
+    for path in REPORT_LAYOUT:
+        if path not in sections:
+            continue
+        parent = report
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = sections[path]
+    return report
+
+def warm_up_clients(collector_names):
+    started = time.perf_counter()
+    for name in collector_names:
+        for service in COLLECTORS[name]['services']:
+            if isinstance(service, tuple):
+                get_client(*service)
+            else:
+                get_client(service)
+    INIT_STATS['WarmupSeconds'] = round(INIT_STATS['WarmupSeconds'] + time.perf_counter() - started, 4)
+
+def get_selected_collectors(event):
+    names = event.get('collectors') or [name for name, collector in COLLECTORS.items() if collector.get('default', True)]
+    unknown = [name for name in names if name not in COLLECTORS]
+    if unknown:
+        raise ValueError(f"Unknown collectors: {', '.join(unknown)}")
+    return names
+
+# The field identifying a resource across runs in each list section, within the account and region
+# of the row when it has them. Dict sections are keyed by their own keys; rows of list sections
+# without an id field, or whose id another row already took, are keyed by their fingerprint.
+SECTION_ROW_IDS = {
+    ('computing', 'ec2_instances'): 'InstanceId',
+    ('computing', 'eks_data'): 'ClusterName',
+    ('computing', 'lambda_functions'): 'FunctionName',
+    ('computing', 'elasticsearch_data'): 'DomainName',
+    ('computing', 'auto_scaling_groups'): 'AutoScalingGroupName',
+    ('storage', 'ebs_volumes'): 'VolumeId',
+    ('storage', 'ebs_snapshots'): 'SnapshotId',
+    ('storage', 's3_data'): 'BucketName',
+    ('storage', 'efs_data'): 'FileSystemId',
+    ('databases', 'rds_data'): 'DBInstanceIdentifier',
+    ('databases', 'dynamodb_data'): 'TableName',
+    ('databases', 'elasticache_data'): 'CacheClusterId',
+    ('databases', 'elasticache_replication_groups'): 'ReplicationGroupId',
+    ('networking', 'network_topology'): 'VpcId',
+    ('networking', 'lost_nat_gateways'): 'NatGatewayId',
+    ('networking', 'unused_eips'): 'AllocationId',
+    ('networking', 'cloudfront_data'): 'DistributionId',
+    ('networking', 'load_balancers'): 'LoadBalancerArn',
+    ('others', 'cloudwatch_logs'): 'LogGroupName',
+    ('others', 'kinesis_data'): 'StreamName',
+    ('others', 'sqs_data'): 'QueueUrl',
+    ('others', 'sns_data'): 'TopicArn',
+}
+
+def get_fingerprint(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+def index_section_rows(path, value):
+    # {resource id: row} for one typed section
+    if isinstance(value, dict):
+        return {str(key): row for key, row in value.items()}
+    if not isinstance(value, list):
+        return {'_value': value}
+    id_field = SECTION_ROW_IDS.get(path)
+    rows = {}
+    for row in value:
+        row_id = None
+        if id_field and isinstance(row, dict) and row.get(id_field) is not None:
+            # Rows of coordinated runs carry their account and region, the same name can exist in each
+            row_id = '/'.join(str(row[field]) for field in ('Account', 'Region', id_field) if row.get(field) is not None)
+        if row_id is None or row_id in rows:
+            row_id = get_fingerprint(row)
+        rows[row_id] = row
+    return rows
+
+def diff_row_fields(old_row, new_row):
+    if not isinstance(old_row, dict) or not isinstance(new_row, dict):
+        return {'_value': {'Old': old_row, 'New': new_row}}
+    changed = {}
+    for field in list(old_row) + [field for field in new_row if field not in old_row]:
+        old_value, new_value = old_row.get(field), new_row.get(field)
+        if get_fingerprint(old_value) != get_fingerprint(new_value):
+            changed[field] = {'Old': old_value, 'New': new_value}
+    return changed
+
+def build_report_snapshot(sections):
+    # The typed rows of every section keyed by resource id, with the fingerprint of each row
+    snapshot = {'RunAt': datetime.utcnow().isoformat(), 'Sections': {}, 'Fingerprints': {}}
+    for path in REPORT_LAYOUT:
+        if path not in sections:
+            continue
+        # A JSON round trip leaves the rows as they will be read back on the next run
+        typed = json.loads(json.dumps(render_report(sections[path], typed=True, path=path), default=json_default))
+        rows = index_section_rows(path, typed)
+        section_key = '/'.join(path)
+        snapshot['Sections'][section_key] = rows
+        snapshot['Fingerprints'][section_key] = {row_id: get_fingerprint(row) for row_id, row in rows.items()}
+    return snapshot
+
+def diff_report_snapshots(previous, current):
+    # Rows are only compared field by field when their fingerprints differ
+    delta = {'BaseRunAt': previous['RunAt'] if previous else None, 'Sections': {}}
+    for section_key, rows in current['Sections'].items():
+        fingerprints = current['Fingerprints'][section_key]
+        old_rows = previous['Sections'].get(section_key, {}) if previous else {}
+        old_fingerprints = previous['Fingerprints'].get(section_key, {}) if previous else {}
+        added = {row_id: row for row_id, row in rows.items() if row_id not in old_fingerprints}
+        removed = [row_id for row_id in old_fingerprints if row_id not in rows]
+        changed = {
+            row_id: diff_row_fields(old_rows[row_id], rows[row_id])
+            for row_id, fingerprint in fingerprints.items()
+            if row_id in old_fingerprints and old_fingerprints[row_id] != fingerprint
+        }
+        if added or removed or changed:
+            delta['Sections'][section_key] = {
+                'Added': added,
+                'Removed': removed,
+                'Changed': changed,
+                'Unchanged': len(rows) - len(added) - len(changed)
+            }
+    if previous:
+        # Sections the previous run had and this one did not collect are left out, not reported as removed
+        delta['SkippedSections'] = sorted(key for key in previous['Sections'] if key not in current['Sections'])
+    return delta
+
+def compute_report_delta(delta_options, sections):
+    # Diffs the sections against the previous run's snapshot and saves theirs in its place
+    store = create_store(delta_options.get('store', {}))
+    key = delta_options.get('key', 'delta/previous_report.json.gz')
+    data = store.get(key)
+    previous = json.loads(gzip.decompress(data)) if data is not None else None
+    current = build_report_snapshot(sections)
+    delta = diff_report_snapshots(previous, current)
+    if previous and delta_options.get('keep_skipped', True):
+        # Sections this run did not collect keep their last snapshot, so a selective run does not
+        # make the next full run report them as all new
+        for section_key in delta['SkippedSections']:
+            current['Sections'][section_key] = previous['Sections'][section_key]
+            current['Fingerprints'][section_key] = previous['Fingerprints'][section_key]
+    store.put(key, gzip.compress(json.dumps(current, separators=(',', ':')).encode('utf-8')))
+    return delta
+
+def get_join_match_keys(target_path):
+    # Rows of account-scoped collectors are read in one region, whatever region their index was
+    account_scoped = any(
+        collector.get('scope') == 'account' and target_path in collector['sections'].values()
+        for collector in COLLECTORS.values()
+    )
+    return ('Account',) if account_scoped else ('Account', 'Region')
+
+def add_join_index(sections, join_indexes, path, value, origin=None):
+    # Indexes are joined onto the rows collected so far and kept for the rows still to come, with the
+    # account and region they were read in
+    origin = origin or {}
+    if path in REGION_KEYED_INDEXES:
+        entries = [({**origin, 'Region': region}, index) for region, index in value.items()]
+    else:
+        entries = [(origin, value)]
+    join_indexes.setdefault(path, []).extend(entries)
+    for index_key, target_path, id_field, field in SECTION_JOINS[path]:
+        if target_path in sections:
+            enrich_rows(sections[target_path], entries, index_key, id_field, field, get_join_match_keys(target_path))
+
+def add_collector_sections(sections, collector_sections, exporter, keep_sections, join_indexes):
+    for path, value in collector_sections.items():
+        if path in SECTION_JOINS:
+            add_join_index(sections, join_indexes, path, value)
+            continue
+        for index_path, entries in join_indexes.items():
+            for index_key, target_path, id_field, field in SECTION_JOINS[index_path]:
+                if target_path == path:
+                    enrich_rows(value, entries, index_key, id_field, field, get_join_match_keys(path))
+        # Resource lists are written out as soon as their collector finishes
+        if exporter and isinstance(value, list):
+            exporter.write_section(path[-1], (render_report(row, typed=True, path=path) for row in value))
+        if keep_sections:
+            sections[path] = value
+
+def stop_checkpointed_run(event, context, checkpoint, completed_collectors, pending_collectors, run_stats):
+    print(f"Run {checkpoint.run_id} stopped before its deadline, {len(pending_collectors)} collectors pending")
+    checkpoint_options = event['checkpoint']
+    chained = bool(checkpoint_options.get('chain')) and context is not None
+    if chained:
+        # Hand the rest of the run to a fresh invocation of this function
+        get_client('lambda').invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=json.dumps({**event, 'checkpoint': {**checkpoint_options, 'run_id': checkpoint.run_id}}).encode('utf-8')
+        )
+    return {
+        '_checkpoint': {
+            'RunId': checkpoint.run_id,
+            'Complete': False,
+            'Chained': chained,
+            'CompletedCollectors': completed_collectors,
+            'PendingCollectors': pending_collectors
         },
-        'others':{
-            'cloudwatch_logs': cloudwatch_logs_data,
-            'kinesis_data': kinesis_data,
-            'sqs_data': sqs_data,
-            'sns_data': sns_data,
+        '_run_stats': run_stats
+    }
+
+class LocalInvoker:
+    # Runs each worker in this process, for local testing. Results go through JSON like a Lambda payload.
+
+    def invoke(self, worker_event):
+        return json.loads(json.dumps(lambda_handler(worker_event, None), default=str))
+
+class LambdaInvoker:
+    # Runs each worker as a synchronous invocation of the given function
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+
+    def invoke(self, worker_event):
+        response = get_client('lambda').invoke(
+            FunctionName=self.function_name,
+            InvocationType='RequestResponse',
+            Payload=json.dumps(worker_event, default=str).encode('utf-8')
+        )
+        payload = json.loads(response['Payload'].read())
+        if response.get('FunctionError'):
+            raise RuntimeError(payload.get('errorMessage', response['FunctionError']))
+        return payload
+
+def create_invoker(coordinator_options, context):
+    invoker_type = coordinator_options.get('invoker', 'lambda')
+    if invoker_type == 'local':
+        return LocalInvoker()
+    if invoker_type == 'lambda':
+        return LambdaInvoker(coordinator_options.get('function_name') or context.invoked_function_arn)
+    raise ValueError(f"Unsupported invoker: {invoker_type}")
+
+def get_shards(collector_names, regions, accounts):
+    # One shard per collector, account and region. Account-scoped collectors only run in the first region.
+    shards = []
+    for account in accounts:
+        for region_index, region in enumerate(regions):
+            for name in collector_names:
+                if COLLECTORS[name].get('scope') == 'account' and region_index > 0:
+                    continue
+                shards.append({
+                    'Collector': name,
+                    'Account': account.get('id'),
+                    'RoleArn': account.get('role_arn'),
+                    'Region': region
+                })
+    return shards
+
+def run_shard(shard, event):
+    token = current_shard.set(shard)
+    try:
+        started = time.perf_counter()
+        options = get_collector_options(event, shard['Collector'])
+        if event.get('inventory') and COLLECTORS[shard['Collector']].get('inventory'):
+            # Each worker only asks the inventory for its own account and region
+            filters = {**event['inventory'].get('filters', {}), 'awsRegion': shard['Region']}
+            if shard.get('Account'):
+                filters['accountId'] = shard['Account']
+            options['inventory'] = create_config_inventory({**event['inventory'], 'filters': filters})
+        collector_sections = run_collector(shard['Collector'], options)
+        return {
+            'Sections': {'/'.join(path): to_plain(value) for path, value in collector_sections.items()},
+            'Seconds': round(time.perf_counter() - started, 4)
         }
+    finally:
+        current_shard.reset(token)
+
+def invoke_shard(invoker, worker_event):
+    shard = worker_event['shard']
+    try:
+        return invoker.invoke(worker_event)
+    except Exception as e:
+        print(f"Shard {shard['Collector']} in {shard['Account'] or 'this account'}/{shard['Region']} failed: {e}")
+        return {'Sections': {}, 'Error': str(e)}
+
+def merge_shard_results(shards, results, tag_rows):
+    # Results are merged in shard order, whatever order the workers finished in. Across several
+    # accounts or regions, list rows are concatenated and tagged with their origin, other values
+    # are keyed by "account/region". Index sections are returned apart as (path, index, origin),
+    # to be joined onto the rows of their own account and region.
+    merged = {}
+    indexes = []
+    for shard, result in zip(shards, results):
+        origin = {'Account': shard['Account'], 'Region': shard['Region']}
+        for path_key, value in result['Sections'].items():
+            path = tuple(path_key.split('/'))
+            if path in SECTION_JOINS:
+                indexes.append((path, value, origin))
+            elif not tag_rows:
+                merged[path] = value
+            elif isinstance(value, list):
+                merged.setdefault(path, []).extend({**row, **origin} if isinstance(row, dict) else row for row in value)
+            else:
+                merged.setdefault(path, {})[f"{shard['Account']}/{shard['Region']}"] = value
+    return merged, indexes
+
+def run_coordinator(event, context, run_stats):
+    coordinator_options = event['coordinator']
+    regions = coordinator_options.get('regions') or [get_session().region_name]
+    accounts = coordinator_options.get('accounts') or [{}]
+    tag_rows = len(regions) > 1 or len(accounts) > 1
+    if tag_rows and not accounts[0].get('id'):
+        accounts = [{**account, 'id': account.get('id') or get_client('sts').get_caller_identity()['Account']} for account in accounts]
+    
+    shards = get_shards(get_selected_collectors(event), regions, accounts)
+    # Workers get the collector options of the coordinator event, but nothing that makes them coordinate or export
+    worker_event = {key: value for key, value in event.items() if key in ('collector_options', 'inventory', 'metric_cache') or key in EVENT_FLAG_OPTIONS}
+    invoker = create_invoker(coordinator_options, context)
+    results = fan_out(
+        partial(invoke_shard, invoker),
+        [{**worker_event, 'mode': 'worker', 'shard': shard} for shard in shards],
+        max_concurrency=coordinator_options.get('max_workers', 16)
+    )
+    
+    run_stats['Shards'] = [
+        {**{key: shard[key] for key in ('Collector', 'Account', 'Region')}, 'Seconds': result.get('Seconds'), 'Error': result.get('Error')}
+        for shard, result in zip(shards, results)
+    ]
+    return merge_shard_results(shards, results, tag_rows)
+
+invocation_count = 0
+
+def run_with_cassette(event, context):
+    # Records or replays the AWS traffic of the run wrapped around it
+    global active_cassette
+    cassette_options = event['cassette']
+    cassette = Cassette(
+        cassette_options.get('path', '/tmp/finops_cassette.json.gz'),
+        cassette_options.get('mode', 'record'),
+        cassette_options.get('latency', False)
+    )
+    with clients_lock:
+        active_cassette = cassette
+        for client in clients.values():
+            cassette.attach(client)
+    try:
+        return lambda_handler({key: value for key, value in event.items() if key != 'cassette'}, context)
+    finally:
+        with clients_lock:
+            active_cassette = None
+            cassette.detach()
+        cassette.save()
+
+def run_with_coalescing(event, context):
+    # Identical read calls share their response for the length of the run wrapped around it
+    global active_coalescer
+    coalesce_options = event['coalesce'] if isinstance(event['coalesce'], dict) else {}
+    coalescer = RequestCoalescer(coalesce_options.get('max_responses', 256))
+    with clients_lock:
+        active_coalescer = coalescer
+        for (account_id, _, region_name), client in clients.items():
+            coalescer.attach(client, f"{account_id}:{region_name}")
+    try:
+        return lambda_handler(event, context)
+    finally:
+        with clients_lock:
+            active_coalescer = None
+            coalescer.detach()
+
+def run_with_metric_cache(event, context):
+    # Metric queries of the run wrapped around it are served from the metric cache, saved at the end
+    global active_metric_cache
+    cache_options = event['metric_cache']
+    active_metric_cache = MetricCache(
+        create_store(cache_options.get('store', {})),
+        cache_options.get('key_prefix', 'metrics/'),
+        cache_options.get('period', 3600),
+        cache_options.get('retention_days', 7),
+        cache_options.get('settle_periods', 1)
+    )
+    try:
+        return lambda_handler(event, context)
+    finally:
+        active_metric_cache.save()
+        active_metric_cache = None
+
+def lambda_handler(event, context):
+    if event.get('cassette'):
+        return run_with_cassette(event, context)
+    if event.get('coalesce') and active_coalescer is None:
+        return run_with_coalescing(event, context)
+    if event.get('metric_cache') and active_metric_cache is None:
+        return run_with_metric_cache(event, context)
+    global invocation_count
+    invocation_count += 1
+    if event.get('mode') == 'worker':
+        return run_shard(event['shard'], event)
+    
+    run_stats = {
+        'ColdStart': invocation_count == 1,
+        'Init': {
+            **INIT_STATS,
+            'ClientCreationSeconds': dict(INIT_STATS['ClientCreationSeconds'])
+        },
+        'CollectorSeconds': {}
+    }
+    if active_coalescer is not None:
+        run_stats['CoalescedCalls'] = active_coalescer.stats
+    if active_metric_cache is not None:
+        run_stats['MetricCache'] = active_metric_cache.stats
+    
+    exporter = create_columnar_exporter(event['export']) if event.get('export') else None
+    return_report = exporter is None or event['export'].get('return_report', True)
+    # The delta is computed from the rows, so they are kept even when only the export goes back
+    keep_sections = return_report or bool(event.get('delta'))
+    
+    checkpoint = create_run_checkpoint(event['checkpoint'], context) if event.get('checkpoint') else None
+    if checkpoint:
+        run_stats['RunId'] = checkpoint.run_id
+        run_stats['ResumedCollectors'] = []
+    
+    # "profile": true, or {"top_n": N}, profiles every collector and the report serialization
+    profile_top_n = None
+    if event.get('profile'):
+        profile_top_n = event['profile'].get('top_n', 20) if isinstance(event['profile'], dict) else 20
+    run_profile = {}
+    
+    inventory = create_config_inventory(event['inventory']) if event.get('inventory') else None
+    
+    freshness = create_section_freshness(event['freshness'], context, event) if event.get('freshness') else None
+    if freshness:
+        run_stats['Freshness'] = freshness.stats
+    
+    sections = {}
+    join_indexes = {}
+    if event.get('coordinator'):
+        # Workers run the collectors, this invocation only merges their sections
+        merged, shard_indexes = run_coordinator(event, context, run_stats)
+        # Indexes go first, so the merged rows are joined before they are exported
+        for path, value, origin in shard_indexes:
+            add_join_index(sections, join_indexes, path, value, origin)
+        add_collector_sections(sections, merged, exporter, keep_sections, join_indexes)
+        selected_collectors = []
+    else:
+        selected_collectors = get_selected_collectors(event)
+        if freshness:
+            selected_collectors = freshness.order(selected_collectors)
+    for index, name in enumerate(selected_collectors):
+        collector_sections = checkpoint.load_collector(name) if checkpoint else None
+        if collector_sections is not None:
+            run_stats['ResumedCollectors'].append(name)
+        elif freshness and not freshness.should_refresh(name):
+            # Fresh sections, or stale ones the budget has no room left to refresh
+            collector_sections = freshness.serve(name)
+            if collector_sections is None:
+                continue
+        else:
+            options = get_collector_options(event, name)
+            if checkpoint and COLLECTORS[name].get('resumable'):
+                options['checkpoint'] = checkpoint
+            if inventory and COLLECTORS[name].get('inventory'):
+                options['inventory'] = inventory
+            started = time.perf_counter()
+            try:
+                if checkpoint:
+                    checkpoint.check_deadline()
+                if profile_top_n:
+                    collector_sections, run_profile[name] = profile_call(profile_top_n, run_collector, name, options)
+                else:
+                    collector_sections = run_collector(name, options)
+            except RunDeadlineReached:
+                return stop_checkpointed_run(event, context, checkpoint, selected_collectors[:index], selected_collectors[index:], run_stats)
+            run_stats['CollectorSeconds'][name] = round(time.perf_counter() - started, 4)
+            if checkpoint:
+                checkpoint.save_collector(name, collector_sections)
+            if freshness:
+                freshness.save(name, collector_sections, run_stats['CollectorSeconds'][name])
+        add_collector_sections(sections, collector_sections, exporter, keep_sections, join_indexes)
+    
+    # Clients built during this invocation, a warm container reuses them on the next one
+    run_stats['ClientCreationSeconds'] = {
+        name: seconds for name, seconds in INIT_STATS['ClientCreationSeconds'].items()
+        if name not in run_stats['Init']['ClientCreationSeconds']
     }
     
-    return finops_data
+    if not return_report:
+        result = {
+            'export': exporter.manifest,
+            '_run_stats': run_stats
+        }
+        if event.get('delta'):
+            result['_delta'] = compute_report_delta(event['delta'], sections)
+        if profile_top_n:
+            result['_profile'] = run_profile
+        return result
+    
+    finops_data = build_report(sections)
+    finops_data['_run_stats'] = run_stats
+    
+    typed = event.get('output_format', 'legacy') == 'typed'
+    if profile_top_n:
+        report, run_profile['_render'] = profile_call(profile_top_n, render_report, finops_data, typed)
+    else:
+        report = render_report(finops_data, typed)
+    if typed:
+        report['_units'] = get_report_units()
+    if exporter:
+        report['_export'] = exporter.manifest
+    if event.get('delta'):
+        delta = compute_report_delta(event['delta'], sections)
+        if event['delta'].get('emit', 'delta') == 'delta':
+            # Only the changes since the previous run go back, with the run's own stats
+            report = {'_delta': delta, '_run_stats': report['_run_stats'], **({'_export': report['_export']} if exporter else {})}
+        else:
+            report['_delta'] = delta
+    
+    encoding = event.get('encoding')
+    if profile_top_n:
+        # Encoding is profiled on the report without its profile, the same work the response takes
+        _, run_profile['_serialization'] = profile_call(profile_top_n, encode_report, report, encoding or 'json')
+        report['_profile'] = run_profile
+    
+    if not encoding:
+        return report
+    
+    body, content_type = encode_report(report, encoding)
+    is_binary = encoding != 'json'
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': content_type
+        },
+        'body': base64.b64encode(body).decode('ascii') if is_binary else body.decode('utf-8'),
+        'isBase64Encoded': is_binary
+    }
+
+# Optional init-phase warmup, pre-building the clients of the listed collectors (or "all")
+if os.environ.get('WARMUP_COLLECTORS'):
+    warmup_names = os.environ['WARMUP_COLLECTORS']
+    warm_up_clients(list(COLLECTORS) if warmup_names == 'all' else [name.strip() for name in warmup_names.split(',') if name.strip()])
+
+INIT_STATS['ModuleLoadSeconds'] = round(time.perf_counter() - MODULE_LOAD_STARTED, 4)
@@ -56,6 +56,7 @@ resource "aws_iam_policy" "lambda_policy" {
           "eks:ListClusters",
           "eks:ListNodegroups",
           "elasticache:DescribeCacheClusters",
+          "elasticache:DescribeReplicationGroups",
           "elasticache:DescribeSnapshots",
           "elasticloadbalancing:DescribeLoadBalancers",
           "elasticloadbalancing:DescribeTargetGroups",
@@ -64,6 +65,8 @@ resource "aws_iam_policy" "lambda_policy" {
           "lambda:ListFunctions",
           "logs:DescribeLogGroups",
           "logs:DescribeLogStreams",
+          "rds:DescribeDBClusters",
+          "rds:DescribeDBClusterSnapshots",
           "rds:DescribeDBInstances",
           "rds:DescribeDBSnapshots",
           "s3:GetBucketLifecycleConfiguration",
@@ -72,11 +75,22 @@ resource "aws_iam_policy" "lambda_policy" {
           "s3:ListBuckets",
           "logs:FilterLogEvents",
           "compute-optimizer:GetEC2InstanceRecommendations",
+          "compute-optimizer:ExportEC2InstanceRecommendations",
+          "compute-optimizer:ExportEBSVolumeRecommendations",
+          "compute-optimizer:ExportLambdaFunctionRecommendations",
+          "compute-optimizer:ExportAutoScalingGroupRecommendations",
+          "compute-optimizer:DescribeRecommendationExportJobs",
+          "autoscaling:DescribeAutoScalingGroups",
+          "tag:GetResources",
+          "config:SelectResourceConfig",
+          "config:SelectAggregateResourceConfig",
+          "config:DescribeConfigurationRecorders",
           "sts:GetCallerIdentity",
           "opensearch:ListDomainNames",
           "opensearch:DescribeDomain",
+          "es:DescribeDomains",
           "kinesis:ListStreams",
-          "kinesis:DescribeStream",
+          "kinesis:DescribeStreamSummary",
           "sqs:ListQueues",
           "sqs:GetQueueAttributes",
           "sns:ListTopics",
@@ -123,7 +137,46 @@ resource "aws_lambda_function" "finops_lambda" {
 
   environment {
     variables = {
-      LOG_LEVEL = "INFO"
+      LOG_LEVEL         = "INFO"
+      WARMUP_COLLECTORS = var.warmup_collectors
     }
   }
 }
+
+# Checkpointed runs can hand their remaining collectors to a new invocation of the function,
+# and keep their state in an S3 bucket when one is configured in the event. Coordinated runs
+# invoke the function as their workers, which assume the configured roles of other accounts.
+resource "aws_iam_role_policy" "lambda_checkpoint_policy" {
+  name = "finops_lambda_checkpoint_policy"
+  role = aws_iam_role.lambda_exec_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect   = "Allow",
+        Action   = [
+          "lambda:InvokeFunction"
+        ],
+        Resource = aws_lambda_function.finops_lambda.arn
+      },
+      {
+        Effect   = "Allow",
+        Action   = [
+          "sts:AssumeRole"
+        ],
+        Resource = "*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:DeleteObject",
+          "s3:ListBucket"
+        ],
+        Resource = "*"
+      }
+    ]
+  })
+}
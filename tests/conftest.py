@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'fixtures')
+
+sys.path.insert(0, os.path.join(ROOT, 'lambda'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,69 @@
+import json
+
+
+def get_field(item, field):
+    # Dotted fields such as configuration.volumeType are looked up level by level
+    for key in field.split('.'):
+        item = item.get(key) if isinstance(item, dict) else None
+    return item
+
+
+class FakeConfigClient:
+    # Answers the advanced queries ConfigInventory makes from a JSON file of Config items. Only
+    # equality conditions joined by AND are understood. Every query is kept in expressions.
+
+    class Paginator:
+        def __init__(self, client, operation_name):
+            self.client = client
+            self.operation_name = operation_name
+
+        def paginate(self, **params):
+            while True:
+                page = getattr(self.client, self.operation_name)(**params)
+                yield page
+                if not page.get('NextToken'):
+                    return
+                params['NextToken'] = page['NextToken']
+
+    def __init__(self, fixture_path, page_size=100, recorded_types=None, region_name='eu-central-1'):
+        with open(fixture_path) as f:
+            self.resources = json.load(f)
+        self.page_size = page_size
+        self.recorded_types = recorded_types
+        self.meta = type('Meta', (), {'region_name': region_name})()
+        self.expressions = []
+
+    def select_resource_config(self, Expression, Limit=None, NextToken=None):
+        if NextToken is None:
+            self.expressions.append(Expression)
+        expression, _, group_by = Expression.partition(' GROUP BY ')
+        where = expression.split(' WHERE ', 1)[1] if ' WHERE ' in expression else ''
+        conditions = dict(
+            (field.strip(), value.strip().strip("'"))
+            for field, value in (condition.split('=', 1) for condition in where.split(' AND ') if condition)
+        )
+        matches = [item for item in self.resources if all(str(get_field(item, field)) == value for field, value in conditions.items())]
+        if group_by:
+            counts = {}
+            for item in matches:
+                counts[item[group_by]] = counts.get(item[group_by], 0) + 1
+            matches = [{group_by: key, 'COUNT(*)': count} for key, count in counts.items()]
+        start = int(NextToken or 0)
+        end = start + (Limit or self.page_size)
+        page = {'Results': [json.dumps(item) for item in matches[start:end]], 'QueryInfo': {}}
+        if end < len(matches):
+            page['NextToken'] = str(end)
+        return page
+
+    def select_aggregate_resource_config(self, Expression, ConfigurationAggregatorName, Limit=None, NextToken=None):
+        return self.select_resource_config(Expression, Limit, NextToken)
+
+    def describe_configuration_recorders(self):
+        if self.recorded_types is None:
+            recording_group = {'allSupported': True}
+        else:
+            recording_group = {'allSupported': False, 'resourceTypes': self.recorded_types}
+        return {'ConfigurationRecorders': [{'name': 'default', 'recordingGroup': recording_group}]}
+
+    def get_paginator(self, operation_name):
+        return self.Paginator(self, operation_name)
@@ -0,0 +1,91 @@
+from collections import Counter
+
+import pytest
+
+import lambda_function
+
+
+class FakeLogsClient:
+    # Lists log groups in name order, page_size at a time, and counts how often each name is served
+
+    class Paginator:
+        def __init__(self, client):
+            self.client = client
+
+        def paginate(self, **params):
+            while True:
+                page = self.client.describe_log_groups(**params)
+                yield page
+                if 'nextToken' not in page:
+                    return
+                params['nextToken'] = page['nextToken']
+
+    def __init__(self, names, page_size=50):
+        self.names = sorted(names)
+        self.page_size = page_size
+        self.served = Counter()
+        self.calls = 0
+
+    def describe_log_groups(self, logGroupNamePrefix='', nextToken=None):
+        self.calls += 1
+        if nextToken:
+            prefix, start = nextToken.split('|')
+            assert not logGroupNamePrefix or logGroupNamePrefix == prefix
+        else:
+            prefix, start = logGroupNamePrefix, 0
+        names = [name for name in self.names if name.startswith(prefix)]
+        start = int(start)
+        end = start + self.page_size
+        self.served.update(names[start:end])
+        page = {'logGroups': [{'logGroupName': name, 'storedBytes': len(name)} for name in names[start:end]]}
+        if end < len(names):
+            page['nextToken'] = f"{prefix}|{end}"
+        return page
+
+    def get_paginator(self, operation_name):
+        return self.Paginator(self)
+
+
+@pytest.fixture
+def logs_client(monkeypatch):
+    names = (
+        [f"/aws/lambda/function-{index:04d}" for index in range(900)]
+        + [f"/aws/eks/cluster-{index}/cluster" for index in range(120)]
+        + [f"/ecs/service-{index}" for index in range(30)]
+        + [f"API-Gateway-Execution-Logs_{index}" for index in range(40)]
+        + [f"app-{index}" for index in range(60)]
+    )
+    client = FakeLogsClient(names)
+    monkeypatch.setattr(lambda_function, 'get_client', lambda service_name, region_name=None: client)
+    return client
+
+
+def test_small_accounts_are_listed_serially(monkeypatch):
+    client = FakeLogsClient([f"/aws/lambda/function-{index}" for index in range(51)])
+    monkeypatch.setattr(lambda_function, 'get_client', lambda service_name, region_name=None: client)
+    
+    data = lambda_function.get_cloudwatch_logs_data()
+    
+    assert data['Summary']['LogGroupCount'] == 51
+    assert client.calls == 2
+
+
+def test_each_log_group_is_listed_and_reported_once(logs_client):
+    data = lambda_function.get_cloudwatch_logs_data(top_n=5)
+    
+    reported = [row.LogGroupName for row in data['LogGroups']]
+    assert reported == logs_client.names
+    assert data['Summary']['TotalStoredBytes'] == sum(len(name) for name in logs_client.names)
+    # The serial listing's shard goes on from its token and no shard pages through another's groups.
+    # Only the tail of the page where that listing leaves its leading character is served twice.
+    served_twice = [name for name, count in logs_client.served.items() if count > 1]
+    assert max(logs_client.served.values()) <= 2
+    assert len(served_twice) <= logs_client.page_size
+    assert all(not name.startswith('/') for name in served_twice)
+
+
+def test_the_serial_listing_is_not_read_again(logs_client):
+    lambda_function.get_cloudwatch_logs_data(serial_pages=4)
+    
+    first_pages = logs_client.names[:4 * logs_client.page_size]
+    assert all(logs_client.served[name] == 1 for name in first_pages)
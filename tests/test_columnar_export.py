@@ -0,0 +1,33 @@
+import csv
+
+import lambda_function
+
+
+def read_part(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_values_that_do_not_fit_the_locked_kind_are_counted(tmp_path):
+    exporter = lambda_function.ColumnarExporter(str(tmp_path), {'account': '111111111111'}, 'csv', batch_size=2)
+
+    exporter.write_section('ebs_volumes', [
+        {'VolumeId': 'vol-1', 'Iops': 3000},
+        {'VolumeId': 'vol-2', 'Iops': 125.5},
+        {'VolumeId': 'vol-3', 'Iops': 'N/A'},
+        {'VolumeId': 'vol-4', 'Iops': 'N/A'}
+    ])
+
+    first, second = exporter.manifest
+    assert first['DroppedCells'] == {}
+    assert second['DroppedCells'] == {'Iops': 2}
+    assert [row['Iops'] for row in read_part(second['Path'])] == ['', '']
+
+
+def test_mixed_values_in_one_batch_are_written_as_text():
+    schema, dropped = {}, {}
+
+    columns = lambda_function.to_columns([{'Size': 1}, {'Size': 'N/A'}, {'Size': None}], schema, dropped)
+
+    assert columns == {'Size': ['1', 'N/A', None]}
+    assert schema == {'Size': 'text'} and dropped == {}
@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+import lambda_function
+from conftest import FIXTURES
+
+STAND_IN_PATH = os.path.join(FIXTURES, 'compute_optimizer')
+EXPORT_KEYS = {
+    resource_type: f"compute-optimizer/{export['file_name']}.csv"
+    for resource_type, export in lambda_function.COMPUTE_OPTIMIZER_EXPORTS.items()
+}
+
+
+class FakeOptimizerClient:
+    # Export jobs that complete after a given number of lookups, with keys into the fixtures
+
+    class exceptions:
+        class LimitExceededException(Exception):
+            pass
+
+    class meta:
+        region_name = 'eu-central-1'
+
+    def __init__(self, lookups_until_complete, running_types=()):
+        self.lookups_until_complete = lookups_until_complete
+        self.running_types = set(running_types)
+        self.started = []
+        self.lookups = 0
+
+    def start_export(self, resource_type, **params):
+        if resource_type in self.running_types:
+            raise self.exceptions.LimitExceededException()
+        self.started.append(resource_type)
+        return {'jobId': f"job-{resource_type}-{len(self.started)}"}
+
+    def __getattr__(self, name):
+        for resource_type, export in lambda_function.COMPUTE_OPTIMIZER_EXPORTS.items():
+            if export['operation'] == name:
+                return lambda **params: self.start_export(resource_type, **params)
+        raise AttributeError(name)
+
+    def describe_recommendation_export_jobs(self, jobIds=None, filters=None):
+        if filters:
+            # Jobs started by an earlier run that lost track of them
+            listed_type = dict((item['name'], item['values'][0]) for item in filters)['ResourceType']
+            return {'recommendationExportJobs': [
+                {'jobId': f"job-{resource_type}-earlier", 'status': 'InProgress'}
+                for resource_type in self.running_types
+                if lambda_function.COMPUTE_OPTIMIZER_EXPORTS[resource_type]['resource_type'] == listed_type
+            ]}
+        self.lookups += 1
+        complete = self.lookups > self.lookups_until_complete
+        jobs = []
+        for job_id in jobIds:
+            resource_type = job_id.split('-')[1]
+            job = {'jobId': job_id, 'status': 'Complete' if complete else 'InProgress'}
+            if complete:
+                job['destination'] = {'s3': {'bucket': 'finops-exports', 'key': EXPORT_KEYS[resource_type]}}
+            jobs.append(job)
+        return {'recommendationExportJobs': jobs}
+
+
+@pytest.fixture
+def optimizer_client(monkeypatch):
+    client = FakeOptimizerClient(lookups_until_complete=1)
+    monkeypatch.setattr(lambda_function, 'get_client', lambda service_name, region_name=None: client)
+    return client
+
+
+def test_fixture_exports_are_parsed_by_resource_id():
+    data = lambda_function.get_compute_optimizer_data('finops-exports', export_keys=EXPORT_KEYS, stand_in_path=STAND_IN_PATH)
+    
+    findings = data['Findings']
+    assert findings['EC2Instances']['i-0a1b2c3d4e5f60001'] == {
+        'Finding': 'OVER_PROVISIONED',
+        'CurrentInstanceType': 'm5.2xlarge',
+        'RecommendedInstanceType': 'm5.xlarge',
+        'EstimatedMonthlySavings': 140.16
+    }
+    assert findings['EBSVolumes']['vol-0a1b2c3d4e5f60001']['RecommendedVolumeType'] == 'gp3'
+    assert findings['LambdaFunctions']['finops_data_collector']['RecommendedMemorySize'] == '512'
+    assert [group['AutoScalingGroupName'] for group in data['AutoScalingGroups']] == ['batch-asg', 'web-asg']
+    assert 'AutoScalingGroups' not in findings
+
+
+def test_findings_are_joined_onto_rows_collected_before_and_after():
+    data = lambda_function.get_compute_optimizer_data('finops-exports', export_keys=EXPORT_KEYS, stand_in_path=STAND_IN_PATH)
+    sections = {}
+    join_indexes = {}
+    instances = [
+        lambda_function.Ec2InstanceRecord(InstanceId='i-0a1b2c3d4e5f60001', Description='web', AverageCPUUtilization=12.5),
+        lambda_function.Ec2InstanceRecord(InstanceId='i-0ffffffffffffffff', Description='untracked', AverageCPUUtilization=3.0)
+    ]
+    lambda_function.add_collector_sections(sections, {('computing', 'ec2_instances'): instances}, None, True, join_indexes)
+    lambda_function.add_collector_sections(sections, {
+        ('computing', 'compute_optimizer_findings'): data['Findings'],
+        ('computing', 'auto_scaling_groups'): data['AutoScalingGroups']
+    }, None, True, join_indexes)
+    functions = [{'FunctionName': 'image-resizer', 'MemorySize': 1024}]
+    lambda_function.add_collector_sections(sections, {('computing', 'lambda_functions'): functions}, None, True, join_indexes)
+    
+    assert instances[0].to_dict()['ComputeOptimizer']['RecommendedInstanceType'] == 'm5.xlarge'
+    assert 'ComputeOptimizer' not in instances[1].to_dict()
+    assert functions[0]['ComputeOptimizer']['Finding'] == 'Optimized'
+    assert len(sections[('computing', 'auto_scaling_groups')]) == 2
+
+
+def test_running_exports_are_read_by_a_later_run(optimizer_client, tmp_path):
+    store = {'type': 'local', 'path': str(tmp_path)}
+    
+    first = lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=0, stand_in_path=STAND_IN_PATH, store=store)
+    assert first == {'Findings': {}, 'AutoScalingGroups': []}
+    assert len(optimizer_client.started) == len(lambda_function.COMPUTE_OPTIMIZER_EXPORTS)
+    
+    second = lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=0, stand_in_path=STAND_IN_PATH, store=store)
+    assert 'i-0a1b2c3d4e5f60001' in second['Findings']['EC2Instances']
+    assert len(second['AutoScalingGroups']) == 2
+    # The jobs of the first run were looked up again instead of started anew
+    assert len(optimizer_client.started) == len(lambda_function.COMPUTE_OPTIMIZER_EXPORTS)
+    
+    third = lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=0, stand_in_path=STAND_IN_PATH, store=store)
+    assert third == second
+    assert len(optimizer_client.started) == len(lambda_function.COMPUTE_OPTIMIZER_EXPORTS)
+
+
+def test_wait_stops_at_the_checkpoint_deadline(optimizer_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(lambda_function.time, 'sleep', lambda seconds: pytest.fail('waited past the deadline'))
+    checkpoint = lambda_function.RunCheckpoint(lambda_function.LocalDirStore(str(tmp_path)), 'run', deadline=lambda_function.time.monotonic())
+    
+    data = lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=240, stand_in_path=STAND_IN_PATH, store={'type': 'local', 'path': str(tmp_path)}, checkpoint=checkpoint)
+    
+    assert data == {'Findings': {}, 'AutoScalingGroups': []}
+    assert optimizer_client.lookups == 1
+
+
+def test_jobs_already_running_are_waited_for(monkeypatch, tmp_path):
+    client = FakeOptimizerClient(lookups_until_complete=0, running_types=['EC2Instances'])
+    monkeypatch.setattr(lambda_function, 'get_client', lambda service_name, region_name=None: client)
+    
+    data = lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=0, stand_in_path=STAND_IN_PATH, store={'type': 'local', 'path': str(tmp_path)})
+    
+    assert 'EC2Instances' not in client.started
+    assert 'i-0a1b2c3d4e5f60001' in data['Findings']['EC2Instances']
+
+
+def test_job_state_is_kept_without_a_store_option(optimizer_client, monkeypatch, tmp_path):
+    # The default store keeps the jobs under /tmp, here under the test's own directory
+    create_store = lambda_function.create_store
+    monkeypatch.setattr(lambda_function, 'create_store', lambda options: create_store(options or {'type': 'local', 'path': str(tmp_path)}))
+    
+    lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=0, stand_in_path=STAND_IN_PATH)
+    second = lambda_function.get_compute_optimizer_data('finops-exports', max_wait_seconds=0, stand_in_path=STAND_IN_PATH)
+    
+    assert len(second['AutoScalingGroups']) == 2
+    assert len(optimizer_client.started) == len(lambda_function.COMPUTE_OPTIMIZER_EXPORTS)
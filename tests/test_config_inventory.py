@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+import lambda_function
+from conftest import FIXTURES
+from fake_config_client import FakeConfigClient
+
+RESOURCES_PATH = os.path.join(FIXTURES, 'config', 'resources.json')
+
+
+class LiveListing:
+    # Stands in for a collector's describe call and counts how often it is made
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.items
+
+
+@pytest.fixture
+def aggregator_run(monkeypatch):
+    # A worker of account 111111111111 in eu-central-1, whose config client answers from the fixtures
+    config_client = FakeConfigClient(RESOURCES_PATH, region_name='eu-central-1')
+    monkeypatch.setattr(lambda_function, 'get_client', lambda service_name, region_name=None: config_client)
+    token = lambda_function.current_shard.set({'Account': '111111111111', 'Region': 'eu-central-1'})
+    yield config_client
+    lambda_function.current_shard.reset(token)
+
+
+def get_volume_ids(inventory):
+    return sorted(volume['VolumeId'] for volume in inventory.get_items('AWS::EC2::Volume'))
+
+
+def test_recorder_items_are_converted_across_pages():
+    inventory = lambda_function.ConfigInventory(FakeConfigClient(RESOURCES_PATH, page_size=1))
+    
+    assert get_volume_ids(inventory) == ['vol-0a1b2c3d4e5f60001', 'vol-0a1b2c3d4e5f60002', 'vol-0f9e8d7c6b5a40001']
+    volume = next(volume for volume in inventory.get_items('AWS::EC2::Volume') if volume['VolumeId'] == 'vol-0a1b2c3d4e5f60001')
+    assert volume['Attachments'][0]['InstanceId'] == 'i-0a1b2c3d4e5f60001'
+    assert volume['CreateTime'].year == 2024
+    assert 'https://sqs.eu-central-1.amazonaws.com/111111111111/orders' in inventory.get_items('AWS::SQS::Queue')
+
+
+def test_aggregator_defaults_to_the_callers_account_and_region(aggregator_run):
+    inventory = lambda_function.create_config_inventory({'aggregator': 'org-aggregator'})
+    
+    assert inventory.filters == {'accountId': '111111111111', 'awsRegion': 'eu-central-1'}
+    assert get_volume_ids(inventory) == ['vol-0a1b2c3d4e5f60001', 'vol-0a1b2c3d4e5f60002']
+    assert inventory.get_items('AWS::SQS::Queue') == ['https://sqs.eu-central-1.amazonaws.com/111111111111/orders']
+    assert all("accountId = '111111111111'" in expression for expression in aggregator_run.expressions)
+
+
+def test_aggregator_filters_can_name_other_accounts(aggregator_run):
+    inventory = lambda_function.create_config_inventory({
+        'aggregator': 'org-aggregator',
+        'filters': {'accountId': '222222222222', 'awsRegion': 'us-east-1'}
+    })
+    
+    assert inventory.recorded_types == {'AWS::EC2::Volume', 'AWS::SQS::Queue'}
+    assert get_volume_ids(inventory) == ['vol-0f9e8d7c6b5a40001']
+
+
+def test_types_without_aggregated_items_are_listed_live(aggregator_run):
+    inventory = lambda_function.create_config_inventory({'aggregator': 'org-aggregator'})
+    transit_gateways = LiveListing([{'TransitGatewayId': 'tgw-0a1b2c3d4e5f60001'}])
+    volumes = LiveListing([])
+    
+    assert 'AWS::EC2::TransitGateway' not in inventory.recorded_types
+    assert inventory.get_items('AWS::EC2::TransitGateway') is None
+    assert lambda_function.list_resources(inventory, 'AWS::EC2::TransitGateway', transit_gateways) == transit_gateways.items
+    assert transit_gateways.calls == 1
+    assert len(lambda_function.list_resources(inventory, 'AWS::EC2::Volume', volumes)) == 2
+    assert volumes.calls == 0
+
+
+def test_types_the_recorder_skips_are_listed_live():
+    config_client = FakeConfigClient(RESOURCES_PATH, recorded_types=['AWS::EC2::Volume'])
+    inventory = lambda_function.ConfigInventory(config_client)
+    queues = LiveListing(['https://sqs.eu-central-1.amazonaws.com/111111111111/live'])
+    file_systems = LiveListing([{'FileSystemId': 'fs-0a1b2c3d'}])
+    
+    assert inventory.recorded_types == {'AWS::EC2::Volume'}
+    assert lambda_function.list_resources(inventory, 'AWS::SQS::Queue', queues) == queues.items
+    # Types Config cannot stand in for are never queried
+    assert lambda_function.list_resources(inventory, 'AWS::EFS::FileSystem', file_systems) == file_systems.items
+    assert queues.calls == 1 and file_systems.calls == 1
+    assert config_client.expressions == []
+
+
+def test_filters_on_configuration_fields_narrow_the_query():
+    config_client = FakeConfigClient(RESOURCES_PATH)
+    inventory = lambda_function.ConfigInventory(config_client, filters={'configuration.volumeType': 'gp3', 'awsRegion': 'eu-central-1'})
+    
+    assert get_volume_ids(inventory) == ['vol-0a1b2c3d4e5f60002']
+    assert config_client.expressions[-1].endswith(
+        "WHERE resourceType = 'AWS::EC2::Volume' AND awsRegion = 'eu-central-1' AND configuration.volumeType = 'gp3'"
+    )
+
+
+@pytest.mark.parametrize('filters', [
+    {'accountId': "111111111111' OR accountId = '222222222222"},
+    {'resourceName': 'orders\\'},
+    {'accountId': ['111111111111']},
+    {'accountId = accountId OR accountId': '111111111111'},
+    {'configuration.': 'gp3'},
+])
+def test_unsupported_filters_are_rejected_before_querying(filters):
+    config_client = FakeConfigClient(RESOURCES_PATH)
+    
+    with pytest.raises(ValueError):
+        lambda_function.ConfigInventory(config_client, 'org-aggregator', filters=filters)
+    assert config_client.expressions == []
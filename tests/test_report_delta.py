@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+
+import lambda_function
+
+FUNCTIONS = ('computing', 'lambda_functions')
+TABLES = ('databases', 'dynamodb_data')
+
+
+def function_row(name, memory, region=None):
+    row = {'FunctionName': name, 'MemorySize': memory}
+    if region:
+        row.update({'Account': '111111111111', 'Region': region})
+    return row
+
+
+def load_snapshot(store_path):
+    with open(store_path / 'delta' / 'previous_report.json.gz', 'rb') as f:
+        return json.loads(gzip.decompress(f.read()))
+
+
+def test_same_named_rows_of_other_regions_keep_their_own_ids():
+    rows = lambda_function.index_section_rows(FUNCTIONS, [
+        function_row('api', 128, 'eu-west-1'),
+        function_row('api', 256, 'us-east-1')
+    ])
+    
+    assert sorted(rows) == ['111111111111/eu-west-1/api', '111111111111/us-east-1/api']
+
+
+def test_rows_with_a_taken_id_fall_back_to_their_fingerprint():
+    first, second = function_row('api', 128), function_row('api', 256)
+    
+    rows = lambda_function.index_section_rows(FUNCTIONS, [first, second])
+    
+    assert rows == {'api': first, lambda_function.get_fingerprint(second): second}
+
+
+def test_snapshots_are_diffed_by_row_id():
+    previous = lambda_function.build_report_snapshot({FUNCTIONS: [
+        function_row('api', 128, 'eu-west-1'),
+        function_row('api', 128, 'us-east-1'),
+        function_row('worker', 512, 'us-east-1')
+    ]})
+    current = lambda_function.build_report_snapshot({FUNCTIONS: [
+        function_row('api', 128, 'eu-west-1'),
+        function_row('api', 256, 'us-east-1'),
+        function_row('cron', 128, 'us-east-1')
+    ]})
+    
+    delta = lambda_function.diff_report_snapshots(previous, current)
+    
+    section = delta['Sections']['computing/lambda_functions']
+    assert list(section['Added']) == ['111111111111/us-east-1/cron']
+    assert section['Removed'] == ['111111111111/us-east-1/worker']
+    assert section['Changed'] == {'111111111111/us-east-1/api': {'MemorySize': {'Old': 128, 'New': 256}}}
+    assert section['Unchanged'] == 1
+    assert delta['BaseRunAt'] == previous['RunAt']
+    assert delta['SkippedSections'] == []
+
+
+def test_unchanged_sections_are_left_out():
+    snapshot = lambda_function.build_report_snapshot({FUNCTIONS: [function_row('api', 128)]})
+    
+    assert lambda_function.diff_report_snapshots(snapshot, snapshot)['Sections'] == {}
+    assert lambda_function.diff_report_snapshots(None, snapshot)['BaseRunAt'] is None
+
+
+@pytest.mark.parametrize('keep_skipped', [True, False])
+def test_skipped_sections_keep_their_snapshot_unless_told_not_to(tmp_path, keep_skipped):
+    options = {'store': {'type': 'local', 'path': str(tmp_path)}, 'keep_skipped': keep_skipped}
+    lambda_function.compute_report_delta(options, {
+        FUNCTIONS: [function_row('api', 128)],
+        TABLES: [{'TableName': 'orders', 'ItemCount': 10}]
+    })
+    
+    delta = lambda_function.compute_report_delta(options, {FUNCTIONS: [function_row('api', 256)]})
+    
+    assert delta['SkippedSections'] == ['databases/dynamodb_data']
+    assert delta['Sections']['computing/lambda_functions']['Changed'] == {'api': {'MemorySize': {'Old': 128, 'New': 256}}}
+    assert ('databases/dynamodb_data' in load_snapshot(tmp_path)['Sections']) == keep_skipped
+
+
+def test_delta_is_returned_with_the_export_manifest(tmp_path, monkeypatch):
+    rows = [function_row('api', 128)]
+    monkeypatch.setitem(lambda_function.COLLECTORS, 'lambda_functions', {
+        'function': lambda: rows,
+        'services': (),
+        'sections': {None: FUNCTIONS}
+    })
+    event = {
+        'collectors': ['lambda_functions'],
+        'export': {'path': str(tmp_path / 'export'), 'format': 'csv', 'account': '111111111111', 'region': 'eu-west-1', 'return_report': False},
+        'delta': {'store': {'type': 'local', 'path': str(tmp_path / 'state')}}
+    }
+    
+    first = lambda_function.lambda_handler(event, None)
+    rows[0] = function_row('api', 256)
+    second = lambda_function.lambda_handler(event, None)
+    
+    assert first['export'] and first['_delta']['BaseRunAt'] is None
+    assert second['_delta']['Sections']['computing/lambda_functions']['Changed'] == {'api': {'MemorySize': {'Old': 128, 'New': 256}}}
+    assert load_snapshot(tmp_path / 'state')['Sections']['computing/lambda_functions']['api']['MemorySize'] == 256
@@ -0,0 +1,47 @@
+import lambda_function
+
+
+def cost_row(total_cost):
+    return {'monthly_expenses': {'2026/09': total_cost}, 'total_cost': total_cost, 'average_cost': total_cost}
+
+
+def test_cost_groups_named_like_unit_fields_are_not_rendered():
+    report = {'cost_and_usage': {
+        'Size': {'Cost': cost_row(12.5)},
+        'Amazon EC2': {'total_cost': cost_row(3)}
+    }}
+
+    rendered = lambda_function.render_report(report)['cost_and_usage']
+
+    assert rendered['Size']['Cost'] == {'monthly_expenses': {'2026/09': '12.50'}, 'total_cost': '12.50', 'average_cost': '12.50'}
+    assert rendered['Amazon EC2']['total_cost']['total_cost'] == '3.00'
+
+
+def test_only_the_known_fields_of_a_section_are_rendered():
+    report = {
+        'computing': {'eks_data': [{
+            'ClusterName': 'main',
+            'Nodes': [{'InstanceId': 'i-1', 'AverageMemoryUtilization': 41.5}],
+            'Tags': {'Cost': 7, 'Size': 1024}
+        }]},
+        'storage': {'efs_data': [{'FileSystemId': 'fs-1', 'Size': 1024, 'Tags': {'Size': 1024}}]}
+    }
+
+    rendered = lambda_function.render_report(report)
+
+    cluster = rendered['computing']['eks_data'][0]
+    assert cluster['Nodes'][0]['AverageMemoryUtilization'] == '41.50%'
+    assert cluster['Tags'] == {'Cost': 7, 'Size': 1024}
+    assert rendered['storage']['efs_data'][0]['Size'] == lambda_function.format_bytes(1024)
+    assert rendered['storage']['efs_data'][0]['Tags'] == {'Size': 1024}
+
+
+def test_typed_rows_keep_their_numbers_and_list_units_by_section():
+    row = {'InstanceId': 'i-1', 'AverageCPUUtilization': 12.345678, 'ComputeOptimizer': {'EstimatedMonthlySavings': 4.123456}}
+
+    rendered = lambda_function.render_report(row, typed=True, path=('computing', 'ec2_instances'))
+    units = lambda_function.get_report_units()
+
+    assert rendered == {'InstanceId': 'i-1', 'AverageCPUUtilization': 12.3457, 'ComputeOptimizer': {'EstimatedMonthlySavings': 4.1235}}
+    assert units['computing/ec2_instances'] == {'AverageCPUUtilization': 'percent', 'ComputeOptimizer.EstimatedMonthlySavings': 'USD'}
+    assert units['others/cloudwatch_logs_summary']['LargestLogGroups.StoredBytes'] == 'bytes'
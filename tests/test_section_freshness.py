@@ -0,0 +1,55 @@
+import lambda_function
+
+TABLES = ('databases', 'dynamodb_data')
+
+
+def run(monkeypatch, tmp_path, calls, **event):
+    def get_tables(backup_time_range_lower_bound=None):
+        calls.append(backup_time_range_lower_bound)
+        return [{'TableName': 'orders', 'BackupWindow': backup_time_range_lower_bound}]
+    
+    monkeypatch.setitem(lambda_function.COLLECTORS, 'dynamodb_data', {
+        'function': get_tables,
+        'services': (),
+        'max_age': 3600,
+        'sections': {None: TABLES}
+    })
+    return lambda_function.lambda_handler({
+        'collectors': ['dynamodb_data'],
+        'freshness': {'store': {'type': 'local', 'path': str(tmp_path)}},
+        **event
+    }, None)
+
+
+def test_sections_are_served_while_the_options_stay_the_same(monkeypatch, tmp_path):
+    calls = []
+    options = {'collector_options': {'dynamodb_data': {'backup_time_range_lower_bound': '2026-01-01'}}}
+    
+    run(monkeypatch, tmp_path, calls, **options)
+    report = run(monkeypatch, tmp_path, calls, **options)
+    
+    assert calls == ['2026-01-01']
+    assert list(report['_run_stats']['Freshness']['Served']) == ['dynamodb_data']
+
+
+def test_sections_of_other_options_are_refreshed(monkeypatch, tmp_path):
+    calls = []
+    
+    run(monkeypatch, tmp_path, calls, collector_options={'dynamodb_data': {'backup_time_range_lower_bound': '2026-01-01'}})
+    report = run(monkeypatch, tmp_path, calls, collector_options={'dynamodb_data': {'backup_time_range_lower_bound': '2026-06-01'}})
+    
+    assert calls == ['2026-01-01', '2026-06-01']
+    assert report['_run_stats']['Freshness']['Refreshed'] == ['dynamodb_data']
+
+
+def test_sections_of_other_options_are_not_served_stale(tmp_path):
+    store = lambda_function.LocalDirStore(str(tmp_path))
+    options = {'dynamodb_data': {'tag_keys': ['owner']}}
+    lambda_function.SectionFreshness(store, get_options=options.get).save('dynamodb_data', {TABLES: []}, 1.0)
+    
+    options['dynamodb_data'] = {'tag_keys': ['team']}
+    freshness = lambda_function.SectionFreshness(store, get_options=options.get)
+    
+    assert freshness.is_stale('dynamodb_data')
+    assert freshness.serve('dynamodb_data') is None
+    assert freshness.stats['Deferred'] == ['dynamodb_data']
@@ -0,0 +1,41 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import lambda_function
+
+SHARD = {'Account': '222222222222', 'Region': 'eu-west-1', 'RoleArn': 'arn:aws:iam::222222222222:role/finops'}
+
+
+def test_each_account_gets_one_session_that_assumes_its_role_once(monkeypatch):
+    assumed = []
+
+    def assume_shard_role(role_arn):
+        assumed.append(role_arn)
+        return {
+            'access_key': 'AKIASHARD',
+            'secret_key': 'secret',
+            'token': 'token',
+            'expiry_time': (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+        }
+
+    monkeypatch.setattr(lambda_function, 'assume_shard_role', assume_shard_role)
+    monkeypatch.setattr(lambda_function, 'shard_sessions', {})
+    sessions = []
+    barrier = threading.Barrier(8)
+
+    def get_shard_session():
+        barrier.wait()
+        sessions.append(lambda_function.get_shard_session(SHARD))
+
+    threads = [threading.Thread(target=get_shard_session) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 1
+    assert assumed == []
+    credentials = sessions[0].get_credentials()
+    assert credentials.get_frozen_credentials().access_key == 'AKIASHARD'
+    assert credentials.get_frozen_credentials().token == 'token'
+    assert assumed == [SHARD['RoleArn']]
@@ -3,3 +3,9 @@ variable "aws_region" {
   type        = string
   default     = "eu-central-1"
 }
+
+variable "warmup_collectors" {
+  description = "Comma-separated collectors (or \"all\") whose AWS clients are built during the Lambda init phase. Empty disables the warmup."
+  type        = string
+  default     = ""
+}